@@ -1,54 +1,69 @@
 
 # app.py - Servidor web principal (Flask) - VERSIÓN LIGERA
-from flask import Flask, render_template, abort, request, jsonify
+from flask import Flask, render_template, abort, request, jsonify, Response, stream_with_context
 import json
-import os
-
-# Las funciones de scraping en tiempo real para las vistas de "estudio" siguen aquí
-from modules.estudio_scraper import (
-    obtener_datos_completos_partido, 
-    format_ah_as_decimal_string_of, 
-    obtener_datos_preview_rapido, 
-    obtener_datos_preview_ligero, 
-    generar_analisis_mercado_simplificado,
-)
+import queue
+import threading
+
+# Las funciones de scraping en tiempo real (modules.estudio_scraper) se importan
+# dentro de las rutas de estudio/preview: arrastran selenium, pandas, requests y
+# todos los módulos de análisis, y la mayoría de peticiones solo sirven data.json.
 # La lógica de normalización de handicap está en su propio módulo
 from app_utils import normalize_handicap_to_half_bucket_str
+# Las listas de data.json se cargan una vez por versión del fichero en una tabla por columnas
+from match_table import filter_args, get_match_table, sort_arg
+# Las páginas siguientes de /api/matches salen de instantáneas por cursor
+from list_cursors import CursorExpired, get_cursor_store
+# El HTML de las listas y del estudio se guarda por versión de data.json / por contenido
+from render_cache import cached_list_page, render_cached_content, render_match_list
+# Presupuesto de tiempo por petición que se propaga a todo el scraping
+from deadline import Deadline
 
 app = Flask(__name__)
 
 DATA_FILE = 'data.json'
 
-def load_data_from_file():
-    """Carga los datos desde el archivo JSON."""
-    if not os.path.exists(DATA_FILE):
-        return {"upcoming_matches": [], "finished_matches": []}
-    try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {"upcoming_matches": [], "finished_matches": []}
+def _list_view(section, handicap_filter=None, args=None):
+    """
+    (tabla de la sección, máscara de los filtros o None, opciones de hándicap). Con `args`
+    se aplican también los filtros de filter_args (línea de goles, liga, equipo...).
+    """
+    table = get_match_table(section, DATA_FILE)
+    bucket = normalize_handicap_to_half_bucket_str(handicap_filter) if handicap_filter else None
+    criteria = filter_args(args) if args is not None else {}
+    mask = None
+    if bucket is not None or any(v is not None for v in criteria.values()):
+        mask = table.filter(bucket=bucket, **criteria)
+    return table, mask, list(table.bucket_labels)
+
+def _api_list(section):
+    """
+    Página de una lista. Sin ?cursor= filtra (handicap y los filtros de filter_args),
+    ordena (?sort= file, kickoff, handicap, goal_line; '-' invierte) y empieza en ?offset=;
+    con ?cursor= sigue la instantánea de esa primera llamada, con la misma versión de
+    data.json aunque el fichero haya cambiado. 'next_cursor' es None al final.
+    """
+    args = request.args
+    limit = int(args.get('limit', 10))
+    cursors = get_cursor_store()
+    if args.get('cursor'):
+        records, next_cursor, version = cursors.next(section, args['cursor'], limit)
+    else:
+        table, mask, _ = _list_view(section, args.get('handicap'), args)
+        records, next_cursor = cursors.open(section, table, mask, sort_arg(args), int(args.get('offset', 0)), limit)
+        version = table.version
+    return {'matches': [r.to_dict() for r in records], 'next_cursor': next_cursor, 'version': version}
 
 @app.route('/')
 def index():
     """Muestra los próximos partidos desde el archivo de datos."""
     try:
         hf = request.args.get('handicap')
-        all_data = load_data_from_file()
-        matches = all_data.get('upcoming_matches', [])
-        
-        # Asegurarse de que los datos de handicap existen antes de procesar
-        opts = sorted({
-            normalize_handicap_to_half_bucket_str(m.get('handicap'))
-            for m in matches if m and normalize_handicap_to_half_bucket_str(m.get('handicap')) is not None
-        }, key=lambda x: float(x))
-
-        if hf:
-            target = normalize_handicap_to_half_bucket_str(hf)
-            if target is not None:
-                matches = [m for m in matches if m and normalize_handicap_to_half_bucket_str(m.get('handicap', '')) == target]
-
-        return render_template('index.html', matches=matches, handicap_filter=hf, handicap_options=opts, page_mode='upcoming', page_title='Próximos Partidos')
+        table, mask, opts = _list_view('upcoming_matches', hf)
+        return cached_list_page('index.html', 'upcoming_matches', table.version, [('handicap', hf)], lambda: render_match_list(
+            'index.html', 'upcoming', [r.to_dict() for r in table.page(mask)],
+            handicap_filter=hf, handicap_options=opts, page_title='Próximos Partidos', next_cursor=None
+        ))
     except Exception as e:
         print(f"ERROR en la ruta principal: {e}")
         return render_template('index.html', matches=[], error=f"No se pudieron cargar los partidos: {e}", page_mode='upcoming', page_title='Próximos Partidos')
@@ -58,20 +73,11 @@ def resultados():
     """Muestra los partidos finalizados desde el archivo de datos."""
     try:
         hf = request.args.get('handicap')
-        all_data = load_data_from_file()
-        matches = all_data.get('finished_matches', [])
-
-        opts = sorted({
-            normalize_handicap_to_half_bucket_str(m.get('handicap'))
-            for m in matches if m and normalize_handicap_to_half_bucket_str(m.get('handicap')) is not None
-        }, key=lambda x: float(x))
-
-        if hf:
-            target = normalize_handicap_to_half_bucket_str(hf)
-            if target is not None:
-                matches = [m for m in matches if m and normalize_handicap_to_half_bucket_str(m.get('handicap', '')) == target]
-
-        return render_template('index.html', matches=matches, handicap_filter=hf, handicap_options=opts, page_mode='finished', page_title='Resultados Finalizados')
+        table, mask, opts = _list_view('finished_matches', hf)
+        return cached_list_page('index.html', 'finished_matches', table.version, [('handicap', hf)], lambda: render_match_list(
+            'index.html', 'finished', [r.to_dict() for r in table.page(mask)],
+            handicap_filter=hf, handicap_options=opts, page_title='Resultados Finalizados', next_cursor=None
+        ))
     except Exception as e:
         print(f"ERROR en la ruta de resultados: {e}")
         return render_template('index.html', matches=[], error=f"No se pudieron cargar los partidos: {e}", page_mode='finished', page_title='Resultados Finalizados')
@@ -81,20 +87,11 @@ def resultados():
 def api_matches():
     """Devuelve un fragmento de los próximos partidos para paginación."""
     try:
-        offset = int(request.args.get('offset', 0))
-        limit = int(request.args.get('limit', 10))
-        hf = request.args.get('handicap')
-        
-        all_data = load_data_from_file()
-        matches = all_data.get('upcoming_matches', [])
-
-        if hf:
-            target = normalize_handicap_to_half_bucket_str(hf)
-            if target is not None:
-                matches = [m for m in matches if m and normalize_handicap_to_half_bucket_str(m.get('handicap', '')) == target]
-
-        paginated_matches = matches[offset:offset+limit]
-        return jsonify({'matches': paginated_matches})
+        return jsonify(_api_list('upcoming_matches'))
+    except CursorExpired as e:
+        return jsonify({'error': str(e), 'cursor_expired': True}), 410
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error en la ruta /api/matches: {e}")
         return jsonify({'error': str(e)}), 500
@@ -103,45 +100,114 @@ def api_matches():
 def api_finished_matches():
     """Devuelve un fragmento de los partidos finalizados para paginación."""
     try:
-        offset = int(request.args.get('offset', 0))
-        limit = int(request.args.get('limit', 10))
-        hf = request.args.get('handicap')
-        
-        all_data = load_data_from_file()
-        matches = all_data.get('finished_matches', [])
-
-        if hf:
-            target = normalize_handicap_to_half_bucket_str(hf)
-            if target is not None:
-                matches = [m for m in matches if m and normalize_handicap_to_half_bucket_str(m.get('handicap', '')) == target]
-
-        paginated_matches = matches[offset:offset+limit]
-        return jsonify({'matches': paginated_matches})
+        return jsonify(_api_list('finished_matches'))
+    except CursorExpired as e:
+        return jsonify({'error': str(e), 'cursor_expired': True}), 410
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error en la ruta /api/finished_matches: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/buckets')
+def api_buckets():
+    """
+    Agregados por tramo de hándicap (partidos, cubiertas, pushes) para paneles.
+    ?section=finished|upcoming y los filtros opcionales de filter_args: handicap_min/max,
+    goal_line_min/max, league (repetible), team, from/to (ISO), state.
+    """
+    try:
+        args = request.args
+        section = 'upcoming_matches' if args.get('section') == 'upcoming' else 'finished_matches'
+        table = get_match_table(section, DATA_FILE)
+        mask = table.filter(**filter_args(args))
+        return jsonify({'section': section, 'version': table.version, 'buckets': table.bucket_summary(mask)})
+    except Exception as e:
+        print(f"Error en la ruta /api/buckets: {e}")
+        return jsonify({'error': str(e)}), 400
+
 # --- Las rutas de API y estudio que dependen de scraping en tiempo real se mantienen ---
 # --- Estas rutas seguirán haciendo scraping bajo demanda si es necesario ---
 
 
 @app.route('/estudio/<string:match_id>')
 def mostrar_estudio(match_id):
+    from modules.estudio_scraper import obtener_datos_completos_partido, format_ah_as_decimal_string_of
     print(f"Recibida petición para el estudio del partido ID: {match_id}")
-    datos_partido = obtener_datos_completos_partido(match_id)
+    datos_partido = obtener_datos_completos_partido(match_id, deadline=Deadline())
     if not datos_partido or "error" in datos_partido:
         print(f"Error al obtener datos para {match_id}: {datos_partido.get('error')}")
         abort(500, description=datos_partido.get('error', 'Error desconocido'))
     print(f"Datos obtenidos para {datos_partido['home_name']} vs {datos_partido['away_name']}. Renderizando plantilla...")
-    return render_template('estudio.html', data=datos_partido, format_ah=format_ah_as_decimal_string_of)
+    return render_cached_content('estudio.html', datos_partido, data=datos_partido, format_ah=format_ah_as_decimal_string_of)
+
+def _encode_stream_event(event: str, payload, use_sse: bool) -> str:
+    data = json.dumps(payload, ensure_ascii=False, default=str)
+    if use_sse:
+        return f"event: {event}\ndata: {data}\n\n"
+    return json.dumps({"event": event, "data": json.loads(data)}, ensure_ascii=False) + "\n"
+
+@app.route('/api/estudio/<string:match_id>/stream')
+def api_estudio_stream(match_id):
+    """
+    Variante en streaming del estudio: envía cada sección (match, standings, h2h,
+    last_matches, h2h_col3, comparativas, odds, market_analysis, stats, analysis) en
+    cuanto está lista, como server-sent events o NDJSON (?format=ndjson), y termina
+    con 'done' o 'error'.
+    """
+    from modules.estudio_scraper import obtener_datos_completos_partido
+    use_sse = request.args.get('format', 'sse').lower() != 'ndjson'
+    deadline = Deadline()
+    events = queue.Queue()
+
+    def worker():
+        try:
+            datos = obtener_datos_completos_partido(
+                match_id, deadline=deadline, on_section=lambda name, payload: events.put((name, payload))
+            )
+            if not datos or "error" in datos:
+                events.put(("error", {"error": (datos or {}).get("error", "Error desconocido")}))
+            else:
+                events.put(("done", {"partial": datos.get("partial", False)}))
+        except Exception as e:
+            events.put(("error", {"error": f"Ocurrió una excepción inesperada: {e}"}))
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+
+    def generate():
+        while True:
+            try:
+                name, payload = events.get(timeout=10)
+            except queue.Empty:
+                if not thread.is_alive() and events.empty():
+                    yield _encode_stream_event("error", {"error": "El análisis terminó sin respuesta."}, use_sse)
+                    return
+                # Mantiene viva la conexión mientras Selenium trabaja
+                if use_sse:
+                    yield ": keepalive\n\n"
+                continue
+            yield _encode_stream_event(name, payload, use_sse)
+            if name in ("done", "error"):
+                return
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream' if use_sse else 'application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/analizar_partido', methods=['GET', 'POST'])
 def analizar_partido():
     if request.method == 'POST':
+        from modules.estudio_scraper import (
+            obtener_datos_completos_partido,
+            format_ah_as_decimal_string_of,
+            generar_analisis_mercado_simplificado,
+        )
         match_id = request.form.get('match_id')
         if match_id:
             print(f"Recibida petición para analizar partido finalizado ID: {match_id}")
-            datos_partido = obtener_datos_completos_partido(match_id)
+            datos_partido = obtener_datos_completos_partido(match_id, deadline=Deadline())
             if not datos_partido or "error" in datos_partido:
                 return render_template('analizar_partido.html', error=datos_partido.get('error', 'Error desconocido'))
             
@@ -155,24 +221,28 @@ def analizar_partido():
                 analisis_simplificado_html = generar_analisis_mercado_simplificado(main_odds, h2h_data, home_name, away_name)
 
             print(f"Datos obtenidos para {datos_partido['home_name']} vs {datos_partido['away_name']}. Renderizando plantilla...")
-            return render_template('estudio.html', 
-                                   data=datos_partido, 
-                                   format_ah=format_ah_as_decimal_string_of,
-                                   analisis_simplificado_html=analisis_simplificado_html)
+            return render_cached_content('estudio.html',
+                                         [datos_partido, analisis_simplificado_html],
+                                         data=datos_partido,
+                                         format_ah=format_ah_as_decimal_string_of,
+                                         analisis_simplificado_html=analisis_simplificado_html)
         else:
             return render_template('analizar_partido.html', error="Por favor, introduce un ID de partido válido.")
     return render_template('analizar_partido.html')
 
 @app.route('/api/preview/<string:match_id>')
 def api_preview(match_id):
+    # El presupuesto empieza a contar antes de importar el scraper
+    deadline = Deadline()
     try:
+        from modules.estudio_scraper import obtener_datos_preview_rapido, obtener_datos_preview_ligero
         mode = request.args.get('mode', 'light').lower()
         if mode in ['full', 'selenium']:
             # La versión con Playwright es más pesada y propensa a fallar en servidores
-            preview_data = obtener_datos_preview_rapido(match_id)
+            preview_data = obtener_datos_preview_rapido(match_id, deadline=deadline)
         else:
             # La versión ligera con requests es preferible
-            preview_data = obtener_datos_preview_ligero(match_id)
+            preview_data = obtener_datos_preview_ligero(match_id, deadline=deadline)
         
         # Si la propia función de scraping devuelve un error, lo pasamos
         if isinstance(preview_data, dict) and "error" in preview_data:
@@ -1,67 +1,5 @@
+# app_utils.py - Helpers ligeros para las rutas de listas
+# El parseo y los tramos de hándicap viven en handicap.py (una sola versión memorizada).
+from handicap import bucket_ah_to_half, normalize_handicap_to_half_bucket_str, parse_ah_to_number_of
 
-import re
-import math
-
-def _parse_number_clean(s: str):
-    if s is None:
-        return None
-    txt = str(s).strip()
-    txt = txt.replace('−', '-')  # unicode minus
-    txt = txt.replace(',', '.')
-    txt = txt.replace('+', '')
-    txt = txt.replace(' ', '')
-    m = re.search(r"^[+-]?\d+(?:\.\d+)?$", txt)
-    if m:
-        try:
-            return float(m.group(0))
-        except ValueError:
-            return None
-    return None
-
-def _parse_handicap_to_float(text: str):
-    if text is None:
-        return None
-    t = str(text).strip()
-    if '/' in t:
-        parts = [p for p in re.split(r"/", t) if p]
-        nums = []
-        for p in parts:
-            v = _parse_number_clean(p)
-            if v is None:
-                return None
-            nums.append(v)
-        if not nums:
-            return None
-        return sum(nums) / len(nums)
-    return _parse_number_clean(t.replace('+', ''))
-
-def _bucket_to_half(value: float) -> float:
-    if value is None:
-        return None
-    if value == 0:
-        return 0.0
-    sign = -1.0 if value < 0 else 1.0
-    av = abs(value)
-    base = math.floor(av + 1e-9)
-    frac = av - base
-    def close(a, b):
-        return abs(a - b) < 1e-6
-    if close(frac, 0.0):
-        bucket = float(base)
-    elif close(frac, 0.5) or close(frac, 0.25) or close(frac, 0.75):
-        bucket = base + 0.5
-    else:
-        bucket = round(av * 2) / 2.0
-        f = bucket - math.floor(bucket)
-        if close(f, 0.0) and (abs(av - (math.floor(bucket) + 0.25)) < 0.26 or abs(av - (math.floor(bucket) + 0.75)) < 0.26):
-            bucket = math.floor(bucket) + 0.5
-    return sign * bucket
-
-def normalize_handicap_to_half_bucket_str(text: str):
-    v = _parse_handicap_to_float(text)
-    if v is None:
-        return None
-    b = _bucket_to_half(v)
-    if b is None:
-        return None
-    return f"{b:.1f}"
+__all__ = ["bucket_ah_to_half", "normalize_handicap_to_half_bucket_str", "parse_ah_to_number_of"]
@@ -0,0 +1,231 @@
+# backfill.py - Crawler reanudable del histórico de resultados
+# Recorre las páginas de resultados de nowgoal día a día (la misma ruta football/results
+# que usa get_main_page_finished_matches_async) y guarda los partidos finalizados en
+# ficheros JSONL particionados por mes. Opcionalmente baja también la página h2h
+# (parseada en el pool de procesos de parse_pool) y las estadísticas de la página live
+# de cada partido nuevo.
+#
+# Es reanudable: los días terminados quedan en checkpoint.json y los ids ya guardados
+# se leen de las particiones al arrancar, así que relanzarlo no repite trabajo.
+#
+#   python backfill.py --desde 2025-06-01 --hasta 2025-09-30 --h2h --stats
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from scraping_logic import (RESULTS_PATH_BY_DATE, STREAM_CHUNK_BYTES, _build_nowgoal_url, _declared_encoding,
+                            _get_shared_requests_session, iter_main_page_finished_matches)
+
+BACKFILL_DIR = 'historico'
+# La página de resultados de un día concreto es RESULTS_PATH_BY_DATE (la misma que usan
+# las listas de finalizados); si la web cambia el formato se puede pasar otra con --ruta.
+BACKFILL_CONCURRENCY = 4
+BACKFILL_REQUEST_TIMEOUT_SECONDS = 15
+DETAILS_CHUNK_SIZE = 50
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def _partition_name(time_obj_iso):
+    return f"{time_obj_iso[:7]}.jsonl"  # '2025-10-12T02:35:00' -> '2025-10.jsonl'
+
+
+class BackfillStore:
+    """
+    Salida del crawler en `root`:
+      finished/AAAA-MM.jsonl  un partido finalizado por línea (mismo esquema que finished_matches)
+      detalles/AAAA-MM.jsonl  registro de la página h2h (+ estadísticas) por partido
+      checkpoint.json         días ya recorridos
+    """
+
+    def __init__(self, root=BACKFILL_DIR):
+        self.root = root
+        self.finished_dir = os.path.join(root, 'finished')
+        self.details_dir = os.path.join(root, 'detalles')
+        os.makedirs(self.finished_dir, exist_ok=True)
+        os.makedirs(self.details_dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(root, 'checkpoint.json')
+        self._lock = threading.Lock()
+        self.done_dates = set(self._load_checkpoint().get('done_dates', []))
+        self.finished_ids = self._ids_in(self.finished_dir, 'id')
+        self.detail_ids = self._ids_in(self.details_dir, 'match_id')
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Checkpoint ilegible ({e}); se recorrerán todos los días de nuevo.")
+            return {}
+
+    @staticmethod
+    def _ids_in(directory, key):
+        ids = set()
+        for name in os.listdir(directory):
+            if not name.endswith('.jsonl'):
+                continue
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        ids.add(str(json.loads(line)[key]))
+                    except (json.JSONDecodeError, KeyError):
+                        continue  # línea a medias de una ejecución cortada
+        return ids
+
+    def _append(self, directory, records, time_key):
+        by_partition = {}
+        for record in records:
+            by_partition.setdefault(_partition_name(record[time_key]), []).append(record)
+        for name, items in by_partition.items():
+            path = os.path.join(directory, name)
+            with open(path, 'a', encoding='utf-8') as f:
+                if f.tell() and not _ends_with_newline(path):
+                    f.write('\n')  # no pegar registros a una línea cortada por una ejecución anterior
+                for item in items:
+                    f.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def add_finished(self, matches):
+        """Guarda los partidos que no estaban ya. Devuelve la lista de los nuevos."""
+        with self._lock:
+            new = [m for m in matches if str(m['id']) not in self.finished_ids]
+            self._append(self.finished_dir, new, 'time_obj')
+            self.finished_ids.update(str(m['id']) for m in new)
+        return new
+
+    def add_details(self, records):
+        with self._lock:
+            new = [r for r in records if r['match_id'] not in self.detail_ids]
+            self._append(self.details_dir, new, 'time_obj')
+            self.detail_ids.update(r['match_id'] for r in new)
+
+    def mark_date_done(self, day):
+        with self._lock:
+            self.done_dates.add(day.isoformat())
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'done_dates': sorted(self.done_dates)}, f)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    def finished_paths(self):
+        """Particiones de finalizados, para backtest.load_archive(data_paths=...)."""
+        return sorted(os.path.join(self.finished_dir, n) for n in os.listdir(self.finished_dir) if n.endswith('.jsonl'))
+
+
+def _fetch_results_day(day, path_template, pause):
+    url = _build_nowgoal_url(path_template.format(date=day))
+    if pause:
+        time.sleep(pause)
+    with _get_shared_requests_session().get(url, timeout=BACKFILL_REQUEST_TIMEOUT_SECONDS, stream=True) as response:
+        response.raise_for_status()
+        matches = list(iter_main_page_finished_matches(response.iter_content(STREAM_CHUNK_BYTES), _declared_encoding(response)))
+    matches.sort(key=lambda m: m['time_obj'], reverse=True)
+    return matches
+
+
+def _fetch_stats_rows(match_id):
+    from modules.estudio_scraper import get_match_progression_stats_data, stats_to_rows
+    return stats_to_rows(get_match_progression_stats_data(match_id))
+
+
+def _backfill_details(store, matches, with_h2h, with_stats, concurrency):
+    """Detalles de los partidos que aún no los tienen. Devuelve cuántos fallaron."""
+    import parse_pool
+    by_id = {str(m['id']): m for m in matches if str(m['id']) not in store.detail_ids}
+    ids = list(by_id)
+    failed = 0
+    for start in range(0, len(ids), DETAILS_CHUNK_SIZE):
+        chunk = ids[start:start + DETAILS_CHUNK_SIZE]
+        records = parse_pool.warm_matches(chunk, fetch_workers=concurrency) if with_h2h else \
+            {mid: {"match_id": mid} for mid in chunk}
+        if with_stats:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = {pool.submit(_fetch_stats_rows, mid): mid for mid in chunk}
+                for future in as_completed(futures):
+                    try:
+                        records[futures[future]]["stats"] = future.result()
+                    except Exception as e:
+                        records[futures[future]]["stats_error"] = f"{type(e).__name__}: {e}"
+        ok = []
+        for mid, record in records.items():
+            if "error" in record:
+                failed += 1
+                print(f"  h2h {mid}: {record['error']} (se reintentará en la próxima ejecución)")
+                continue
+            record["time_obj"] = by_id[mid]["time_obj"]
+            ok.append(record)
+        store.add_details(ok)
+    return failed
+
+
+def run_backfill(date_from, date_to, store=None, concurrency=BACKFILL_CONCURRENCY, with_h2h=False,
+                 with_stats=False, path_template=RESULTS_PATH_BY_DATE, pause=0.0):
+    """
+    Recorre los días [date_from, date_to] (del más reciente al más antiguo) que no estén
+    en el checkpoint, con como mucho `concurrency` descargas a la vez. Un día solo se
+    marca como hecho cuando sus partidos (y detalles, si se piden) están en disco.
+    """
+    store = store or BackfillStore()
+    days = [date_to - datetime.timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    pending = [d for d in days if d.isoformat() not in store.done_dates]
+    print(f"Backfill {date_from} -> {date_to}: {len(pending)} días pendientes de {len(days)}.")
+    totals = {"days": 0, "new_matches": 0, "failed_days": 0}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(_fetch_results_day, d, path_template, pause): d for d in pending}
+        for future in as_completed(futures):
+            day = futures[future]
+            try:
+                matches = future.result()
+            except Exception as e:
+                totals["failed_days"] += 1
+                print(f"  {day}: error ({type(e).__name__}: {e}); queda pendiente.")
+                continue
+            new = store.add_finished(matches)
+            totals["new_matches"] += len(new)
+            failed = _backfill_details(store, matches, with_h2h, with_stats, concurrency) if (with_h2h or with_stats) else 0
+            print(f"  {day}: {len(matches)} partidos, {len(new)} nuevos" + (f", {failed} detalles con error." if failed else "."))
+            if failed:
+                totals["failed_days"] += 1
+                continue  # sin checkpoint: la próxima ejecución reintenta solo los detalles que faltan
+            store.mark_date_done(day)
+            totals["days"] += 1
+    return totals
+
+
+def _parse_date(text):
+    return datetime.date.fromisoformat(text)
+
+
+def main(argv=None):
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Backfill reanudable de resultados históricos.")
+    parser.add_argument('--desde', type=_parse_date, default=yesterday - datetime.timedelta(days=29))
+    parser.add_argument('--hasta', type=_parse_date, default=yesterday)
+    parser.add_argument('--salida', default=BACKFILL_DIR)
+    parser.add_argument('--concurrencia', type=int, default=BACKFILL_CONCURRENCY)
+    parser.add_argument('--pausa', type=float, default=0.0, help="segundos de espera antes de cada página de resultados")
+    parser.add_argument('--h2h', action='store_true', help="bajar y parsear también la página h2h de cada partido")
+    parser.add_argument('--stats', action='store_true', help="bajar también las estadísticas de la página live")
+    parser.add_argument('--ruta', default=RESULTS_PATH_BY_DATE, help="plantilla de la ruta de resultados por día")
+    args = parser.parse_args(argv)
+
+    totals = run_backfill(args.desde, args.hasta, BackfillStore(args.salida), args.concurrencia,
+                          args.h2h, args.stats, args.ruta, args.pausa)
+    print(f"Terminado: {totals['days']} días, {totals['new_matches']} partidos nuevos, "
+          f"{totals['failed_days']} días con error.")
+    if args.h2h:
+        import parse_pool
+        parse_pool.shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
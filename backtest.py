@@ -0,0 +1,308 @@
+# backtest.py - Backtesting de reglas de hándicap asiático sobre partidos finalizados
+# Carga los finalizados de data.json (y el historial persistente de team_history.json)
+# en arrays por columnas, evalúa reglas como "el favorito cubrió el último H2H" o
+# "la línea se movió >= 0.25 respecto a la media reciente" sobre todo el archivo y
+# reporta acierto / ROI por tramo de hándicap. Las rejillas de parámetros se reparten
+# entre varios procesos.
+#
+#   python backtest.py movimiento_linea --grid umbral=0.25,0.5 --grid ventana=3,5
+import argparse
+import datetime
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from handicap import normalize_handicap_to_half_bucket_str, parse_ah_to_number_of
+from modules.liquidacion_ah import HALF_LOSS, HALF_WIN, INVALID, LOSS, PUSH, WIN, settle_asian_handicap
+from modules.nombres_equipos import normalize_team_name
+from team_history import TEAM_HISTORY_FILE, TeamHistoryIndex
+
+DATA_FILE = 'data.json'
+DEFAULT_BACKTEST_ODDS = 2.0
+_NO_MATCH = -1
+
+
+def _parse_goals(score):
+    try:
+        home, away = str(score).replace(':', '-').split('-')
+        return float(home), float(away)
+    except (ValueError, AttributeError):
+        return np.nan, np.nan
+
+
+def _finished_rows(path):
+    """finished_matches de un data.json o de una partición JSONL del backfill (un partido por línea)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            matches = [json.loads(line) for line in f if line.strip()]
+        else:
+            matches = json.load(f).get('finished_matches', [])
+    rows = []
+    for m in matches:
+        try:
+            when = datetime.datetime.fromisoformat(m['time_obj'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        rows.append((str(m.get('id')), when, m.get('home_team'), m.get('away_team'),
+                     m.get('score'), m.get('handicap'), m.get('goal_line')))
+    return rows
+
+
+def _history_rows(path):
+    if not os.path.exists(path):
+        return []
+    rows = []
+    for r in TeamHistoryIndex(path).all_rows():
+        try:
+            when = datetime.datetime.strptime(r.get('date', ''), '%d-%m-%Y')
+        except ValueError:
+            continue
+        rows.append((str(r['match_id']), when, r['home'], r['away'], r['score'], r.get('ah_raw'), None))
+    return rows
+
+
+class MatchArchive:
+    """
+    Partidos finalizados en columnas (arrays de NumPy del mismo largo, ordenados por
+    fecha). Las líneas van en la convención de la web: positiva = el local da goles.
+    Las características derivadas (medias de línea, H2H previo) se calculan una vez y
+    se cachean, así que evaluar muchas combinaciones de parámetros es barato.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda r: r[1])
+        self.match_ids = np.array([r[0] for r in rows], dtype=object)
+        self.kickoff = np.array([r[1] for r in rows], dtype='datetime64[m]')
+        self.home_keys = np.array([normalize_team_name(r[2]) for r in rows], dtype=object)
+        self.away_keys = np.array([normalize_team_name(r[3]) for r in rows], dtype=object)
+        goals = np.array([_parse_goals(r[4]) for r in rows], dtype=np.float64).reshape(-1, 2)
+        self.home_goals, self.away_goals = goals[:, 0], goals[:, 1]
+        self.lines = np.array([_line_or_nan(r[5]) for r in rows], dtype=np.float64)
+        self.goal_lines = np.array([_line_or_nan(r[6]) for r in rows], dtype=np.float64)
+        self.buckets = np.array([normalize_handicap_to_half_bucket_str(r[5]) or '-' for r in rows], dtype=object)
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    def __getstate__(self):
+        # Los procesos del pool recalculan sus propias características
+        state = dict(self.__dict__)
+        state['_cache'] = {}
+        return state
+
+    def _team_rows(self):
+        """{clave de equipo: [(fila, +1 si jugaba de local / -1 de visitante), ...]} en orden de fecha."""
+        if 'team_rows' not in self._cache:
+            team_rows = {}
+            for i, (home, away) in enumerate(zip(self.home_keys, self.away_keys)):
+                team_rows.setdefault(home, []).append((i, 1))
+                team_rows.setdefault(away, []).append((i, -1))
+            self._cache['team_rows'] = team_rows
+        return self._cache['team_rows']
+
+    def recent_line_average(self, window, side):
+        """
+        Media de la línea (vista desde el equipo: positiva = daba goles) de los `window`
+        partidos anteriores del local (side=1) o del visitante (side=-1). NaN sin datos.
+        """
+        key = ('recent_avg', window, side)
+        if key not in self._cache:
+            out = np.full(len(self), np.nan)
+            keys = self.home_keys if side == 1 else self.away_keys
+            for team, entries in self._team_rows().items():
+                if not team:
+                    continue
+                idx = np.array([i for i, _ in entries])
+                team_lines = self.lines[idx] * np.array([s for _, s in entries])
+                known = ~np.isnan(team_lines)
+                sums = np.concatenate(([0.0], np.cumsum(np.where(known, team_lines, 0.0))))
+                counts = np.concatenate(([0], np.cumsum(known)))
+                pos = np.arange(len(idx))
+                start = np.maximum(pos - window, 0)
+                n = counts[pos] - counts[start]
+                avg = np.where(n > 0, (sums[pos] - sums[start]) / np.maximum(n, 1), np.nan)
+                mine = keys[idx] == team
+                out[idx[mine]] = avg[mine]
+            self._cache[key] = out
+        return self._cache[key]
+
+    def previous_h2h(self):
+        """Índice del enfrentamiento anterior entre los mismos dos equipos (-1 si no hay)."""
+        if 'prev_h2h' not in self._cache:
+            prev = np.full(len(self), _NO_MATCH, dtype=np.int64)
+            last_seen = {}
+            for i, (home, away) in enumerate(zip(self.home_keys, self.away_keys)):
+                if not home or not away:
+                    continue
+                pair = frozenset((home, away))
+                prev[i] = last_seen.get(pair, _NO_MATCH)
+                last_seen[pair] = i
+            self._cache['prev_h2h'] = prev
+        return self._cache['prev_h2h']
+
+    def favorite_outcomes(self):
+        """Resultado de apostar al favorito de cada partido con su propia línea (INVALID si línea 0)."""
+        if 'fav_outcome' not in self._cache:
+            fav_side = np.sign(self.lines)
+            outcome, _ = settle_asian_handicap(self.home_goals, self.away_goals, self.lines,
+                                               np.nan_to_num(fav_side))
+            self._cache['fav_outcome'] = outcome
+        return self._cache['fav_outcome']
+
+
+def _line_or_nan(raw):
+    value = parse_ah_to_number_of(raw) if isinstance(raw, str) else None
+    return np.nan if value is None else value
+
+
+def load_archive(data_paths=(DATA_FILE,), history_path=TEAM_HISTORY_FILE):
+    """Archivo de partidos finalizados: data.json(s) + historial de equipos, sin duplicados por id."""
+    by_id = {}
+    if history_path:
+        for row in _history_rows(history_path):
+            by_id[row[0]] = row
+    for path in data_paths:
+        for row in _finished_rows(path):
+            by_id[row[0]] = row  # la lista principal manda: trae la línea de cierre
+    return MatchArchive(by_id.values())
+
+
+# --- Reglas -------------------------------------------------------------------
+# Cada regla recibe el archivo y sus parámetros y devuelve (mask, perspective):
+# qué partidos se apuestan y a qué lado (+1 local, -1 visitante).
+
+def rule_favorito_cubrio_ultimo_h2h(archive, cubrio=True, apostar='favorito'):
+    """Apuesta en los partidos cuyo último H2H lo cubrió (o no) el favorito de entonces."""
+    prev = archive.previous_h2h()
+    has_prev = prev != _NO_MATCH
+    prev_outcome = np.where(has_prev, archive.favorite_outcomes()[np.where(has_prev, prev, 0)], INVALID)
+    settled = has_prev & (prev_outcome != INVALID) & (prev_outcome != PUSH)
+    condition = prev_outcome > 0 if cubrio else prev_outcome < 0
+    fav_side = np.sign(np.nan_to_num(archive.lines))
+    mask = settled & condition & (fav_side != 0)
+    return mask, fav_side if apostar == 'favorito' else -fav_side
+
+
+def rule_movimiento_linea(archive, umbral=0.25, ventana=5, apostar='con_movimiento'):
+    """
+    Apuesta cuando la línea actual se separa >= umbral de la media reciente del local
+    (como comparar_lineas_handicap_recientes). 'con_movimiento' apuesta al lado hacia el
+    que se movió el mercado; 'contra_movimiento', al otro.
+    """
+    movement = archive.lines - archive.recent_line_average(ventana, 1)
+    mask = ~np.isnan(movement) & (np.abs(movement) >= umbral - 1e-9)
+    side = np.sign(np.nan_to_num(movement))
+    return mask, side if apostar == 'con_movimiento' else -side
+
+
+RULES = {
+    'favorito_cubrio_ultimo_h2h': rule_favorito_cubrio_ultimo_h2h,
+    'movimiento_linea': rule_movimiento_linea,
+}
+
+
+# --- Evaluación ---------------------------------------------------------------
+
+def _summary(outcome, pnl):
+    bets = int(outcome.size)
+    counts = {label: int(np.count_nonzero(outcome == code)) for label, code in
+              (('wins', WIN), ('half_wins', HALF_WIN), ('pushes', PUSH), ('half_losses', HALF_LOSS), ('losses', LOSS))}
+    decided = bets - counts['pushes']
+    total_pnl = float(pnl.sum()) if bets else 0.0
+    return {
+        'bets': bets, **counts,
+        'hit_rate': round((counts['wins'] + counts['half_wins']) / decided, 4) if decided else None,
+        'pnl': round(total_pnl, 4),
+        'roi': round(total_pnl / bets, 4) if bets else None,
+    }
+
+
+def evaluate(archive, rule_name, params=None, odds=DEFAULT_BACKTEST_ODDS):
+    """Evalúa una regla con unos parámetros: totales y desglose por tramo de hándicap."""
+    params = params or {}
+    mask, perspective = RULES[rule_name](archive, **params)
+    outcome, pnl = settle_asian_handicap(archive.home_goals, archive.away_goals, archive.lines, perspective, odds)
+    mask = mask & (outcome != INVALID)
+    outcome, pnl, buckets = outcome[mask], pnl[mask], archive.buckets[mask]
+    by_bucket = {}
+    for bucket in sorted(set(buckets), key=lambda b: _line_or_nan(b) if b != '-' else np.inf):
+        selected = buckets == bucket
+        by_bucket[bucket] = _summary(outcome[selected], pnl[selected])
+    return {'rule': rule_name, 'params': params, **_summary(outcome, pnl), 'by_bucket': by_bucket}
+
+
+def expand_grid(grid):
+    """{'umbral': [0.25, 0.5], 'ventana': [3, 5]} -> lista de combinaciones de parámetros."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+_worker_archive = None
+
+
+def _init_worker(archive):
+    global _worker_archive
+    _worker_archive = archive
+
+
+def _evaluate_in_worker(job):
+    rule_name, params, odds = job
+    return evaluate(_worker_archive, rule_name, params, odds)
+
+
+def run_grid(archive, rule_name, grid, processes=None, odds=DEFAULT_BACKTEST_ODDS):
+    """Evalúa todas las combinaciones de la rejilla (en varios procesos) y las ordena por ROI."""
+    jobs = [(rule_name, params, odds) for params in expand_grid(grid)]
+    if processes == 1 or len(jobs) <= 1:
+        results = [evaluate(archive, *job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(archive,)) as pool:
+            results = list(pool.map(_evaluate_in_worker, jobs, chunksize=max(1, len(jobs) // (4 * (processes or os.cpu_count() or 1)))))
+    return sorted(results, key=lambda r: r['roi'] if r['roi'] is not None else -np.inf, reverse=True)
+
+
+def _parse_grid_arg(items):
+    grid = {}
+    for item in items or []:
+        name, _, values = item.partition('=')
+        parsed = []
+        for v in values.split(','):
+            try:
+                parsed.append(json.loads(v))
+            except json.JSONDecodeError:
+                parsed.append(v)  # cadenas sin comillas: apostar=favorito,underdog
+        grid[name.strip()] = parsed
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtesting de reglas de hándicap asiático.")
+    parser.add_argument('rule', choices=sorted(RULES))
+    parser.add_argument('--grid', action='append', metavar='PARAM=V1,V2', help="valores a probar de un parámetro")
+    parser.add_argument('--data', action='append', help=f"ficheros con finished_matches o particiones .jsonl de backfill.py (por defecto {DATA_FILE})")
+    parser.add_argument('--history', default=TEAM_HISTORY_FILE, help="historial de equipos ('' para no usarlo)")
+    parser.add_argument('--cuota', type=float, default=DEFAULT_BACKTEST_ODDS, help="cuota decimal de cada apuesta")
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--json', dest='json_out', help="guardar los resultados completos en este fichero")
+    args = parser.parse_args(argv)
+
+    archive = load_archive(args.data or [DATA_FILE], args.history)
+    print(f"Archivo cargado: {len(archive)} partidos finalizados.")
+    results = run_grid(archive, args.rule, _parse_grid_arg(args.grid), args.procesos, args.cuota)
+    for r in results:
+        print(f"{json.dumps(r['params'], ensure_ascii=False)}: {r['bets']} apuestas, acierto {r['hit_rate']}, ROI {r['roi']}")
+        for bucket, s in r['by_bucket'].items():
+            print(f"    AH {bucket:>5}: {s['bets']:4d} apuestas, acierto {s['hit_rate']}, ROI {s['roi']}")
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# deadline.py - Presupuesto de tiempo por petición
+import time
+
+# El frontend abandona la petición hacia los 30 s: lo que termine después se tira.
+# Dejamos margen para serializar la respuesta / renderizar la plantilla.
+REQUEST_BUDGET_SECONDS = 25.0
+
+
+class Deadline:
+    """
+    Instante límite (time.monotonic) de una petición. Se crea en la ruta y se pasa a
+    todas las etapas (descargas, esperas de Selenium, análisis), que solo consumen
+    lo que queda del presupuesto en lugar de usar cada una su propio timeout.
+    """
+    __slots__ = ("at",)
+
+    def __init__(self, seconds: float = REQUEST_BUDGET_SECONDS):
+        self.at = time.monotonic() + seconds
+
+    @classmethod
+    def ensure(cls, deadline, seconds: float = REQUEST_BUDGET_SECONDS):
+        """Devuelve el deadline recibido o uno nuevo si la llamada no traía ninguno."""
+        return deadline if deadline is not None else cls(seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self, cap: float) -> float:
+        """Timeout para una etapa concreta: su límite habitual, recortado a lo que queda."""
+        return min(self.remaining(), cap)
+
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining():.2f}s)"
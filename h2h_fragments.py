@@ -0,0 +1,86 @@
+# h2h_fragments.py - Parseo parcial de las páginas h2h
+# Las páginas /match/h2h-<id> se parseaban enteras con BeautifulSoup(..., 'lxml'),
+# pero los scrapers solo leen table_v1/v2/v3, div#porletP4, div#mScore, las filas
+# earlyOdds, el script de _matchInfo y los paneles de comparativas indirectas
+# (div.football-history-list). El resto (menús, publicidad, otros scripts) es la mayor
+# parte de la página. Aquí se localizan esos fragmentos por su posición en el texto y
+# solo ellos se parsean, en un árbol pequeño sobre el que funcionan las mismas
+# búsquedas (soup.find(...), soup.select(...)) que sobre la página completa.
+from bs4 import BeautifulSoup, UnicodeDammit
+
+import html_patterns as pat
+
+_SCRIPT_OPEN = "<script"
+_SCRIPT_CLOSE = "</script>"
+
+
+def _fragment_end(html, tag, start):
+    """Posición tras el cierre que equilibra la etiqueta `tag` abierta en `start`."""
+    depth = 0
+    for m in pat.TAG_BOUNDARY_RE[tag].finditer(html, start):
+        depth += -1 if m.group(1) else 1
+        if depth == 0:
+            return m.end()
+    return len(html)  # sin cierre: hasta el final, lxml lo cierra
+
+
+def _match_info_span(html):
+    m = pat.MATCH_INFO_RE.search(html)
+    if not m:
+        return None
+    start = html.rfind(_SCRIPT_OPEN, 0, m.start())
+    end = html.find(_SCRIPT_CLOSE, m.end())
+    if start < 0 or end < 0:
+        return None
+    return start, end + len(_SCRIPT_CLOSE)
+
+
+def h2h_fragment_spans(html):
+    """
+    (inicio, fin, es_fila) de cada fragmento útil de `html`, en orden y sin solapes (un
+    fragmento dentro de otro ya incluido se descarta). es_fila marca las filas earlyOdds,
+    que hay que envolver en una tabla para que lxml no las descarte.
+    """
+    spans = []
+    seen_ids = set()
+    for start_re, tag in ((pat.H2H_TABLE_START_RE, "table"), (pat.H2H_DIV_START_RE, "div")):
+        for m in start_re.finditer(html):
+            if m.group(1) in seen_ids:
+                continue  # el id es único; una repetición sería de algún script
+            seen_ids.add(m.group(1))
+            spans.append((m.start(), _fragment_end(html, tag, m.start()), False))
+    for m in pat.HISTORY_LIST_START_RE.finditer(html):
+        spans.append((m.start(), _fragment_end(html, "div", m.start()), False))
+    for m in pat.EARLY_ODDS_ROW_START_RE.finditer(html):
+        spans.append((m.start(), _fragment_end(html, "tr", m.start()), True))
+    if script := _match_info_span(html):
+        spans.append(script + (False,))
+    spans.sort()
+    result = []
+    last_end = 0
+    for start, end, is_row in spans:
+        if start < last_end:
+            continue
+        result.append((start, end, is_row))
+        last_end = end
+    return result
+
+
+def parse_h2h_fragments(html):
+    """
+    BeautifulSoup con solo los fragmentos útiles de una página h2h (str o bytes). Si la
+    página no trae ninguno (página de error, maqueta distinta), se parsea entera.
+    """
+    if isinstance(html, bytes):
+        text = UnicodeDammit(html, is_html=True).unicode_markup
+        if text is None:
+            return BeautifulSoup(html, "lxml")
+        html = text
+    spans = h2h_fragment_spans(html or "")
+    if not spans:
+        return BeautifulSoup(html, "lxml")
+    parts = []
+    for start, end, is_row in spans:
+        fragment = html[start:end]
+        parts.append(f"<table>{fragment}</table>" if is_row else fragment)
+    return BeautifulSoup(f"<html><body>{''.join(parts)}</body></html>", "lxml")
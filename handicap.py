@@ -0,0 +1,122 @@
+# handicap.py - Parseo y formato de líneas de hándicap asiático (versión única)
+# Antes había una copia en estudio_scraper, modules/utils, ficheros_soporte/estudio y
+# app_utils. Se llaman para cada fila de cada tabla con un puñado de valores distintos
+# ("0/0.5", "-1", "2.25"...), así que los resultados se memorizan (caché acotada).
+import math
+from functools import lru_cache
+
+_CACHE_SIZE = 2048
+
+
+def _clean(ah_line_str: str) -> str:
+    return (ah_line_str.strip().replace(' ', '').replace('−', '-')
+            .replace(',', '.').replace('+', ''))
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _parse_cached(ah_line_str: str):
+    s = _clean(ah_line_str)
+    if not s or s in ['-', '?']: return None
+    original_starts_with_minus = s.startswith('-')
+    try:
+        if '/' in s:
+            parts = s.split('/')
+            if len(parts) != 2: return None
+            p1_str, p2_str = parts[0], parts[1]
+            val1 = float(p1_str)
+            val2 = float(p2_str)
+            # "-0.5/1" y "-0/0.5": el signo de la primera mitad vale para las dos
+            if val1 < 0 and not p2_str.startswith('-') and val2 > 0:
+                val2 = -abs(val2)
+            elif original_starts_with_minus and val1 == 0.0 and \
+                 (p1_str == "0" or p1_str == "-0") and \
+                 not p2_str.startswith('-') and val2 > 0:
+                val2 = -abs(val2)
+            value = (val1 + val2) / 2.0
+        else:
+            value = float(s)
+    except (ValueError, IndexError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def parse_ah_to_number_of(ah_line_str: str):
+    """'0/0.5' -> 0.25, '-1' -> -1.0, '+0.5' -> 0.5; None si no es una línea."""
+    if not isinstance(ah_line_str, str): return None
+    return _parse_cached(ah_line_str)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _format_cached(ah_line_str: str, for_sheets: bool):
+    stripped = ah_line_str.strip()
+    if not stripped or stripped in ['-', '?']:
+        return stripped if stripped in ['-', '?'] else '-'
+    numeric_value = _parse_cached(ah_line_str)
+    if numeric_value is None:
+        return '-'
+    if numeric_value == 0.0:
+        return "0"
+    sign = -1 if numeric_value < 0 else 1
+    abs_num = abs(numeric_value)
+    mod_val = abs_num % 1
+    if mod_val in (0.0, 0.25, 0.5, 0.75): abs_rounded = abs_num
+    elif mod_val < 0.25: abs_rounded = math.floor(abs_num)
+    elif mod_val < 0.75: abs_rounded = math.floor(abs_num) + 0.5
+    else: abs_rounded = math.ceil(abs_num)
+    final_value_signed = sign * abs_rounded
+    if final_value_signed == 0.0: output_str = "0"
+    elif abs(final_value_signed - round(final_value_signed, 0)) < 1e-9: output_str = str(int(round(final_value_signed, 0)))
+    elif abs(final_value_signed - (math.floor(final_value_signed) + 0.5)) < 1e-9: output_str = f"{final_value_signed:.1f}"
+    else: output_str = f"{final_value_signed:.2f}"
+    if for_sheets:
+        return "'" + output_str.replace('.', ',')
+    return output_str
+
+
+def format_ah_as_decimal_string_of(ah_line_str: str, for_sheets=False):
+    """Línea en decimal redondeada a cuartos ('0/0.5' -> '0.25'); '-' si no hay línea."""
+    if not isinstance(ah_line_str, str):
+        return '-'
+    return _format_cached(ah_line_str, bool(for_sheets))
+
+
+def format_ah_for_sheets(ah_line_str: str):
+    """Variante para Google Sheets: "'0,25" (apóstrofo para que no la convierta en fecha)."""
+    return format_ah_as_decimal_string_of(ah_line_str, for_sheets=True)
+
+
+def bucket_ah_to_half(value: float):
+    """Agrupa una línea en tramos de media: los cuartos suben a la media (0.25 / 0.75 -> 0.5)."""
+    if value is None:
+        return None
+    if value == 0:
+        return 0.0
+    sign = -1.0 if value < 0 else 1.0
+    av = abs(value)
+    base = math.floor(av + 1e-9)
+    frac = av - base
+    def close(a, b):
+        return abs(a - b) < 1e-6
+    if close(frac, 0.0):
+        bucket = float(base)
+    elif close(frac, 0.5) or close(frac, 0.25) or close(frac, 0.75):
+        bucket = base + 0.5
+    else:
+        bucket = round(av * 2) / 2.0
+        f = bucket - math.floor(bucket)
+        if close(f, 0.0) and (abs(av - (math.floor(bucket) + 0.25)) < 0.26 or abs(av - (math.floor(bucket) + 0.75)) < 0.26):
+            bucket = math.floor(bucket) + 0.5
+    return sign * bucket
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _half_bucket_str_cached(text: str):
+    b = bucket_ah_to_half(_parse_cached(text))
+    return None if b is None else f"{b:.1f}"
+
+
+def normalize_handicap_to_half_bucket_str(text):
+    """Tramo de media de una línea como texto ('0.75' -> '0.5', '-1.25' -> '-1.5'), o None."""
+    if text is None:
+        return None
+    return _half_bucket_str_cached(str(text))
@@ -0,0 +1,67 @@
+# html_patterns.py - Expresiones regulares de las páginas de nowgoal
+# Los scrapers compilaban los patrones dentro de los bucles (uno por fila, por enlace o
+# por llamada) y alguno estaba doblemente escapado (r"tr1_\\d+" busca una barra literal
+# y no casaba nunca). Aquí se compilan una vez y se comparten; test_html_patterns.py
+# los comprueba contra el HTML guardado en muestra_sin_fallos/html_extraer.
+import re
+
+# --- Páginas h2h (/match/h2h-<id>) ---------------------------------------------------
+# Filas de las tablas de historial: table_v1 (local), table_v2 (visitante), table_v3 (H2H)
+HISTORY_ROW_RE = {n: re.compile(rf"tr{n}_\d+") for n in "123"}
+HOME_ROW_RE = HISTORY_ROW_RE["1"]
+AWAY_ROW_RE = HISTORY_ROW_RE["2"]
+H2H_ROW_RE = HISTORY_ROW_RE["3"]
+# Id de equipo en el onclick de los enlaces: team(5144)
+TEAM_ID_RE = re.compile(r"team\((\d+)\)")
+# Script con los datos del partido y sus campos
+MATCH_INFO_RE = re.compile(r"var _matchInfo = ")
+MATCH_INFO_HOME_ID_RE = re.compile(r"hId:\s*parseInt\('(\d+)'\)")
+MATCH_INFO_AWAY_ID_RE = re.compile(r"gId:\s*parseInt\('(\d+)'\)")
+MATCH_INFO_LEAGUE_ID_RE = re.compile(r"sclassId:\s*parseInt\('(\d+)'\)")
+MATCH_INFO_HOME_NAME_RE = re.compile(r"hName:\s*'([^']*)'")
+MATCH_INFO_AWAY_NAME_RE = re.compile(r"gName:\s*'([^']*)'")
+MATCH_INFO_LEAGUE_NAME_RE = re.compile(r"lName:\s*'([^']*)'")
+MATCH_INFO_TIME_RE = re.compile(r"matchTime:\s*'([^']+)'")
+# startDate / doorTime van en el mismo script como variables sueltas: var doorTime = '...'
+START_DATE_RE = re.compile(r"startDate\s*[:=]\s*'([^']+)'")
+DOOR_TIME_RE = re.compile(r"doorTime\s*[:=]\s*'([^']+)'")
+CLOCK_RE = re.compile(r"(\d{2}):(\d{2})")
+# Fecha de las filas de historial: 09-09-2025
+DATE_DMY_RE = re.compile(r"(\d{2})-(\d{2})-(\d{4})")
+# Marcadores: '2-1', '2 - 1' (en cualquier parte) y separador '-' o ':'
+SCORE_RE = re.compile(r"(\d+)\s*-\s*(\d+)")
+SCORE_SPLIT_RE = re.compile(r"[-:]")
+# Clasificación: '[AFC U23-3]' -> 3; total del panel de over/under: '(12 games)'
+STANDINGS_RANK_RE = re.compile(r"\[.*?-(\d+)\]")
+OU_TOTAL_GAMES_RE = re.compile(r"\((\d+)\s*games\)")
+# Etiquetas de los paneles de comparativas indirectas
+COMPARISON_RES_RE = re.compile(r"Res\s*:")
+COMPARISON_AH_RE = re.compile(r"AH\s*:")
+COMPARISON_LOCALIA_RE = re.compile(r"Localía de")
+# Etiquetas de apertura de los fragmentos que se leen de la página (h2h_fragments.py)
+H2H_TABLE_START_RE = re.compile(r"""<table\b[^>]*\bid=["'](table_v[123])["']""", re.I)
+H2H_DIV_START_RE = re.compile(r"""<div\b[^>]*\bid=["'](porletP4|mScore)["']""", re.I)
+HISTORY_LIST_START_RE = re.compile(r"""<div\b[^>]*\bclass=["'][^"']*\bfootball-history-list\b""", re.I)
+EARLY_ODDS_ROW_START_RE = re.compile(r"""<tr\b[^>]*\bname=["']earlyOdds["']""", re.I)
+# Aperturas y cierres de una etiqueta, para encontrar dónde acaba un fragmento
+TAG_BOUNDARY_RE = {tag: re.compile(rf"<(/?){tag}\b[^>]*>", re.I) for tag in ("table", "div", "tr")}
+
+# --- Portada y resultados --------------------------------------------------------------
+# Marcador final completo de una fila de la lista ('2 - 1' y nada más)
+FINAL_SCORE_RE = re.compile(r"^\d+\s*-\s*\d+$")
+LIVE_ROW_ID_RE = re.compile(r"^tr1_(\d+)$")
+
+# --- Texto de cuotas -------------------------------------------------------------------
+SIGNED_NUMBER_RE = re.compile(r"^[+-]?\d+(?:\.\d+)?$")
+
+
+def history_row_re(table_id):
+    """Patrón de id de fila para 'table_v1' / 'table_v2' / 'table_v3'."""
+    pattern = HISTORY_ROW_RE.get(table_id[-1])
+    return pattern if pattern is not None else re.compile(rf"tr{re.escape(table_id[-1])}_\d+")
+
+
+def search_group(pattern, text, group=1):
+    """Grupo `group` de la primera coincidencia de `pattern` en `text`, o None."""
+    m = pattern.search(text or '')
+    return m.group(group) if m else None
@@ -0,0 +1,108 @@
+# list_cursors.py - Paginación por cursor de las listas de partidos
+# Con offset/limit cada página volvía a filtrar y ordenar la lista entera, y si
+# data.json se reescribía a mitad del scroll las filas se desplazaban (repetidas o
+# perdidas). Aquí la primera página guarda una instantánea corta: la tabla de esa
+# versión de data.json y los índices de fila ya filtrados y ordenados. El cursor que
+# se devuelve apunta a esa instantánea y a una posición, así que cada página siguiente
+# es un corte directo y sale de la misma versión aunque el fichero haya cambiado.
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+CURSOR_TTL_SECONDS = 600  # sin uso durante este tiempo, la instantánea se descarta
+MAX_SNAPSHOTS = 64        # las menos usadas salen primero
+
+
+class CursorExpired(Exception):
+    """El cursor apunta a una instantánea que ya no existe (caducada o desalojada)."""
+
+
+class _Snapshot:
+    __slots__ = ("key", "table", "rows", "touched")
+
+    def __init__(self, key, table, rows, touched):
+        self.key = key
+        self.table = table
+        self.rows = rows
+        self.touched = touched
+
+
+class CursorStore:
+    """
+    Instantáneas de listas filtradas por cursor. open() sirve la primera página y, si
+    quedan filas, devuelve el cursor de la siguiente; next() sigue desde un cursor. Los
+    cursores son opacos para el cliente ('<instantánea>.<posición>').
+    """
+
+    def __init__(self, ttl=CURSOR_TTL_SECONDS, max_snapshots=MAX_SNAPSHOTS, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_snapshots = max_snapshots
+        self._clock = clock
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def _evict_locked(self, now):
+        while self._snapshots:
+            snap_id, snap = next(iter(self._snapshots.items()))
+            if len(self._snapshots) <= self.max_snapshots and now - snap.touched <= self.ttl:
+                break
+            del self._snapshots[snap_id]
+
+    def _slice(self, snap_id, snap, start, limit):
+        end = len(snap.rows) if limit is None else start + max(int(limit), 0)
+        records = [snap.table.records[i] for i in snap.rows[start:end]]
+        next_cursor = f"{snap_id}.{end}" if end < len(snap.rows) else None
+        return records, next_cursor
+
+    def open(self, key, table, mask=None, order='file', offset=0, limit=None):
+        """
+        Primera página de `table` con la máscara y el orden dados: (registros, cursor de
+        la siguiente o None). `key` identifica la lista (p. ej. la sección) y se comprueba
+        al seguir el cursor.
+        """
+        rows = table.rows(mask, order)
+        start = max(int(offset or 0), 0)
+        snap = _Snapshot(key, table, np.asarray(rows, dtype=np.int32), self._clock())
+        snap_id = secrets.token_urlsafe(9)
+        records, next_cursor = self._slice(snap_id, snap, start, limit)
+        if next_cursor is not None:
+            with self._lock:
+                self._snapshots[snap_id] = snap
+                self._evict_locked(snap.touched)
+        return records, next_cursor
+
+    def next(self, key, cursor, limit=None):
+        """(registros, cursor siguiente o None, versión de data.json de la instantánea)."""
+        snap_id, _, position = str(cursor).rpartition('.')
+        if not snap_id or not position.isdigit():
+            raise ValueError(f"Cursor no válido: {cursor}")
+        now = self._clock()
+        with self._lock:
+            self._evict_locked(now)
+            snap = self._snapshots.get(snap_id)
+            if snap is None:
+                raise CursorExpired("El cursor ha caducado; vuelve a cargar la lista.")
+            if snap.key != key:
+                raise ValueError("El cursor pertenece a otra lista.")
+            snap.touched = now
+            self._snapshots.move_to_end(snap_id)
+        records, next_cursor = self._slice(snap_id, snap, int(position), limit)
+        return records, next_cursor, snap.table.version
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_cursor_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CursorStore()
+        return _store
@@ -0,0 +1,164 @@
+# live_tracker.py - Seguimiento en directo de los partidos en juego
+# data.json solo tiene lo que guardó el último scraping y parse_main_page_matches
+# descarta lo que ya empezó. Aquí mantenemos un modelo incremental de las filas en
+# juego de la portada (marcador, estado, líneas) con sondeos ligeros y solo mientras
+# haya clientes escuchando; cada cambio se reparte a los suscriptores como un diff
+# (la ruta /api/live/stream de muestra_sin_fallos/app.py lo envía por SSE).
+import queue
+import threading
+import time
+
+from html_patterns import LIVE_ROW_ID_RE
+
+LIVE_POLL_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 50
+# Estados de fila de la portada de nowgoal
+LIVE_STATES = {"1": "1ª parte", "2": "Descanso", "3": "2ª parte", "4": "Prórroga", "5": "Penaltis"}
+FINISHED_STATE = "-1"
+
+
+def parse_live_rows(html):
+    """Filas de la portada en juego (o recién terminadas) -> {match_id: fila}."""
+    from bs4 import BeautifulSoup, SoupStrainer
+    soup = BeautifulSoup(html, 'lxml', parse_only=SoupStrainer('tr', id=LIVE_ROW_ID_RE))
+    rows = {}
+    for row in soup.find_all('tr'):
+        state = row.get('state')
+        if state not in LIVE_STATES and state != FINISHED_STATE:
+            continue
+        match_id = LIVE_ROW_ID_RE.match(row['id']).group(1)
+        cells = row.find_all('td')
+        score = ''
+        if len(cells) > 6:
+            b_tag = cells[6].find('b')
+            score = (b_tag or cells[6]).get_text(strip=True)
+        home = row.find('a', id=f'team1_{match_id}')
+        away = row.find('a', id=f'team2_{match_id}')
+        odds = row.get('odds', '').split(',')
+        rows[match_id] = {
+            "id": match_id,
+            "state": state,
+            "state_label": LIVE_STATES.get(state, "Finalizado"),
+            "home_team": home.get_text(strip=True) if home else "N/A",
+            "away_team": away.get_text(strip=True) if away else "N/A",
+            "score": score,
+            "handicap": odds[2] if len(odds) > 2 else "N/A",
+            "goal_line": odds[10] if len(odds) > 10 else "N/A",
+        }
+    return rows
+
+
+def diff_live_rows(previous, current):
+    """
+    {'changed': {id: campos que cambian (fila completa si es nueva)}, 'removed': [ids]}.
+    `previous` solo tiene partidos en juego: uno que termina llega una vez como cambio a
+    estado -1 y en 'removed'; los finalizados que nunca vimos en juego se ignoran.
+    """
+    changed = {}
+    for match_id, row in current.items():
+        old = previous.get(match_id)
+        if old is None:
+            if row["state"] != FINISHED_STATE:
+                changed[match_id] = row
+        else:
+            delta = {k: v for k, v in row.items() if old.get(k) != v}
+            if delta:
+                changed[match_id] = delta
+    removed = [mid for mid in previous if mid not in current or current[mid]["state"] == FINISHED_STATE]
+    return {"changed": changed, "removed": removed}
+
+
+class LiveTracker:
+    """
+    Modelo de las filas en juego + suscriptores. El hilo de sondeo arranca con el
+    primer suscriptor y se para cuando no queda ninguno: sin clientes no hay peticiones.
+    """
+
+    def __init__(self, fetch_html=None, poll_seconds=LIVE_POLL_SECONDS):
+        self._fetch_html = fetch_html or _fetch_index_html
+        self.poll_seconds = poll_seconds
+        self.rows = {}
+        self.version = 0
+        self.updated_at = 0.0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._poller = None
+
+    def snapshot(self):
+        with self._lock:
+            return {"version": self.version, "updated_at": self.updated_at, "matches": list(self.rows.values())}
+
+    def apply_rows(self, current):
+        """Integra un sondeo y reparte el diff. Devuelve el diff (None si no hubo cambios)."""
+        with self._lock:
+            diff = diff_live_rows(self.rows, current)
+            self.updated_at = time.time()
+            self.rows = {mid: row for mid, row in current.items() if row["state"] != FINISHED_STATE}
+            if not diff["changed"] and not diff["removed"]:
+                return None
+            self.version += 1
+            event = ("update", {"version": self.version, **diff})
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            self._offer(q, event)
+        return diff
+
+    def _offer(self, q, event):
+        try:
+            q.put_nowait(event)
+        except queue.Full:
+            # Cliente lento: tiramos lo pendiente y le mandamos el estado completo
+            while True:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    break
+            q.put_nowait(("snapshot", self.snapshot()))
+
+    def poll_once(self):
+        html = self._fetch_html()
+        if html:
+            self.apply_rows(parse_live_rows(html))
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        q.put_nowait(("snapshot", self.snapshot()))
+        with self._lock:
+            self._subscribers.add(q)
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_loop, daemon=True)
+                self._poller.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def _poll_loop(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._poller = None
+                    return
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error en el sondeo de partidos en directo: {e}")
+            time.sleep(self.poll_seconds)
+
+
+def _fetch_index_html():
+    from scraping_logic import URL_NOWGOAL, _fetch_nowgoal_html_sync
+    return _fetch_nowgoal_html_sync(URL_NOWGOAL)
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_live_tracker():
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = LiveTracker()
+        return _tracker
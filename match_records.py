@@ -0,0 +1,230 @@
+# match_records.py - Registros compactos de partidos
+# Los partidos viajaban como dicts de strings ("0.5", isoformat...) que cada ruta copiaba
+# y volvía a parsear. Aquí viven como objetos con __slots__ y valores ya parseados
+# (datetime, float, int); se convierten a dict solo al renderizar o al devolver JSON.
+#   MatchRecord  una entrada de upcoming_matches / finished_matches de data.json
+#   HistoryRow   una fila de table_v1/v2/v3 (get_match_details_from_row_of); es un
+#                Mapping de solo lectura con las claves de siempre ('home', 'ahLine'...)
+#   MatchStore   las dos listas de data.json como tuplas de MatchRecord, recargadas
+#                solo cuando cambia el fichero
+import datetime
+import json
+import os
+import re
+import sys
+import threading
+from collections.abc import Mapping
+
+from handicap import format_ah_as_decimal_string_of, normalize_handicap_to_half_bucket_str, parse_ah_to_number_of
+
+DATA_FILE = 'data.json'
+LIST_SECTIONS = ("upcoming_matches", "finished_matches")
+DISPLAY_OFFSET = datetime.timedelta(hours=2)  # la hora 'time' de las listas va en UTC+2
+
+_ABSENT = object()
+_SCORE_RE = re.compile(r"(\d+)(\s*-\s*)(\d+)")
+# Claves que MatchRecord sabe regenerar; el resto se guarda tal cual en 'extra'
+_RECORD_KEYS = ("id", "time_obj", "home_team", "away_team", "score", "handicap", "goal_line", "time")
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _parse_kickoff(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            return datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return None
+
+
+def _parse_goals(score):
+    """(goles local, goles visitante, separador tal cual: '-' o ' - ')."""
+    m = _SCORE_RE.search(score) if isinstance(score, str) else None
+    return (int(m.group(1)), int(m.group(3)), sys.intern(m.group(2))) if m else (None, None, None)
+
+
+class MatchRecord:
+    """Partido de las listas. `extra` solo existe si la entrada trae algo que no se regenera igual."""
+    __slots__ = ("id", "kickoff", "home_team", "away_team", "handicap_raw", "handicap", "bucket",
+                 "goal_line_raw", "goal_line", "home_goals", "away_goals", "score_sep", "extra")
+
+    @classmethod
+    def from_dict(cls, entry):
+        rec = cls()
+        rec.id = str(entry.get("id", ""))
+        rec.kickoff = _parse_kickoff(entry.get("time_obj"))
+        rec.home_team = _intern(entry.get("home_team", "N/A"))
+        rec.away_team = _intern(entry.get("away_team", "N/A"))
+        rec.handicap_raw = _intern(entry.get("handicap", _ABSENT))
+        rec.handicap = parse_ah_to_number_of(rec.handicap_raw) if isinstance(rec.handicap_raw, str) else None
+        rec.bucket = normalize_handicap_to_half_bucket_str(rec.handicap_raw) if isinstance(rec.handicap_raw, str) else None
+        rec.goal_line_raw = _intern(entry.get("goal_line", _ABSENT))
+        rec.goal_line = parse_ah_to_number_of(rec.goal_line_raw) if isinstance(rec.goal_line_raw, str) else None
+        rec.home_goals, rec.away_goals, rec.score_sep = _parse_goals(entry.get("score"))
+        rec.extra = None
+        regenerated = rec._regenerated()
+        extra = {k: entry.get(k, _ABSENT) for k in _RECORD_KEYS if entry.get(k, _ABSENT) != regenerated[k]}
+        extra.update((k, v) for k, v in entry.items() if k not in regenerated)
+        rec.extra = extra or None
+        return rec
+
+    @property
+    def finished(self):
+        return self.home_goals is not None
+
+    @property
+    def score(self):
+        return f"{self.home_goals}{self.score_sep}{self.away_goals}" if self.finished else None
+
+    def _regenerated(self):
+        local = self.kickoff + DISPLAY_OFFSET if self.kickoff else None
+        return {
+            "id": self.id,
+            "time_obj": self.kickoff.isoformat() if self.kickoff else _ABSENT,
+            "home_team": self.home_team,
+            "away_team": self.away_team,
+            "score": self.score if self.finished else _ABSENT,
+            "handicap": self.handicap_raw,
+            "goal_line": self.goal_line_raw,
+            "time": local.strftime('%d/%m %H:%M' if self.finished else '%H:%M') if local else _ABSENT,
+        }
+
+    def to_dict(self):
+        """La entrada de data.json tal y como era (mismas claves y valores)."""
+        out = {}
+        extra = self.extra or {}
+        for key, value in self._regenerated().items():
+            value = extra.get(key, value)
+            if value is not _ABSENT:
+                out[key] = value
+        for key, value in extra.items():
+            if key not in out and value is not _ABSENT:
+                out[key] = value
+        return out
+
+
+class HistoryRow(Mapping):
+    """
+    Fila de historial (table_v1/v2/v3) con marcador y línea ya parseados. Se lee como
+    el dict que devolvía get_match_details_from_row_of: row['home'], row.get('ahLine')...
+    """
+    __slots__ = ("date", "home", "away", "home_goals", "away_goals", "ah_line_raw", "ah_line",
+                 "match_index", "vs", "league_id", "home_id", "away_id")
+    _KEYS = ("date", "home", "away", "score", "score_raw", "ahLine", "ahLine_raw",
+             "matchIndex", "vs", "league_id_hist", "home_id", "away_id")
+
+    def __init__(self, date, home, away, score_text, ah_line_raw, match_index, vs, league_id, home_id, away_id):
+        self.date = date
+        self.home = _intern(home)
+        self.away = _intern(away)
+        self.home_goals, self.away_goals, _ = _parse_goals(score_text)
+        self.ah_line_raw = _intern(ah_line_raw or '-')
+        self.ah_line = parse_ah_to_number_of(self.ah_line_raw) if self.ah_line_raw != '-' else None
+        self.match_index = match_index
+        self.vs = vs
+        self.league_id = league_id
+        self.home_id = home_id
+        self.away_id = away_id
+
+    def __getitem__(self, key):
+        if key == "score":
+            return f"{self.home_goals}:{self.away_goals}" if self.home_goals is not None else '?:?'
+        if key == "score_raw":
+            return f"{self.home_goals}-{self.away_goals}" if self.home_goals is not None else '?-?'
+        if key == "ahLine":
+            return format_ah_as_decimal_string_of(self.ah_line_raw) if self.ah_line_raw != '-' else '-'
+        if key == "ahLine_raw":
+            return self.ah_line_raw
+        if key == "matchIndex":
+            return self.match_index
+        if key == "league_id_hist":
+            return self.league_id
+        if key in ("date", "home", "away", "vs", "home_id", "away_id"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def to_dict(self):
+        return {key: self[key] for key in self._KEYS}
+
+    def __repr__(self):
+        return f"HistoryRow({self.to_dict()!r})"
+
+
+class MatchStore:
+    """
+    upcoming_matches / finished_matches de data.json como tuplas de MatchRecord. Se
+    relee el fichero solo cuando cambia (mtime o tamaño); `version` sube con cada
+    recarga para que quien derive índices de aquí sepa cuándo rehacerlos.
+    """
+
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+        self.version = 0
+        self._stamp = None
+        self._sections = {name: () for name in LIST_SECTIONS}
+        self._lock = threading.Lock()
+
+    def _refresh_locked(self):
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp == self._stamp:
+            return
+        data = {}
+        if stamp is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Error al leer {self.path}: {e}")
+                return  # nos quedamos con la última versión buena
+        if not isinstance(data, dict):
+            data = {}
+        self._sections = {
+            name: tuple(MatchRecord.from_dict(item) for item in (data.get(name) or []) if isinstance(item, dict))
+            for name in LIST_SECTIONS
+        }
+        self._stamp = stamp
+        self.version += 1
+
+    def section(self, name):
+        with self._lock:
+            self._refresh_locked()
+            return self._sections.get(name, ())
+
+    def current_version(self):
+        with self._lock:
+            self._refresh_locked()
+            return self.version
+
+    def versioned_section(self, name):
+        """(versión, registros) leídos juntos, para quien cachea derivados por versión."""
+        with self._lock:
+            self._refresh_locked()
+            return self.version, self._sections.get(name, ())
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_match_store(path=DATA_FILE):
+    key = os.fspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = MatchStore(key)
+        return _stores[key]
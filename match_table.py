@@ -0,0 +1,384 @@
+# match_table.py - Tabla por columnas de las listas de partidos
+# Las rutas de listas filtraban recorriendo dicts uno a uno. Aquí cada sección de
+# data.json se vuelca una vez por versión del fichero (MatchStore.version) a columnas
+# de NumPy: inicio, hándicap, tramo, línea de goles, liga y goles. Los filtros son
+# máscaras booleanas que salen de índices secundarios (arrays ordenados para los rangos,
+# listas invertidas para liga, tramo, estado y equipo), la paginación corta un orden ya
+# calculado y los agregados por tramo (partidos, cubiertas) salen de un bincount.
+import datetime
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+from match_records import DATA_FILE, get_match_store
+from handicap import parse_ah_to_number_of
+
+NO_BUCKET = -1
+NO_LEAGUE = -1
+_NAT = np.datetime64('NaT', 's')
+# Estados de marcador para filter(state=...) -> códigos del índice (0 sin marcador,
+# 1 gana el local, 2 empate, 3 gana el visitante)
+SCORE_STATES = {'pending': (0,), 'finished': (1, 2, 3), 'home': (1,), 'draw': (2,), 'away': (3,)}
+SORT_ORDERS = ('file', 'kickoff', '-kickoff', 'handicap', '-handicap', 'goal_line', '-goal_line')
+_EMPTY_ROWS = np.zeros(0, dtype=np.int64)
+
+
+def _league_of(record):
+    league = (record.extra or {}).get('league_id')
+    try:
+        return int(league)
+    except (TypeError, ValueError):
+        return NO_LEAGUE
+
+
+def _fold(text):
+    """Nombre para buscar subcadenas: sin acentos, sin mayúsculas y con espacios simples."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.casefold().split())
+
+
+class _SortedColumn:
+    """
+    Columna numérica ordenada una vez: un rango [low, high] son dos searchsorted y el
+    resultado es un corte de `order`. Los huecos (NaN, o NaT visto como int64) quedan
+    fuera de cualquier rango y al final de los órdenes.
+    """
+
+    def __init__(self, values, missing_first=False):
+        self.order = np.argsort(values, kind='stable')
+        ordered = values[self.order]
+        if missing_first:
+            start = int(np.count_nonzero(values == np.iinfo(np.int64).min))
+            self._valid = slice(start, len(values))
+            self.descending = None
+        else:
+            self._valid = slice(0, len(values) - int(np.count_nonzero(np.isnan(values))))
+            self.descending = np.argsort(-values, kind='stable')
+        self._sorted = ordered[self._valid]
+
+    def between(self, low, high):
+        left = 0 if low is None else int(np.searchsorted(self._sorted, low, 'left'))
+        right = len(self._sorted) if high is None else int(np.searchsorted(self._sorted, high, 'right'))
+        start = self._valid.start
+        return self.order[start + left:start + max(left, right)]
+
+
+class _Postings:
+    """
+    Lista invertida código -> filas, en un solo array (las filas agrupadas por código y
+    `bounds` marcando dónde empieza cada uno). `codes` puede tener varias entradas por
+    fila (local y visitante): la fila es la posición módulo `n_rows`.
+    """
+
+    def __init__(self, codes, n_codes, n_rows, keys=None):
+        codes = np.asarray(codes, dtype=np.int64)
+        order = np.argsort(codes, kind='stable')
+        self._rows = order % max(n_rows, 1)
+        self._bounds = np.searchsorted(codes[order], np.arange(n_codes + 1))
+        self._position = {key: i for i, key in enumerate(keys)} if keys is not None else None
+
+    def rows(self, code):
+        if not 0 <= code < len(self._bounds) - 1:
+            return _EMPTY_ROWS
+        return self._rows[self._bounds[code]:self._bounds[code + 1]]
+
+    def rows_for_keys(self, keys):
+        found = [self.rows(self._position[key]) for key in keys if key in self._position]
+        return np.concatenate(found) if found else _EMPTY_ROWS
+
+
+class _TeamIndex:
+    """
+    Equipos distintos de la lista, normalizados y pegados en un único texto: una búsqueda
+    de subcadena es un re.finditer sobre ese texto (en C) y cada acierto se traduce a su
+    equipo y de ahí a sus filas (como local o visitante) con la lista invertida.
+    """
+
+    def __init__(self, records):
+        names = [_fold(r.home_team) for r in records] + [_fold(r.away_team) for r in records]
+        keys = sorted(set(names))
+        position = {name: i for i, name in enumerate(keys)}
+        self._postings = _Postings([position[name] for name in names], len(keys), len(records))
+        self._text = '\n'.join(keys)
+        self._starts = np.cumsum([0] + [len(k) + 1 for k in keys[:-1]]) if keys else _EMPTY_ROWS
+
+    def rows_matching(self, text):
+        needle = _fold(text)
+        if not needle:
+            return _EMPTY_ROWS
+        hits = [m.start() for m in re.finditer(re.escape(needle), self._text)]
+        if not hits:
+            return _EMPTY_ROWS
+        codes = np.unique(np.searchsorted(self._starts, hits, 'right') - 1)
+        return np.concatenate([self._postings.rows(int(code)) for code in codes])
+
+
+class MatchTable:
+    """
+    Columnas (arrays del mismo largo, en el orden de la lista de data.json) sobre una
+    tupla de MatchRecord. `records[i]` es la fila i; los filtros devuelven máscaras y
+    page() traduce una máscara a registros.
+    """
+
+    def __init__(self, records, version=0):
+        self.records = tuple(records)
+        self.version = version
+        n = len(self.records)
+        self.ids = np.array([r.id for r in self.records], dtype=object)
+        self.kickoff = np.array([r.kickoff or _NAT for r in self.records], dtype='datetime64[s]')
+        self.handicap = np.array([np.nan if r.handicap is None else r.handicap for r in self.records], dtype=np.float64)
+        self.goal_line = np.array([np.nan if r.goal_line is None else r.goal_line for r in self.records], dtype=np.float64)
+        self.league_id = np.array([_league_of(r) for r in self.records], dtype=np.int64)
+        self.home_goals = np.array([np.nan if r.home_goals is None else r.home_goals for r in self.records], dtype=np.float64)
+        self.away_goals = np.array([np.nan if r.away_goals is None else r.away_goals for r in self.records], dtype=np.float64)
+        # Tramos como enteros: bucket_labels[bucket_id[i]] es el tramo de la fila i
+        labels = sorted({r.bucket for r in self.records if r.bucket is not None}, key=float)
+        self.bucket_labels = tuple(labels)
+        position = {label: i for i, label in enumerate(labels)}
+        self.bucket_id = np.array([position.get(r.bucket, NO_BUCKET) for r in self.records], dtype=np.int16)
+        # Orden por (inicio, id) calculado una vez; sin hora va primero, como datetime.min
+        self.order_by_kickoff = np.array(
+            sorted(range(n), key=lambda i: (self.records[i].kickoff or datetime.datetime.min, self.records[i].id)),
+            dtype=np.int64
+        )
+        self._indexes = {}
+        self._index_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def all(self):
+        return np.ones(len(self), dtype=bool)
+
+    def bucket_mask(self, bucket):
+        """Filas del tramo `bucket` (cadena de normalize_handicap_to_half_bucket_str)."""
+        if bucket not in self.bucket_labels:
+            return np.zeros(len(self), dtype=bool)
+        return self._mask(self._index('bucket').rows(self.bucket_labels.index(bucket) + 1))
+
+    # --- Índices secundarios -------------------------------------------------------
+    # Se construyen la primera vez que se piden y viven lo que la tabla, es decir, lo que
+    # dura una versión de data.json: con cada recarga get_match_table crea otra tabla.
+
+    def _index(self, name):
+        with self._index_lock:
+            index = self._indexes.get(name)
+            if index is None:
+                index = self._indexes[name] = getattr(self, f'_build_{name}_index')()
+            return index
+
+    def _build_kickoff_index(self):
+        return _SortedColumn(self.kickoff.view(np.int64), missing_first=True)
+
+    def _build_handicap_index(self):
+        return _SortedColumn(self.handicap)
+
+    def _build_goal_line_index(self):
+        return _SortedColumn(self.goal_line)
+
+    def _build_league_index(self):
+        keys = sorted(set(self.league_id.tolist()))
+        position = {league: i for i, league in enumerate(keys)}
+        return _Postings([position[x] for x in self.league_id.tolist()], len(keys), len(self), keys)
+
+    def _build_bucket_index(self):
+        # Código 0 = sin tramo; el tramo b va en b + 1
+        return _Postings(self.bucket_id.astype(np.int64) + 1, len(self.bucket_labels) + 1, len(self))
+
+    def _build_state_index(self):
+        home, away = self.home_goals, self.away_goals
+        codes = np.select([np.isnan(home), home > away, home == away], [0, 1, 2], 3)
+        return _Postings(codes, 4, len(self))
+
+    def _build_team_index(self):
+        return _TeamIndex(self.records)
+
+    def _mask(self, rows):
+        mask = np.zeros(len(self), dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def _range_mask(self, column, low, high):
+        if low is None and high is None:
+            return None
+        return self._mask(self._index(column).between(low, high))
+
+    def filter(self, handicap_min=None, handicap_max=None, goal_line_min=None, goal_line_max=None,
+               leagues=None, kickoff_from=None, kickoff_to=None, bucket=None, team=None, state=None):
+        """
+        Máscara con todos los criterios a la vez; los que van a None no filtran. Cada
+        criterio sale de un índice (rango sobre un array ordenado o lista invertida), así
+        que el coste depende de las filas que casan y no del largo de la lista.
+          team   subcadena del local o del visitante (sin mayúsculas ni acentos)
+          state  una clave de SCORE_STATES ('pending', 'finished', 'home', 'draw', 'away')
+        """
+        mask = self.all() if bucket is None else self.bucket_mask(bucket)
+        to_seconds = lambda value: None if value is None else np.datetime64(value, 's').view(np.int64)
+        parts = [
+            self._range_mask('handicap', handicap_min, handicap_max),
+            self._range_mask('goal_line', goal_line_min, goal_line_max),
+            self._range_mask('kickoff', to_seconds(kickoff_from), to_seconds(kickoff_to)),
+        ]
+        if leagues:
+            index = self._index('league')
+            parts.append(self._mask(index.rows_for_keys(int(x) for x in leagues)))
+        if team:
+            parts.append(self._mask(self._index('team').rows_matching(team)))
+        if state is not None:
+            if state not in SCORE_STATES:
+                raise ValueError(f"Estado de marcador desconocido: {state}")
+            index = self._index('state')
+            parts.append(self._mask(np.concatenate([index.rows(code) for code in SCORE_STATES[state]])))
+        for part in parts:
+            if part is not None:
+                mask &= part
+        return mask
+
+    def _order(self, order):
+        if order in ('kickoff', '-kickoff'):
+            return self.order_by_kickoff if order == 'kickoff' else self.order_by_kickoff[::-1]
+        column = order.lstrip('-')
+        if column not in ('handicap', 'goal_line'):
+            raise ValueError(f"Orden desconocido: {order}")
+        index = self._index(column)
+        return index.descending if order.startswith('-') else index.order
+
+    def rows(self, mask=None, order='file'):
+        """
+        Índices de las filas seleccionadas por `mask`, en el orden pedido ('file' = el de
+        data.json, 'kickoff' / '-kickoff' = por inicio e id, 'handicap' / 'goal_line' con
+        o sin '-' = por línea, sin línea al final).
+        """
+        if order == 'file':
+            return np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        rows = self._order(order)
+        return rows[mask[rows]] if mask is not None else rows
+
+    def page(self, mask=None, offset=0, limit=None, order='file'):
+        """Registros de rows(mask, order) cortados en [offset, offset+limit)."""
+        rows = self.rows(mask, order)
+        offset = max(int(offset or 0), 0)
+        rows = rows[offset:] if limit is None else rows[offset:offset + max(int(limit), 0)]
+        return [self.records[i] for i in rows]
+
+    def bucket_summary(self, mask=None):
+        """
+        Agregados por tramo de hándicap: partidos, finalizados con línea y, de esos,
+        cubiertas del local / visitante / favorito y pushes. Las tasas de cubierta cuentan
+        las medias ganadas y excluyen los pushes (como 'hit_rate' en backtest.py).
+        """
+        from modules.liquidacion_ah import HALF_WIN, INVALID, PUSH, WIN, settle_asian_handicap
+        mask = self.all() if mask is None else mask
+        keep = mask & (self.bucket_id != NO_BUCKET)
+        ids = self.bucket_id[keep].astype(np.int64)
+        n_buckets = len(self.bucket_labels)
+
+        def count(selected):
+            return np.bincount(ids[selected], minlength=n_buckets)
+
+        home_outcome, _ = settle_asian_handicap(self.home_goals[keep], self.away_goals[keep], self.handicap[keep], 1)
+        fav_side = np.sign(np.nan_to_num(self.handicap[keep]))
+        fav_outcome, _ = settle_asian_handicap(self.home_goals[keep], self.away_goals[keep], self.handicap[keep], fav_side)
+        settled = home_outcome != INVALID
+        matches = count(np.ones(ids.size, dtype=bool))
+        settled_n = count(settled)
+        pushes = count(home_outcome == PUSH)
+        home_covers = count((home_outcome == WIN) | (home_outcome == HALF_WIN))
+        away_covers = count(settled & (home_outcome < PUSH))
+        fav_decided = count((fav_outcome != INVALID) & (fav_outcome != PUSH))
+        fav_covers = count((fav_outcome == WIN) | (fav_outcome == HALF_WIN))
+
+        def rate(part, whole):
+            return round(part / whole, 4) if whole else None
+
+        summary = []
+        for b, label in enumerate(self.bucket_labels):
+            if not matches[b]:
+                continue
+            decided = int(settled_n[b] - pushes[b])
+            summary.append({
+                'bucket': label,
+                'matches': int(matches[b]),
+                'settled': int(settled_n[b]),
+                'pushes': int(pushes[b]),
+                'home_covers': int(home_covers[b]),
+                'away_covers': int(away_covers[b]),
+                'home_cover_rate': rate(int(home_covers[b]), decided),
+                'away_cover_rate': rate(int(away_covers[b]), decided),
+                'favorite_cover_rate': rate(int(fav_covers[b]), int(fav_decided[b])),
+            })
+        return summary
+
+
+def parse_line_param(text):
+    """Parámetro de URL con una línea ('0.5', '-0/0.5', '2,5') -> float o None."""
+    return parse_ah_to_number_of(text) if text not in (None, '') else None
+
+
+def _line_arg(args, name):
+    value = parse_line_param(args.get(name))
+    if value is None and args.get(name):
+        raise ValueError(f"Línea no válida en '{name}': {args.get(name)}")
+    return value
+
+
+def _kickoff_arg(args, name):
+    text = args.get(name)
+    if not text:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Fecha no válida en '{name}' (se espera ISO): {text}") from None
+
+
+def filter_args(args):
+    """
+    Criterios de MatchTable.filter() a partir de los parámetros de la URL: handicap_min/max,
+    goal_line_min/max, league (repetible), team, from/to (ISO) y state. ValueError con un
+    mensaje legible si alguno no se entiende.
+    """
+    try:
+        leagues = [int(x) for x in args.getlist('league') if x != ''] or None
+    except ValueError:
+        raise ValueError(f"Liga no válida: {args.getlist('league')}") from None
+    state = args.get('state') or None
+    if state is not None and state not in SCORE_STATES:
+        raise ValueError(f"Estado no válido: {state} (opciones: {', '.join(SCORE_STATES)})")
+    return {
+        'handicap_min': _line_arg(args, 'handicap_min'),
+        'handicap_max': _line_arg(args, 'handicap_max'),
+        'goal_line_min': _line_arg(args, 'goal_line_min'),
+        'goal_line_max': _line_arg(args, 'goal_line_max'),
+        'leagues': leagues,
+        'kickoff_from': _kickoff_arg(args, 'from'),
+        'kickoff_to': _kickoff_arg(args, 'to'),
+        'team': (args.get('team') or '').strip() or None,
+        'state': state,
+    }
+
+
+def sort_arg(args, default='file'):
+    order = args.get('sort') or default
+    if order not in SORT_ORDERS:
+        raise ValueError(f"Orden no válido: {order} (opciones: {', '.join(SORT_ORDERS)})")
+    return order
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_match_table(section, path=DATA_FILE):
+    """Tabla de `section` para la versión actual de data.json (se reconstruye si cambió)."""
+    store = get_match_store(path)
+    with _tables_lock:
+        version, records = store.versioned_section(section)
+        cached = _tables.get((store.path, section))
+        if cached is None or cached.version != version:
+            cached = MatchTable(records, version)
+            _tables[(store.path, section)] = cached
+        return cached
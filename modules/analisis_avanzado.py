@@ -1,6 +1,4 @@
 # modules/analisis_avanzado.py
-import re
-
 
 def _colorear_stats(val1_str, val2_str):
     """Copia esta función helper de estudio_scraper.py para usarla aquí."""
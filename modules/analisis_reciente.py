@@ -1,10 +1,11 @@
 # modules/analisis_reciente.py
-import re
 import math
 from bs4 import BeautifulSoup
+from html_patterns import history_row_re
 from modules.utils import parse_ah_to_number_of, format_ah_as_decimal_string_of, check_handicap_cover
+from modules.nombres_equipos import same_team, team_id_from_cell
 
-def analizar_rendimiento_reciente_con_handicap(soup, team_name, is_home_team=True):
+def analizar_rendimiento_reciente_con_handicap(soup, team_name, is_home_team=True, team_id=None):
     """
     Analiza el rendimiento reciente de un equipo con respecto al handicap.
     
@@ -12,6 +13,7 @@ def analizar_rendimiento_reciente_con_handicap(soup, team_name, is_home_team=Tru
         soup: BeautifulSoup object con el contenido de la página
         team_name: Nombre del equipo a analizar
         is_home_team: Booleano que indica si el equipo es local (True) o visitante (False)
+        team_id: Id del equipo (opcional); si está, se compara por id en vez de por nombre
     
     Returns:
         dict: Diccionario con el análisis del rendimiento reciente
@@ -27,7 +29,7 @@ def analizar_rendimiento_reciente_con_handicap(soup, team_name, is_home_team=Tru
     matches = []
     score_selector = 'fscore_1' if is_home_team else 'fscore_2'
     
-    for row in table.find_all("tr", id=re.compile(rf"tr{table_id[-1]}_\d+")):
+    for row in table.find_all("tr", id=history_row_re(table_id)):
         if len(matches) >= 5:  # Limitar a los últimos 5 partidos
             break
             
@@ -43,8 +45,12 @@ def analizar_rendimiento_reciente_con_handicap(soup, team_name, is_home_team=Tru
         home_team = home_team_cell.get_text(strip=True)
         away_team = away_team_cell.get_text(strip=True)
         
-        # Verificar si el equipo está en este partido
-        if team_name.lower() not in [home_team.lower(), away_team.lower()]:
+        # Verificar si el equipo está en este partido (y con qué nombre aparece en la fila)
+        if same_team(team_name, home_team, team_id, team_id_from_cell(home_team_cell)):
+            row_team_name = home_team
+        elif same_team(team_name, away_team, team_id, team_id_from_cell(away_team_cell)):
+            row_team_name = away_team
+        else:
             continue
             
         # Obtener resultado
@@ -66,7 +72,8 @@ def analizar_rendimiento_reciente_con_handicap(soup, team_name, is_home_team=Tru
             'away_team': away_team,
             'score': score_raw,
             'ah_line_raw': ah_line_raw,
-            'ah_line_num': parse_ah_to_number_of(ah_line_raw)
+            'ah_line_num': parse_ah_to_number_of(ah_line_raw),
+            'row_team_name': row_team_name
         })
     
     # Analizar el rendimiento
@@ -95,7 +102,7 @@ def analizar_rendimiento_reciente_con_handicap(soup, team_name, is_home_team=Tru
             favorito_name or "",
             match['home_team'],
             match['away_team'],
-            team_name
+            match['row_team_name']
         )
         
         # Contar resultados
@@ -119,7 +126,7 @@ def analizar_rendimiento_reciente_con_handicap(soup, team_name, is_home_team=Tru
     
     return analysis
 
-def comparar_lineas_handicap_recientes(soup, team_name, current_ah_line, is_home_team=True):
+def comparar_lineas_handicap_recientes(soup, team_name, current_ah_line, is_home_team=True, team_id=None):
     """
     Compara las líneas de handicap recientes con la línea actual.
     
@@ -128,12 +135,13 @@ def comparar_lineas_handicap_recientes(soup, team_name, current_ah_line, is_home
         team_name: Nombre del equipo a analizar
         current_ah_line: Línea de handicap actual (número)
         is_home_team: Booleano que indica si el equipo es local (True) o visitante (False)
+        team_id: Id del equipo (opcional), se pasa al análisis de rendimiento
     
     Returns:
         dict: Diccionario con la comparación de líneas
     """
     # Obtener análisis de rendimiento reciente
-    rendimiento = analizar_rendimiento_reciente_con_handicap(soup, team_name, is_home_team)
+    rendimiento = analizar_rendimiento_reciente_con_handicap(soup, team_name, is_home_team, team_id)
     
     if 'error' in rendimiento:
         return rendimiento
@@ -0,0 +1,148 @@
+# modules/analisis_rivales.py
+from modules.nombres_equipos import normalize_team_name
+from modules.utils import OpponentIndex, build_opponent_indexes
+
+def analizar_rivales_comunes(soup, team_a, team_b, opponent_indexes=None):
+    """
+    Analiza los rivales comunes entre dos equipos.
+    
+    Args:
+        soup: BeautifulSoup object con el contenido de la página
+        team_a: Nombre del primer equipo
+        team_b: Nombre del segundo equipo
+        opponent_indexes: (índice table_v1, índice table_v2) de build_opponent_indexes,
+            para no volver a parsear las tablas si ya se construyeron para la página
+    
+    Returns:
+        dict: Diccionario con el análisis de rivales comunes
+    """
+    # Índices de partidos: team_a como local (table_v1), team_b como visitante (table_v2)
+    index_a, index_b = opponent_indexes or build_opponent_indexes(soup)
+    
+    if not index_a or not index_b:
+        return {"error": "No se encontraron las tablas de partidos"}
+    
+    # Extraer rivales de team_a (como local): filas del índice con su clave canónica,
+    # guardando el primer nombre visto de cada rival para devolverlo en common_rivals
+    rival_names = {}
+    for details, _, away_k in OpponentIndex.rows_for(index_a.details_by_home, team_a):
+        rival_names.setdefault(away_k, details['away'])
+    rivals_a = set(rival_names)
+    
+    # Extraer rivales de team_b (como visitante)
+    rivals_b = {home_k for _, home_k, _ in OpponentIndex.rows_for(index_b.details_by_away, team_b)}
+    
+    # Encontrar rivales comunes
+    common_rivals = rivals_a.intersection(rivals_b)
+    
+    # Obtener detalles de partidos contra rivales comunes
+    common_matches = []
+    
+    # Partidos de team_a contra rivales comunes
+    for details, _, away_k in index_a.details_rows:
+        if away_k in common_rivals:
+            common_matches.append({
+                'team': team_a,
+                'opponent': details['away'],
+                'home_team': details['home'],
+                'away_team': details['away'],
+                'score': details['score'],
+                'score_raw': details['score_raw'],
+                'ah_line': details['ahLine'],
+                'ah_line_raw': details['ahLine_raw'],
+                'date': details['date']
+            })
+    
+    # Partidos de team_b contra rivales comunes
+    for details, home_k, _ in index_b.details_rows:
+        if home_k in common_rivals:
+            common_matches.append({
+                'team': team_b,
+                'opponent': details['home'],
+                'home_team': details['home'],
+                'away_team': details['away'],
+                'score': details['score'],
+                'score_raw': details['score_raw'],
+                'ah_line': details['ahLine'],
+                'ah_line_raw': details['ahLine_raw'],
+                'date': details['date']
+            })
+    
+    # Ordenar por fecha
+    common_matches.sort(key=lambda x: x['date'], reverse=True)
+    
+    return {
+        'team_a': team_a,
+        'team_b': team_b,
+        'common_rivals': [rival_names[k].lower() for k in common_rivals],
+        'common_rivals_count': len(common_rivals),
+        'matches': common_matches[:10]  # Limitar a 10 partidos más recientes
+    }
+
+def _partidos_entre(index, team, rival):
+    """Filas del índice (en orden de tabla) en las que 'team' y 'rival' se enfrentan (mismo equipo por clave canónica)."""
+    team_k, rival_k = normalize_team_name(team), normalize_team_name(rival)
+    if not team_k or not rival_k:
+        return []
+    return [
+        details for details, home_k, away_k in index.details_rows
+        if (home_k == team_k and away_k == rival_k) or (away_k == team_k and home_k == rival_k)
+    ]
+
+def analizar_contra_rival_del_rival(soup, team_a, team_b, rival_a_rival, rival_b_rival, opponent_indexes=None):
+    """
+    Analiza el rendimiento de cada equipo contra el rival del otro equipo.
+    
+    Args:
+        soup: BeautifulSoup object con el contenido de la página
+        team_a: Nombre del primer equipo
+        team_b: Nombre del segundo equipo
+        rival_a_rival: Rival del equipo A
+        rival_b_rival: Rival del equipo B
+        opponent_indexes: (índice table_v1, índice table_v2) ya construidos para la página
+    
+    Returns:
+        dict: Diccionario con el análisis contra el rival del rival
+    """
+    # Índices de partidos: team_a en table_v1, team_b en table_v2
+    index_a, index_b = opponent_indexes or build_opponent_indexes(soup)
+    
+    if not index_a or not index_b:
+        return {"error": "No se encontraron las tablas de partidos"}
+    
+    # Buscar partidos de team_a contra rival_b_rival
+    matches_a_vs_rival_b_rival = []
+    for details in _partidos_entre(index_a, team_a, rival_b_rival):
+        matches_a_vs_rival_b_rival.append({
+            'team': team_a,
+            'home_team': details['home'],
+            'away_team': details['away'],
+            'score': details['score'],
+            'score_raw': details['score_raw'],
+            'ah_line': details['ahLine'],
+            'ah_line_raw': details['ahLine_raw'],
+            'date': details['date']
+        })
+    
+    # Buscar partidos de team_b contra rival_a_rival
+    matches_b_vs_rival_a_rival = []
+    for details in _partidos_entre(index_b, team_b, rival_a_rival):
+        matches_b_vs_rival_a_rival.append({
+            'team': team_b,
+            'home_team': details['home'],
+            'away_team': details['away'],
+            'score': details['score'],
+            'score_raw': details['score_raw'],
+            'ah_line': details['ahLine'],
+            'ah_line_raw': details['ahLine_raw'],
+            'date': details['date']
+        })
+    
+    return {
+        'team_a': team_a,
+        'team_b': team_b,
+        'rival_a_rival': rival_a_rival,
+        'rival_b_rival': rival_b_rival,
+        'matches_a_vs_rival_b_rival': matches_a_vs_rival_b_rival,
+        'matches_b_vs_rival_a_rival': matches_b_vs_rival_a_rival
+    }
\ No newline at end of file
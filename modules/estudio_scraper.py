@@ -1,120 +1,32 @@
 # modules/estudio_scraper.py
-from modules.analisis_avanzado import generar_analisis_comparativas_indirectas
-from modules.analisis_reciente import analizar_rendimiento_reciente_con_handicap, comparar_lineas_handicap_recientes
-from modules.analisis_rivales import analizar_rivales_comunes, analizar_contra_rival_del_rival
-from modules.funciones_resumen import generar_resumen_rendimiento_reciente
-from modules.funciones_auxiliares import _calcular_estadisticas_contra_rival, _analizar_over_under, _analizar_ah_cubierto, _analizar_desempeno_casa_fuera
+# Selenium y los módulos de análisis se importan dentro de las funciones que
+# los usan: la vista previa ligera (requests + BeautifulSoup) no los necesita.
 import time
-import re
 import math
+import threading
 from bs4 import BeautifulSoup
-import pandas as pd
-from concurrent.futures import ThreadPoolExecutor
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import NamedTuple
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from modules.utils import parse_ah_to_number_of, format_ah_as_decimal_string_of, check_handicap_cover, check_goal_line_cover, get_match_details_from_row_of, extract_final_score_of
+from deadline import Deadline
+import html_patterns as pat
+from h2h_fragments import parse_h2h_fragments
+from modules.nombres_equipos import same_team, team_id_from_cell
+from modules.liquidacion_ah import HALF_LOSS, HALF_WIN, INVALID, LOSS, WIN
+from team_history import extract_history_rows, get_team_history_index
+from modules.utils import parse_ah_to_number_of, format_ah_as_decimal_string_of, check_handicap_cover, handicap_outcome_of, check_goal_line_cover, get_match_details_from_row_of, extract_final_score_of, OpponentIndex, build_opponent_indexes
 
 BASE_URL_OF = "https://live18.nowgoal25.com"
 SELENIUM_TIMEOUT_SECONDS_OF = 10
 PLACEHOLDER_NODATA = "*(No disponible)*"
+STATS_FETCH_TIMEOUT_SECONDS = 10
+STATS_BATCH_MAX_WORKERS = 4
+_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/116.0.0.0 Safari/537.36"
 
-def parse_ah_to_number_of(ah_line_str: str):
-    if not isinstance(ah_line_str, str): return None
-    s = ah_line_str.strip().replace(' ', '')
-    if not s or s in ['-', '?']: return None
-    original_starts_with_minus = ah_line_str.strip().startswith('-')
-    try:
-        if '/' in s:
-            parts = s.split('/')
-            if len(parts) != 2: return None
-            p1_str, p2_str = parts[0], parts[1]
-            val1 = float(p1_str)
-            val2 = float(p2_str)
-            if val1 < 0 and not p2_str.startswith('-') and val2 > 0:
-                 val2 = -abs(val2)
-            elif original_starts_with_minus and val1 == 0.0 and \
-                 (p1_str == "0" or p1_str == "-0") and \
-                 not p2_str.startswith('-') and val2 > 0:
-                val2 = -abs(val2)
-            return (val1 + val2) / 2.0
-        else:
-            return float(s)
-    except (ValueError, IndexError):
-        return None
-
-def format_ah_as_decimal_string_of(ah_line_str: str, for_sheets=False):
-    if not isinstance(ah_line_str, str) or not ah_line_str.strip() or ah_line_str.strip() in ['-', '?']:
-        return ah_line_str.strip() if isinstance(ah_line_str, str) and ah_line_str.strip() in ['-','?'] else '-'
-    numeric_value = parse_ah_to_number_of(ah_line_str)
-    if numeric_value is None:
-        return ah_line_str.strip() if ah_line_str.strip() in ['-','?'] else '-'
-    if numeric_value == 0.0: return "0"
-    sign = -1 if numeric_value < 0 else 1
-    abs_num = abs(numeric_value)
-    mod_val = abs_num % 1
-    if mod_val == 0.0: abs_rounded = abs_num
-    elif mod_val == 0.25: abs_rounded = math.floor(abs_num) + 0.25
-    elif mod_val == 0.5: abs_rounded = abs_num
-    elif mod_val == 0.75: abs_rounded = math.floor(abs_num) + 0.75
-    else:
-        if mod_val < 0.25: abs_rounded = math.floor(abs_num)
-        elif mod_val < 0.75: abs_rounded = math.floor(abs_num) + 0.5
-        else: abs_rounded = math.ceil(abs_num)
-    final_value_signed = sign * abs_rounded
-    if final_value_signed == 0.0: output_str = "0"
-    elif abs(final_value_signed - round(final_value_signed, 0)) < 1e-9 : output_str = str(int(round(final_value_signed, 0)))
-    elif abs(final_value_signed - (math.floor(final_value_signed) + 0.5)) < 1e-9: output_str = f"{final_value_signed:.1f}"
-    elif abs(final_value_signed - (math.floor(final_value_signed) + 0.25)) < 1e-9 or \
-         abs(final_value_signed - (math.floor(final_value_signed) + 0.75)) < 1e-9: output_str = f"{final_value_signed:.2f}".replace(".25", ".25").replace(".75", ".75")
-    else: output_str = f"{final_value_signed:.2f}"
-    if for_sheets:
-        return "'" + output_str.replace('.', ',') if output_str not in ['-','?'] else output_str
-    return output_str
-
-def check_handicap_cover(resultado_raw: str, ah_line_num: float, favorite_team_name: str, home_team_in_h2h: str, away_team_in_h2h: str, main_home_team_name: str):
-    """
-    Simula si un resultado histórico habría cubierto la línea de hándicap actual.
-    Maneja correctamente el Hándicap Asiático 0.
-    """
-    try:
-        goles_h, goles_a = map(int, resultado_raw.split('-'))
-
-        # --- LÓGICA ESPECIAL PARA HÁNDICAP 0 (DRAW NO BET) ---
-        if ah_line_num == 0.0:
-            # Simulamos la apuesta sobre el equipo local del partido principal
-            if main_home_team_name.lower() == home_team_in_h2h.lower(): # Si nuestro local jugaba de local
-                if goles_h > goles_a: return ("CUBIERTO", True)
-                elif goles_a > goles_h: return ("NO CUBIERTO", False)
-                else: return ("PUSH", None)
-            else: # Si nuestro local jugaba de visitante
-                if goles_a > goles_h: return ("CUBIERTO", True)
-                elif goles_h > goles_a: return ("NO CUBIERTO", False)
-                else: return ("PUSH", None)
-        
-        # --- LÓGICA ANTERIOR PARA HÁNDICAPS CON FAVORITO ---
-        if favorite_team_name.lower() == home_team_in_h2h.lower():
-            favorite_margin = goles_h - goles_a
-        elif favorite_team_name.lower() == away_team_in_h2h.lower():
-            favorite_margin = goles_a - goles_h
-        else:
-            return ("indeterminado", None)
-        
-        if favorite_margin - abs(ah_line_num) > 0.05:
-            return ("CUBIERTO", True)
-        elif favorite_margin - abs(ah_line_num) < -0.05:
-            return ("NO CUBIERTO", False)
-        else:
-            return ("PUSH", None)
-
-    except (ValueError, TypeError, AttributeError):
-        return ("indeterminado", None)
+_http_session = None
+_http_session_lock = threading.Lock()
 
 def check_goal_line_cover(resultado_raw: str, goal_line_num: float):
     try:
@@ -159,7 +71,7 @@ def _analizar_precedente_handicap(precedente_data, ah_actual_num, favorito_actua
             favorito_historico_name = away_team_precedente
         
         # 2. Lógica de comparación unificada
-        if favorito_actual_name.lower() == (favorito_historico_name or "").lower():
+        if same_team(favorito_actual_name, favorito_historico_name):
             # El favorito es el mismo equipo (o ambos son 'Ninguno'), ahora comparamos la magnitud.
             if abs(ah_actual_num) > abs(ah_historico_num):
                 comparativa_texto = f"El mercado considera a este equipo <strong>más favorito</strong> que en el precedente (movimiento: <strong style='color: green; font-size:1.2em;'>{line_movement_str}</strong>). "
@@ -182,14 +94,19 @@ def _analizar_precedente_handicap(precedente_data, ah_actual_num, favorito_actua
         comparativa_texto = f"No se pudo realizar una comparación detallada (línea histórica: <strong>{format_ah_as_decimal_string_of(ah_raw)}</strong>). "
 
     # 3. Simular el resultado del hándicap
-    resultado_cover, cubierto = check_handicap_cover(res_raw, ah_actual_num, favorito_actual_name, home_team_precedente, away_team_precedente, main_home_team_name)
+    # Las líneas de cuarto pueden quedar a medias (p. ej. -0.75 ganando por 1)
+    outcome = handicap_outcome_of(res_raw, ah_actual_num, favorito_actual_name, home_team_precedente, away_team_precedente, main_home_team_name)
     
-    if cubierto is True:
+    if outcome == WIN:
         cover_html = f"<span style='color: green; font-weight: bold;'>CUBIERTO ✅</span>"
-    elif cubierto is False:
+    elif outcome == HALF_WIN:
+        cover_html = f"<span style='color: green; font-weight: bold;'>MEDIO CUBIERTO ✅</span>"
+    elif outcome == LOSS:
         cover_html = f"<span style='color: red; font-weight: bold;'>NO CUBIERTO ❌</span>"
+    elif outcome == HALF_LOSS:
+        cover_html = f"<span style='color: red; font-weight: bold;'>MEDIO NO CUBIERTO ❌</span>"
     else: # PUSH o indeterminado
-        cover_html = f"<span style='color: #6c757d; font-weight: bold;'>{resultado_cover.upper()} 🤔</span>"
+        cover_html = f"<span style='color: #6c757d; font-weight: bold;'>{'INDETERMINADO' if outcome == INVALID else 'PUSH'} 🤔</span>"
 
     return f"<li><span class='ah-value'>Hándicap:</span> {comparativa_texto}Con el resultado ({res_raw.replace('-' , ':')}), la línea actual se habría considerado {cover_html}.</li>"
 
@@ -383,35 +300,6 @@ def generar_analisis_mercado_simplificado(main_odds, h2h_data, home_name, away_n
     html += '</div></div>'
     return html
 
-def get_match_details_from_row_of(row_element, score_class_selector='score', source_table_type='h2h'):
-    try:
-        cells = row_element.find_all('td')
-        home_idx, score_idx, away_idx, ah_idx = 2, 3, 4, 11
-        if len(cells) <= ah_idx: return None
-        date_span = cells[1].find('span', attrs={'name': 'timeData'})
-        date_txt = date_span.get_text(strip=True) if date_span else ''
-        def get_cell_txt(idx):
-            a = cells[idx].find('a')
-            return a.get_text(strip=True) if a else cells[idx].get_text(strip=True)
-        home, away = get_cell_txt(home_idx), get_cell_txt(away_idx)
-        if not home or not away: return None
-        score_cell = cells[score_idx]
-        score_span = score_cell.find('span', class_=lambda c: isinstance(c, str) and score_class_selector in c)
-        score_raw_text = (score_span.get_text(strip=True) if score_span else score_cell.get_text(strip=True)) or ''
-        m = re.search(r'(\d+)\s*-\s*(\d+)', score_raw_text)
-        score_raw, score_fmt = (f"{m.group(1)}-{m.group(2)}", f"{m.group(1)}:{m.group(2)}") if m else ('?-?', '?:?')
-        ah_cell = cells[ah_idx]
-        ah_line_raw = (ah_cell.get('data-o') or ah_cell.text).strip()
-        ah_line_fmt = format_ah_as_decimal_string_of(ah_line_raw) if ah_line_raw not in ['', '-'] else '-'
-        return {
-            'date': date_txt, 'home': home, 'away': away, 'score': score_fmt,
-            'score_raw': score_raw, 'ahLine': ah_line_fmt, 'ahLine_raw': ah_line_raw or '-',
-            'matchIndex': row_element.get('index'), 'vs': row_element.get('vs'),
-            'league_id_hist': row_element.get('name')
-        }
-    except Exception:
-        return None
-
 def _colorear_stats(val1_str, val2_str):
     """Compara dos valores de estadísticas y devuelve strings con formato HTML para colorearlos."""
     try:
@@ -428,114 +316,313 @@ def _colorear_stats(val1_str, val2_str):
         # Si no se pueden convertir a números (ej. texto), devolver los originales
         return val1_str, val2_str
 
-def get_match_progression_stats_data(match_id: str) -> pd.DataFrame | None:
-    if not match_id or not match_id.isdigit(): return None
-    url = f"{BASE_URL_OF}/match/live-{match_id}"
-    try:
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-        adapter = HTTPAdapter(max_retries=retries)
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
-        session.headers.update({"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/116.0.0.0 Safari/537.36"})
-        response = session.get(url, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'lxml')
-        
-        # Definir el orden específico de las estadísticas (sin Yellow Cards)
-        stat_order = ["Corners", "Shots", "Shots on Goal", "Attacks", "Dangerous Attacks", "Red Cards"]
-        stat_titles = {stat: "-" for stat in stat_order}
-        
-        team_tech_div = soup.find('div', id='teamTechDiv_detail')
-        if team_tech_div and (stat_list := team_tech_div.find('ul', class_='stat')):
-            for li in stat_list.find_all('li'):
-                if (title_span := li.find('span', class_='stat-title')) and (stat_title := title_span.get_text(strip=True)) in stat_titles:
-                    values = [v.get_text(strip=True) for v in li.find_all('span', class_='stat-c')]
-                    if len(values) == 2:
-                        home_val, away_val = _colorear_stats(values[0], values[1])
-                        stat_titles[stat_title] = {"Home": home_val, "Away": away_val}
+# Orden fijo de las estadísticas de progresión (sin Yellow Cards) y su etiqueta en español
+STAT_ORDER = ("Corners", "Shots", "Shots on Goal", "Attacks", "Dangerous Attacks", "Red Cards")
+STAT_LABELS_ES = {
+    "Corners": "Corners", "Shots": "Tiros", "Shots on Goal": "Tiros a Puerta",
+    "Attacks": "Ataques", "Dangerous Attacks": "Ataques Peligrosos", "Red Cards": "Red Cards",
+}
+
+class StatRow(NamedTuple):
+    stat: str
+    home: object
+    away: object
+
+class MatchProgressionStats:
+    """
+    Estadísticas de progresión de un partido (como mucho seis filas).
+    Conserva la interfaz que usa stats_table.html (empty, columns, iterrows) sin pandas.
+    """
+    __slots__ = ("rows",)
+    columns = ("Casa", "Fuera")
+
+    def __init__(self, rows=()):
+        self.rows = tuple(rows)
+
+    @property
+    def empty(self):
+        return not self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def iterrows(self):
+        for r in self.rows:
+            yield r.stat, {"Casa": r.home, "Fuera": r.away}
+
+    def to_rows(self):
+        """Filas {label, home, away} con la etiqueta en español, listas para JSON."""
+        return [{"label": STAT_LABELS_ES.get(r.stat, r.stat), "home": r.home, "away": r.away} for r in self.rows]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Inversa de to_rows: reconstruye las estadísticas a partir de las filas JSON."""
+        stat_by_label = {label: stat for stat, label in STAT_LABELS_ES.items()}
+        return cls(StatRow(stat_by_label.get(r["label"], r["label"]), r["home"], r["away"]) for r in rows or ())
+
+    def to_dataframe(self):
+        """Adaptador opcional para quien aún necesite el DataFrame indexado por Estadistica_EN."""
+        import pandas as pd
+        df = pd.DataFrame([{"Estadistica_EN": r.stat, "Casa": r.home, "Fuera": r.away} for r in self.rows])
+        return df.set_index("Estadistica_EN") if not df.empty else df
+
+def stats_to_rows(stats):
+    return stats.to_rows() if stats is not None else []
+
+def _get_http_session():
+    """Sesión requests compartida (keep-alive + reintentos) para las peticiones secundarias."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
+            adapter = HTTPAdapter(max_retries=retries, pool_maxsize=STATS_BATCH_MAX_WORKERS * 2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"User-Agent": _USER_AGENT})
+            _http_session = session
+        return _http_session
+
+def _fetch_html(url: str, timeout: float) -> str:
+    response = _get_http_session().get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.text
+
+def parse_match_progression_stats(html: str) -> MatchProgressionStats:
+    soup = BeautifulSoup(html, 'lxml')
+    stat_titles = {stat: "-" for stat in STAT_ORDER}
+    
+    team_tech_div = soup.find('div', id='teamTechDiv_detail')
+    if team_tech_div and (stat_list := team_tech_div.find('ul', class_='stat')):
+        for li in stat_list.find_all('li'):
+            if (title_span := li.find('span', class_='stat-title')) and (stat_title := title_span.get_text(strip=True)) in stat_titles:
+                values = [v.get_text(strip=True) for v in li.find_all('span', class_='stat-c')]
+                if len(values) == 2:
+                    home_val, away_val = _colorear_stats(values[0], values[1])
+                    stat_titles[stat_title] = {"Home": home_val, "Away": away_val}
+    
+    # Si no encontramos las tarjetas rojas en la sección principal, las buscamos en la sección de eventos
+    if stat_titles["Red Cards"] == "-":
+        red_cards = {"Home": 0, "Away": 0}
+        events_table = soup.find('table', id='eventsTable')
+        if events_table:
+            # Buscar imágenes de tarjetas rojas
+            red_card_images = events_table.find_all('img', alt='Red Card')
+            for img in red_card_images:
+                # Determinar si es para el equipo local o visitante basado en la estructura de la tabla
+                parent_td = img.find_parent('td')
+                if parent_td:
+                    # Si el td tiene style="text-align: right;", es para el equipo local
+                    if "text-align: right;" in parent_td.get('style', ''):
+                        red_cards["Home"] += 1
+                    # Si el td tiene style="text-align: left;", es para el equipo visitante
+                    elif "text-align: left;" in parent_td.get('style', ''):
+                        red_cards["Away"] += 1
+        stat_titles["Red Cards"] = red_cards
         
-        # Si no encontramos las tarjetas rojas en la sección principal, las buscamos en la sección de eventos
-        if stat_titles["Red Cards"] == "-":
-            red_cards = {"Home": 0, "Away": 0}
-            events_table = soup.find('table', id='eventsTable')
-            if events_table:
-                # Buscar imágenes de tarjetas rojas
-                red_card_images = events_table.find_all('img', alt='Red Card')
-                for img in red_card_images:
-                    # Determinar si es para el equipo local o visitante basado en la estructura de la tabla
-                    parent_td = img.find_parent('td')
-                    if parent_td:
-                        # Si el td tiene style="text-align: right;", es para el equipo local
-                        if "text-align: right;" in parent_td.get('style', ''):
-                            red_cards["Home"] += 1
-                        # Si el td tiene style="text-align: left;", es para el equipo visitante
-                        elif "text-align: left;" in parent_td.get('style', ''):
-                            red_cards["Away"] += 1
-            stat_titles["Red Cards"] = red_cards
-            
-        # Eliminamos la extracción de tarjetas amarillas según solicitud
-        # Pasamos directamente a procesar Red Cards
-            
-        # Crear las filas respetando el orden definido
-        table_rows = []
-        for stat_name in stat_order:
-            vals = stat_titles[stat_name]
-            if isinstance(vals, dict):
-                table_rows.append({
-                    "Estadistica_EN": stat_name,
-                    "Casa": vals.get('Home', '-'),
-                    "Fuera": vals.get('Away', '-')
-                })
+    # Eliminamos la extracción de tarjetas amarillas según solicitud
+    # Pasamos directamente a procesar Red Cards
         
-        df = pd.DataFrame(table_rows)
-        return df.set_index("Estadistica_EN") if not df.empty else df
+    # Crear las filas respetando el orden definido
+    rows = []
+    for stat_name in STAT_ORDER:
+        vals = stat_titles[stat_name]
+        if isinstance(vals, dict):
+            rows.append(StatRow(stat_name, vals.get('Home', '-'), vals.get('Away', '-')))
+    return MatchProgressionStats(rows)
+
+def get_match_progression_stats_data(match_id: str) -> MatchProgressionStats | None:
+    if not match_id or not match_id.isdigit(): return None
+    try:
+        html = _fetch_html(f"{BASE_URL_OF}/match/live-{match_id}", STATS_FETCH_TIMEOUT_SECONDS)
     except requests.RequestException:
         return None
+    return parse_match_progression_stats(html)
+
+def fetch_stats_and_pages_batch(stats_ids=None, pages=None, deadline=None, max_workers=STATS_BATCH_MAX_WORKERS):
+    """
+    Descarga en paralelo las estadísticas de progresión (stats_ids: clave -> match_id) y las
+    páginas auxiliares (pages: clave -> URL, devuelve el HTML) bajo un único Deadline.
+    Devuelve {clave: resultado} con todas las claves pedidas: lo que falla o no termina
+    antes del deadline queda en None (resultado parcial).
+    """
+    deadline = Deadline.ensure(deadline, STATS_FETCH_TIMEOUT_SECONDS)
+    results = {key: None for key in list(stats_ids or {}) + list(pages or {})}
+    jobs = {}
+    for key, match_id in (stats_ids or {}).items():
+        if match_id and str(match_id).isdigit():
+            jobs[key] = (f"{BASE_URL_OF}/match/live-{match_id}", parse_match_progression_stats)
+    for key, url in (pages or {}).items():
+        if url:
+            jobs[key] = (url, None)
+    if not jobs or deadline.expired():
+        return results
+
+    def _job(url, parser):
+        if deadline.expired():
+            return None
+        html = _fetch_html(url, deadline.timeout(STATS_FETCH_TIMEOUT_SECONDS))
+        return parser(html) if parser else html
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))))
+    try:
+        futures = {executor.submit(_job, url, parser): key for key, (url, parser) in jobs.items()}
+        done, _ = wait(futures, timeout=deadline.remaining())
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception:
+                results[futures[future]] = None
+    finally:
+        # No esperamos a las descargas que se hayan pasado del deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+# Patrones de fila de las tablas de historial en las vistas previas
+_PREVIEW_ROW_RE_V1 = pat.HOME_ROW_RE
+_PREVIEW_ROW_RE_V2 = pat.AWAY_ROW_RE
+
+def _parse_score_to_tuple(score_text):
+    try:
+        gh, ga = map(int, score_text.strip().split("-"))
+        return gh, ga
+    except Exception:
+        return None
+
+def compare_common_rivals_preview_of(soup, home_name, away_name):
+    """
+    H2H indirecto de las vistas previas: margen de cada equipo contra hasta 3 rivales
+    comunes. Las tablas se indexan una vez por rival y cada búsqueda es un acceso al
+    índice en lugar de recorrer la tabla entera.
+    """
+    indirect = {"home_better": 0, "away_better": 0, "draws": 0, "samples": []}
+    table_v1 = soup.find("table", id="table_v1")
+    table_v2 = soup.find("table", id="table_v2")
+    if not (table_v1 and table_v2):
+        return indirect
+    index_home = OpponentIndex(table_v1, _PREVIEW_ROW_RE_V1, 'fscore_1')
+    index_away = OpponentIndex(table_v2, _PREVIEW_ROW_RE_V2, 'fscore_2')
+
+    def _margin(index, rival_key, team_name_ref):
+        # Primera fila (en orden de tabla) contra ese rival con marcador legible
+        for raw in index.raw_by_team.get(rival_key, ()):
+            score = _parse_score_to_tuple(raw['score'])
+            if not score:
+                continue
+            gh, ga = score
+            if same_team(raw['home'], team_name_ref):
+                return gh - ga
+            if same_team(raw['away'], team_name_ref):
+                return ga - gh
+            return gh - ga
+        return None
+
+    # Claves canónicas de los rivales ('?' o vacío se quedan en '')
+    rivals_home = set(index_home.raw_by_away)
+    rivals_away = set(index_away.raw_by_home)
+    common = [rv for rv in rivals_home.intersection(rivals_away) if rv][:3]
+    for rv in common:
+        home_margin = _margin(index_home, rv, home_name)
+        away_margin = _margin(index_away, rv, away_name)
+        if home_margin is None or away_margin is None:
+            continue
+        if home_margin > away_margin:
+            indirect["home_better"] += 1
+            verdict = "home"
+        elif home_margin < away_margin:
+            indirect["away_better"] += 1
+            verdict = "away"
+        else:
+            indirect["draws"] += 1
+            verdict = "draw"
+        indirect["samples"].append({
+            "rival": rv,
+            "home_margin": home_margin,
+            "away_margin": away_margin,
+            "verdict": verdict
+        })
+    return indirect
 
 def get_rival_a_for_original_h2h_of(soup, league_id=None):
     if not soup or not (table := soup.find("table", id="table_v1")): return None, None, None
-    for row in table.find_all("tr", id=re.compile(r"tr1_\d+")):
+    for row in table.find_all("tr", id=pat.HOME_ROW_RE):
         if league_id and row.get("name") != str(league_id):
             continue
         if row.get("vs") == "1" and (key_id := row.get("index")):
             onclicks = row.find_all("a", onclick=True)
-            if len(onclicks) > 1 and (rival_tag := onclicks[1]) and (rival_id_match := re.search(r"team\((\d+)\)", rival_tag.get("onclick", ""))):
+            if len(onclicks) > 1 and (rival_tag := onclicks[1]) and (rival_id_match := pat.TEAM_ID_RE.search(rival_tag.get("onclick", ""))):
                 return key_id, rival_id_match.group(1), rival_tag.text.strip()
     return None, None, None
 
 def get_rival_b_for_original_h2h_of(soup, league_id=None):
     if not soup or not (table := soup.find("table", id="table_v2")): return None, None, None
-    for row in table.find_all("tr", id=re.compile(r"tr2_\d+")):
+    for row in table.find_all("tr", id=pat.AWAY_ROW_RE):
         if league_id and row.get("name") != str(league_id):
             continue
         if row.get("vs") == "1" and (key_id := row.get("index")):
             onclicks = row.find_all("a", onclick=True)
-            if len(onclicks) > 0 and (rival_tag := onclicks[0]) and (rival_id_match := re.search(r"team\((\d+)\)", rival_tag.get("onclick", ""))):
+            if len(onclicks) > 0 and (rival_tag := onclicks[0]) and (rival_id_match := pat.TEAM_ID_RE.search(rival_tag.get("onclick", ""))):
                 return key_id, rival_id_match.group(1), rival_tag.text.strip()
     return None, None, None
 
-def get_h2h_details_for_original_logic_of(driver, key_match_id, rival_a_id, rival_b_id, rival_a_name="Rival A", rival_b_name="Rival B"):
+def load_h2h_page_with_selenium(driver, url, deadline):
+    """
+    Carga la página h2h en el driver y ajusta los selects a 8 partidos, sin pasarse del
+    presupuesto: la tabla principal es obligatoria, los selects se saltan si no queda tiempo.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait, Select
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
+    driver.set_page_load_timeout(max(1, deadline.timeout(15)))
+    driver.get(url)
+    WebDriverWait(driver, deadline.timeout(15)).until(EC.presence_of_element_located((By.ID, "table_v1")))
+    for select_id in ["hSelect_1", "hSelect_2", "hSelect_3"]:
+        if deadline.expired():
+            break
+        try:
+            Select(WebDriverWait(driver, deadline.timeout(3)).until(EC.presence_of_element_located((By.ID, select_id)))).select_by_value("8")
+            # Usamos una espera explícita más eficiente en lugar de time.sleep
+            WebDriverWait(driver, deadline.timeout(1)).until(EC.text_to_be_present_in_element((By.ID, select_id), "8"))
+        except TimeoutException:
+            continue
+    return driver.page_source
+
+def get_h2h_details_for_original_logic_of(driver, key_match_id, rival_a_id, rival_b_id, rival_a_name="Rival A", rival_b_name="Rival B", deadline=None):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait, Select
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
     if not all([driver, key_match_id, rival_a_id, rival_b_id]):
         return {"status": "error", "resultado": "N/A (Datos incompletos para H2H)"}
+    if (from_history := get_h2h_col3_from_team_history_of(rival_a_id, rival_b_id)) is not None:
+        return from_history
+    deadline = Deadline.ensure(deadline)
+    if deadline.expired():
+        return {"status": "skipped", "resultado": "N/A (Sin tiempo para H2H Col3)"}
     url = f"{BASE_URL_OF}/match/h2h-{key_match_id}"
     try:
+        driver.set_page_load_timeout(max(1, deadline.timeout(SELENIUM_TIMEOUT_SECONDS_OF)))
         driver.get(url)
-        WebDriverWait(driver, SELENIUM_TIMEOUT_SECONDS_OF).until(EC.presence_of_element_located((By.ID, "table_v2")))
+        WebDriverWait(driver, deadline.timeout(SELENIUM_TIMEOUT_SECONDS_OF)).until(EC.presence_of_element_located((By.ID, "table_v2")))
         try:
-            select = Select(WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.ID, "hSelect_2"))))
+            select = Select(WebDriverWait(driver, deadline.timeout(5)).until(EC.presence_of_element_located((By.ID, "hSelect_2"))))
             select.select_by_value("8")
             time.sleep(0.5)
         except TimeoutException: pass
-        soup = BeautifulSoup(driver.page_source, "lxml")
+        soup = parse_h2h_fragments(driver.page_source)
     except Exception as e:
         return {"status": "error", "resultado": f"N/A (Error Selenium en H2H Col3: {type(e).__name__})"}
+    feed_team_history_of(soup, *get_team_league_info_from_script_of(soup)[:2])
     if not (table := soup.find("table", id="table_v2")):
         return {"status": "error", "resultado": "N/A (Tabla H2H Col3 no encontrada)"}
-    for row in table.find_all("tr", id=re.compile(r"tr2_\d+")):
+    for row in table.find_all("tr", id=pat.AWAY_ROW_RE):
         links = row.find_all("a", onclick=True)
         if len(links) < 2: continue
-        h_id_m = re.search(r"team\((\d+)\)", links[0].get("onclick", "")); a_id_m = re.search(r"team\((\d+)\)", links[1].get("onclick", ""))
+        h_id_m = pat.TEAM_ID_RE.search(links[0].get("onclick", "")); a_id_m = pat.TEAM_ID_RE.search(links[1].get("onclick", ""))
         if not (h_id_m and a_id_m): continue
         h_id, a_id = h_id_m.group(1), a_id_m.group(1)
         if {h_id, a_id} == {str(rival_a_id), str(rival_b_id)}:
@@ -563,19 +650,92 @@ def get_h2h_details_for_original_logic_of(driver, key_match_id, rival_a_id, riva
             }
     return {"status": "not_found", "resultado": f"H2H directo no encontrado para {rival_a_name} vs {rival_b_name}."}
 
+def feed_team_history_of(soup, home_id=None, away_id=None):
+    """Añade las tablas de una página h2h al índice de historial por equipo."""
+    try:
+        get_team_history_index().ingest_h2h_soup(soup, home_id, away_id)
+    except Exception as e:
+        print(f"Error actualizando el historial de equipos: {e}")
+
+def get_h2h_col3_from_team_history_of(rival_a_id, rival_b_id):
+    """
+    H2H Col3 desde el índice de historial, si el de rival A está al día y trae el
+    partido contra B. Devuelve None cuando el índice no puede responder (hay que ir a la
+    página del key_id_a: el historial guardado no tiene por qué ser tan largo como esa
+    tabla) y, si no, un dict con el mismo formato que get_h2h_details_for_original_logic_of.
+    """
+    index = get_team_history_index()
+    if not (rival_a_id and rival_b_id) or not index.is_fresh(rival_a_id):
+        return None
+    row = index.find_match_between(rival_a_id, rival_b_id)
+    if not row:
+        return None
+    g_h, g_a = row["score"].split("-", 1)
+    return {
+        "status": "found", "goles_home": g_h, "goles_away": g_a,
+        "handicap_line_raw": row["ah_raw"], "match_id": row["match_id"],
+        "h2h_home_team_name": row["home"], "h2h_away_team_name": row["away"],
+        "date": row["date"] or None
+    }
+
+def extract_col3_from_key_page_of(soup_key, rival_a_id, rival_b_id):
+    """
+    Versión sin Selenium de la búsqueda H2H Col3: localiza en table_v2 de la página del
+    key_id_a el partido entre rival A y rival B. Devuelve un dict o None.
+    """
+    table = soup_key.find("table", id="table_v2") if soup_key else None
+    if not table:
+        return None
+    for row in table.find_all("tr", id=pat.AWAY_ROW_RE):
+        links = row.find_all("a", onclick=True)
+        if len(links) < 2:
+            continue
+        m_h = pat.TEAM_ID_RE.search(links[0].get("onclick", ""))
+        m_a = pat.TEAM_ID_RE.search(links[1].get("onclick", ""))
+        if not (m_h and m_a):
+            continue
+        if {m_h.group(1), m_a.group(1)} == {str(rival_a_id), str(rival_b_id)}:
+            score_span = row.find("span", class_="fscore_2")
+            if not score_span or '-' not in score_span.text:
+                return None
+            score_txt = score_span.text.strip().split("(")[0].strip()
+            try:
+                g_h, g_a = score_txt.split('-', 1)
+            except Exception:
+                return None
+            tds = row.find_all("td")
+            ah_raw = "-"
+            if len(tds) > 11:
+                cell = tds[11]
+                ah_raw = (cell.get("data-o") or cell.text).strip() or "-"
+            # Fecha si existe
+            date_txt = None
+            try:
+                date_span = tds[1].find('span', attrs={'name': 'timeData'}) if len(tds) > 1 else None
+                date_txt = date_span.get_text(strip=True) if date_span else None
+            except Exception:
+                date_txt = None
+            return {
+                "score_line": f"{links[0].text.strip()} {g_h}:{g_a} {links[1].text.strip()}",
+                "ah_raw": ah_raw,
+                "match_id": row.get('index'),
+                "date": date_txt,
+            }
+    return None
+
 def get_team_league_info_from_script_of(soup):
-    script_tag = soup.find("script", string=re.compile(r"var _matchInfo = "))
+    script_tag = soup.find("script", string=pat.MATCH_INFO_RE)
     if not (script_tag and script_tag.string): return (None,) * 3 + ("N/A",) * 3
     content = script_tag.string
     def find_val(pattern):
-        match = re.search(pattern, content)
+        match = pattern.search(content)
         return match.group(1).replace("'", "") if match else None
-    home_id = find_val(r"hId:\s*parseInt\('(\d+)'\)")
-    away_id = find_val(r"gId:\s*parseInt\('(\d+)'\)")
-    league_id = find_val(r"sclassId:\s*parseInt\('(\d+)'\)")
-    home_name = find_val(r"hName:\s*'([^']*)'") or "N/A"
-    away_name = find_val(r"gName:\s*'([^']*)'") or "N/A"
-    league_name = find_val(r"lName:\s*'([^']*)'") or "N/A"
+    home_id = find_val(pat.MATCH_INFO_HOME_ID_RE)
+    away_id = find_val(pat.MATCH_INFO_AWAY_ID_RE)
+    league_id = find_val(pat.MATCH_INFO_LEAGUE_ID_RE)
+    home_name = find_val(pat.MATCH_INFO_HOME_NAME_RE) or "N/A"
+    away_name = find_val(pat.MATCH_INFO_AWAY_NAME_RE) or "N/A"
+    league_name = find_val(pat.MATCH_INFO_LEAGUE_NAME_RE) or "N/A"
     return home_id, away_id, league_id, home_name, away_name, league_name
 
 def get_match_datetime_from_script_of(soup):
@@ -585,19 +745,15 @@ def get_match_datetime_from_script_of(soup):
     """
     result = {"match_date": None, "match_time": None, "match_datetime": None}
     try:
-        script_tag = soup.find("script", string=re.compile(r"var _matchInfo = "))
+        script_tag = soup.find("script", string=pat.MATCH_INFO_RE)
         if not (script_tag and script_tag.string):
             return result
         content = script_tag.string
 
-        def find_val(pattern):
-            m = re.search(pattern, content)
-            return m.group(1) if m else None
-
         # Posibles fuentes en el script
-        match_time_txt = find_val(r"matchTime:\s*'([^']+)'")  # ej: 9/9/2025 5:00:00 PM
-        start_date = find_val(r"startDate:\s*'([^']+)'")      # ej: 2025-09-09
-        door_time = find_val(r"doorTime:\s*'([^']+)'")        # ej: 09:00:00.000+08:00
+        match_time_txt = pat.search_group(pat.MATCH_INFO_TIME_RE, content)  # ej: 9/9/2025 5:00:00 PM
+        start_date = pat.search_group(pat.START_DATE_RE, content)           # ej: 2025-09-09
+        door_time = pat.search_group(pat.DOOR_TIME_RE, content)             # ej: 09:00:00.000+08:00
 
         normalized_date = None
         normalized_time = None
@@ -625,7 +781,7 @@ def get_match_datetime_from_script_of(soup):
             normalized_date = start_date
             if door_time:
                 # Tomar HH:MM de door_time y omitir zona
-                m = re.match(r"(\d{2}):(\d{2})", door_time)
+                m = pat.CLOCK_RE.match(door_time)
                 if m:
                     normalized_time = f"{m.group(1)}:{m.group(2)}"
 
@@ -638,21 +794,21 @@ def get_match_datetime_from_script_of(soup):
     return result
 
 def _parse_date_ddmmyyyy(d: str) -> tuple:
-    m = re.search(r'(\d{2})-(\d{2})-(\d{4})', d or '')
+    m = pat.DATE_DMY_RE.search(d or '')
     return (int(m.group(3)), int(m.group(2)), int(m.group(1))) if m else (1900, 1, 1)
 
-def extract_last_match_in_league_of(soup, table_id, team_name, league_id, is_home_game):
+def extract_last_match_in_league_of(soup, table_id, team_name, league_id, is_home_game, team_id=None):
     if not soup or not (table := soup.find("table", id=table_id)): return None
     candidate_matches = []
     score_selector = 'fscore_1' if is_home_game else 'fscore_2'
-    for row in table.find_all("tr", id=re.compile(rf"tr{table_id[-1]}_\d+")):
+    for row in table.find_all("tr", id=pat.history_row_re(table_id)):
         if not (details := get_match_details_from_row_of(row, score_class_selector=score_selector, source_table_type='hist')):
             continue
         if league_id and details.get("league_id_hist") != str(league_id):
             continue
-        is_team_home = team_name.lower() in details.get('home', '').lower()
-        is_team_away = team_name.lower() in details.get('away', '').lower()
-        if (is_home_game and is_team_home) or (not is_home_game and is_team_away):
+        if is_home_game and same_team(team_name, details.get('home'), team_id, details.get('home_id')):
+            candidate_matches.append(details)
+        elif not is_home_game and same_team(team_name, details.get('away'), team_id, details.get('away_id')):
             candidate_matches.append(details)
     if not candidate_matches: return None
     candidate_matches.sort(key=lambda x: _parse_date_ddmmyyyy(x.get('date', '')), reverse=True)
@@ -660,7 +816,8 @@ def extract_last_match_in_league_of(soup, table_id, team_name, league_id, is_hom
     return {
         "date": last_match.get('date', 'N/A'), "home_team": last_match.get('home'),
         "away_team": last_match.get('away'), "score": last_match.get('score_raw', 'N/A').replace('-', ':'),
-        "handicap_line_raw": last_match.get('ahLine_raw', 'N/A'), "match_id": last_match.get('matchIndex')
+        "handicap_line_raw": last_match.get('ahLine_raw', 'N/A'), "match_id": last_match.get('matchIndex'),
+        "home_id": last_match.get('home_id'), "away_id": last_match.get('away_id')
     }
 
 def extract_bet365_initial_odds_of(soup):
@@ -681,6 +838,19 @@ def extract_bet365_initial_odds_of(soup):
         odds_info["goals_under_cuota"] = tds[10].get("data-o", tds[10].text).strip()
     return odds_info
 
+def _standings_table_of(standings_section, side, team_name):
+    """
+    Tabla de clasificación del lado `side` ('home' / 'guest') si es la de `team_name`.
+    El nombre va en el enlace de cabecera ('[AFC U23-3]Singapore U23'); antes se buscaba
+    como subcadena del texto del div y 'FC Tokyo' casaba con la tabla de 'FC Tokyo U23'.
+    """
+    side_div = standings_section.find("div", class_=f"{side}-div")
+    table = side_div.find("table", class_=f"team-table-{side}") if side_div else None
+    header_link = table.find("a") if table else None
+    if header_link and same_team(header_link.get_text(separator=" ", strip=True), team_name):
+        return table
+    return None
+
 def extract_standings_data_from_h2h_page_of(soup, team_name):
     data = {"name": team_name, "ranking": "N/A", "total_pj": "N/A", "total_v": "N/A",
             "total_e": "N/A", "total_d": "N/A", "total_gf": "N/A", "total_gc": "N/A",
@@ -694,15 +864,15 @@ def extract_standings_data_from_h2h_page_of(soup, team_name):
         return data
     team_table_soup = None
     is_home_table = False
-    home_div = standings_section.find("div", class_="home-div")
-    if home_div and team_name.lower() in home_div.get_text(strip=True).lower():
-        team_table_soup = home_div.find("table", class_="team-table-home")
+    home_table = _standings_table_of(standings_section, "home", team_name)
+    if home_table:
+        team_table_soup = home_table
         is_home_table = True
         data["specific_type"] = "Est. como Local (en Liga)"
     else:
-        guest_div = standings_section.find("div", class_="guest-div")
-        if guest_div and team_name.lower() in guest_div.get_text(strip=True).lower():
-            team_table_soup = guest_div.find("table", class_="team-table-guest")
+        guest_table = _standings_table_of(standings_section, "guest", team_name)
+        if guest_table:
+            team_table_soup = guest_table
             is_home_table = False
             data["specific_type"] = "Est. como Visitante (en Liga)"
     if not team_table_soup:
@@ -710,7 +880,7 @@ def extract_standings_data_from_h2h_page_of(soup, team_name):
     header_link = team_table_soup.find("a")
     if header_link:
         full_text = header_link.get_text(separator=" ", strip=True)
-        rank_match = re.search(r'\[.*?-(\d+)\]', full_text)
+        rank_match = pat.STANDINGS_RANK_RE.search(full_text)
         if rank_match:
             data["ranking"] = rank_match.group(1)
     all_rows = team_table_soup.find_all("tr", align="center")
@@ -758,7 +928,7 @@ def extract_over_under_stats_from_div_of(soup, team_type: str):
         return default_stats
     try:
         total_text = ou_group.find("div", class_="tit").find("span").get_text(strip=True)
-        total_match = re.search(r'\((\d+)\s*games\)', total_text)
+        total_match = pat.OU_TOTAL_GAMES_RE.search(total_text)
         total = int(total_match.group(1)) if total_match else 0
         values = ou_group.find_all("span", class_="value")
         if len(values) == 3:
@@ -770,11 +940,11 @@ def extract_over_under_stats_from_div_of(soup, team_type: str):
         return default_stats
     return default_stats
 
-def extract_h2h_data_of(soup, home_name, away_name, league_id=None):
+def extract_h2h_data_of(soup, home_name, away_name, league_id=None, home_id=None, away_id=None):
     results = {'ah1': '-', 'res1': '?:?', 'res1_raw': '?-?', 'match1_id': None, 'ah6': '-', 'res6': '?:?', 'res6_raw': '?-?', 'match6_id': None, 'h2h_gen_home': "Local (H2H Gen)", 'h2h_gen_away': "Visitante (H2H Gen)"}
     if not soup or not home_name or not away_name or not (h2h_table := soup.find("table", id="table_v3")): return results
     all_matches = []
-    for r in h2h_table.find_all("tr", id=re.compile(r"tr3_\d+")):
+    for r in h2h_table.find_all("tr", id=pat.H2H_ROW_RE):
         if (d := get_match_details_from_row_of(r, score_class_selector='fscore_3', source_table_type='h2h')):
             if not league_id or (d.get('league_id_hist') and d.get('league_id_hist') == str(league_id)):
                 all_matches.append(d)
@@ -783,21 +953,22 @@ def extract_h2h_data_of(soup, home_name, away_name, league_id=None):
     most_recent = all_matches[0]
     results.update({'ah6': most_recent.get('ahLine', '-'), 'res6': most_recent.get('score', '?:?'), 'res6_raw': most_recent.get('score_raw', '?-?'), 'match6_id': most_recent.get('matchIndex'), 'h2h_gen_home': most_recent.get('home'), 'h2h_gen_away': most_recent.get('away')})
     for d in all_matches:
-        if d['home'].lower() == home_name.lower() and d['away'].lower() == away_name.lower():
+        if same_team(home_name, d['home'], home_id, d.get('home_id')) and same_team(away_name, d['away'], away_id, d.get('away_id')):
             results.update({'ah1': d.get('ahLine', '-'), 'res1': d.get('score', '?:?'), 'res1_raw': d.get('score_raw', '?-?'), 'match1_id': d.get('matchIndex')})
             break
     return results
 
-def extract_comparative_match_of(soup, table_id, main_team, opponent, league_id, is_home_table):
+def extract_comparative_match_of(soup, table_id, main_team, opponent, league_id, is_home_table, main_team_id=None, opponent_id=None):
     if not opponent or opponent == "N/A" or not main_team or not (table := soup.find("table", id=table_id)): return None
     score_selector = 'fscore_1' if is_home_table else 'fscore_2'
-    for row in table.find_all("tr", id=re.compile(rf"tr{table_id[-1]}_\d+")):
+    for row in table.find_all("tr", id=pat.history_row_re(table_id)):
         if not (details := get_match_details_from_row_of(row, score_class_selector=score_selector, source_table_type='hist')): continue
         if league_id and details.get('league_id_hist') and details.get('league_id_hist') != str(league_id): continue
-        h, a = details.get('home','').lower(), details.get('away','').lower()
-        main, opp = main_team.lower(), opponent.lower()
-        if (main == h and opp == a) or (main == a and opp == h):
-            return {"score": details.get('score', '?:?'), "ah_line": details.get('ahLine', '-'), "localia": 'H' if main == h else 'A', "home_team": details.get('home'), "away_team": details.get('away'), "match_id": details.get('matchIndex')}
+        main_is_home = same_team(main_team, details.get('home'), main_team_id, details.get('home_id'))
+        main_is_away = same_team(main_team, details.get('away'), main_team_id, details.get('away_id'))
+        if (main_is_home and same_team(opponent, details.get('away'), opponent_id, details.get('away_id'))) or \
+                (main_is_away and same_team(opponent, details.get('home'), opponent_id, details.get('home_id'))):
+            return {"score": details.get('score', '?:?'), "ah_line": details.get('ahLine', '-'), "localia": 'H' if main_is_home else 'A', "home_team": details.get('home'), "away_team": details.get('away'), "match_id": details.get('matchIndex')}
     return None
 
 def extract_indirect_comparison_data(soup):
@@ -817,15 +988,15 @@ def extract_indirect_comparison_data(soup):
             main_team_name = title.split(' vs. ')[0]
 
             # Resultado: "0 : 1"
-            res_text = box_soup.find(string=re.compile(r"Res\s*:")).find_next("span").get_text(strip=True)
+            res_text = box_soup.find(string=pat.COMPARISON_RES_RE).find_next("span").get_text(strip=True)
             res_raw = res_text.replace(' ', '').replace(':', '-')
 
             # Hándicap Asiático: "AH: 4"
-            ah_text = box_soup.find(string=re.compile(r"AH\s*:")).find_next("span").get_text(strip=True)
+            ah_text = box_soup.find(string=pat.COMPARISON_AH_RE).find_next("span").get_text(strip=True)
             ah_num = parse_ah_to_number_of(ah_text)
 
             # Localía: "H" o "A"
-            localia_text = box_soup.find(string=re.compile(r"Localía de")).find_next("span").get_text(strip=True)
+            localia_text = box_soup.find(string=pat.COMPARISON_LOCALIA_RE).find_next("span").get_text(strip=True)
 
             # Estadísticas
             stats = {}
@@ -860,15 +1031,71 @@ def extract_indirect_comparison_data(soup):
 
     return data
 
+def parse_h2h_page_record(match_id, html):
+    """
+    Extracción completa de una página h2h sin red ni Selenium: pensada para correr en
+    un proceso del pool de parseo (parse_pool.py). Recibe el HTML (bytes o str) y
+    devuelve un registro compacto de tipos básicos, que se puede pasar entre procesos.
+    Las filas para el historial de equipos van en 'history_rows' (el índice vive en el
+    proceso principal).
+    """
+    soup = parse_h2h_fragments(html)
+    home_id, away_id, league_id, home_name, away_name, league_name = get_team_league_info_from_script_of(soup)
+    key_id_a, rival_a_id, rival_a_name = get_rival_a_for_original_h2h_of(soup, league_id)
+    key_id_b, rival_b_id, rival_b_name = get_rival_b_for_original_h2h_of(soup, league_id)
+    return {
+        "match_id": str(match_id),
+        "home_id": home_id, "away_id": away_id, "league_id": league_id,
+        "home_name": home_name, "away_name": away_name, "league_name": league_name,
+        **get_match_datetime_from_script_of(soup),
+        "main_odds": extract_bet365_initial_odds_of(soup),
+        "h2h_data": extract_h2h_data_of(soup, home_name, away_name, None, home_id, away_id),
+        "last_home": extract_last_match_in_league_of(soup, "table_v1", home_name, league_id, True, home_id),
+        "last_away": extract_last_match_in_league_of(soup, "table_v2", away_name, league_id, False, away_id),
+        "standings": {
+            "home": extract_standings_data_from_h2h_page_of(soup, home_name),
+            "away": extract_standings_data_from_h2h_page_of(soup, away_name),
+        },
+        "over_under": {
+            "home": extract_over_under_stats_from_div_of(soup, 'home'),
+            "away": extract_over_under_stats_from_div_of(soup, 'away'),
+        },
+        "rival_a": {"key_match_id": key_id_a, "id": rival_a_id, "name": rival_a_name},
+        "rival_b": {"key_match_id": key_id_b, "id": rival_b_id, "name": rival_b_name},
+        "common_rivals": compare_common_rivals_preview_of(soup, home_name, away_name),
+        "indirect_comparison": extract_indirect_comparison_data(soup),
+        "history_rows": extract_history_rows(soup),
+    }
+
 # --- FUNCIÓN PRINCIPAL DE EXTRACCIÓN ---
 
-def obtener_datos_completos_partido(match_id: str):
+def obtener_datos_completos_partido(match_id: str, deadline=None, on_section=None):
     """
     Función principal que orquesta todo el scraping y análisis para un ID de partido.
     Devuelve un diccionario con todos los datos necesarios para la plantilla HTML.
+    Si el Deadline se agota, devuelve lo que haya reunido hasta entonces con
+    datos["partial"] = True (las etapas opcionales se saltan).
+    on_section(nombre, payload) recibe cada sección (serializable a JSON) en cuanto
+    está lista, para las rutas que la van enviando por streaming.
     """
     if not match_id or not match_id.isdigit():
         return {"error": "ID de partido inválido."}
+    deadline = Deadline.ensure(deadline)
+
+    def _emit(section, payload):
+        if on_section is None:
+            return
+        try:
+            on_section(section, payload)
+        except Exception as e:
+            print(f"Error emitiendo la sección '{section}' de {match_id}: {e}")
+
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from modules.analisis_avanzado import generar_analisis_comparativas_indirectas
+    from modules.analisis_reciente import analizar_rendimiento_reciente_con_handicap, comparar_lineas_handicap_recientes
+    from modules.analisis_rivales import analizar_rivales_comunes, analizar_contra_rival_del_rival
+    from modules.funciones_resumen import generar_resumen_rendimiento_reciente
 
     # --- Inicialización de Selenium ---
     options = ChromeOptions()
@@ -881,24 +1108,16 @@ def obtener_datos_completos_partido(match_id: str):
     driver = webdriver.Chrome(options=options)
     
     main_page_url = f"{BASE_URL_OF}/match/h2h-{match_id}"
-    datos = {"match_id": match_id}
+    datos = {"match_id": match_id, "partial": False}
 
     try:
         # --- Carga y Parseo de la Página Principal ---
-        driver.get(main_page_url)
-        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.ID, "table_v1")))
-        for select_id in ["hSelect_1", "hSelect_2", "hSelect_3"]:
-            try:
-                Select(WebDriverWait(driver, 3).until(EC.presence_of_element_located((By.ID, select_id)))).select_by_value("8")
-                # Usamos una espera explícita más eficiente en lugar de time.sleep
-                WebDriverWait(driver, 1).until(EC.text_to_be_present_in_element((By.ID, select_id), "8"))
-            except TimeoutException:
-                continue
-        soup_completo = BeautifulSoup(driver.page_source, "lxml")
+        soup_completo = parse_h2h_fragments(load_h2h_page_with_selenium(driver, main_page_url, deadline))
         datos['final_score'] = extract_final_score_of(soup_completo)
 
         # --- Extracción de Datos Primarios ---
         home_id, away_id, league_id, home_name, away_name, league_name = get_team_league_info_from_script_of(soup_completo)
+        feed_team_history_of(soup_completo, home_id, away_id)
         # Fecha/hora del partido (si está en el script)
         dt_info = get_match_datetime_from_script_of(soup_completo)
         datos.update({
@@ -909,6 +1128,7 @@ def obtener_datos_completos_partido(match_id: str):
             "match_time": dt_info.get("match_time"),
             "match_datetime": dt_info.get("match_datetime"),
         })
+        _emit("match", {key: datos.get(key) for key in ("match_id", "home_name", "away_name", "league_name", "match_date", "match_time", "final_score")})
 
         # --- Recopilación de todos los datos en paralelo (donde sea posible) ---
         with ThreadPoolExecutor(max_workers=8) as executor:
@@ -918,15 +1138,15 @@ def obtener_datos_completos_partido(match_id: str):
             future_home_ou = executor.submit(extract_over_under_stats_from_div_of, soup_completo, 'home')
             future_away_ou = executor.submit(extract_over_under_stats_from_div_of, soup_completo, 'away')
             future_main_odds = executor.submit(extract_bet365_initial_odds_of, soup_completo)
-            future_h2h_data = executor.submit(extract_h2h_data_of, soup_completo, home_name, away_name, None)
-            future_last_home = executor.submit(extract_last_match_in_league_of, soup_completo, "table_v1", home_name, league_id, True)
-            future_last_away = executor.submit(extract_last_match_in_league_of, soup_completo, "table_v2", away_name, league_id, False)
+            future_h2h_data = executor.submit(extract_h2h_data_of, soup_completo, home_name, away_name, None, home_id, away_id)
+            future_last_home = executor.submit(extract_last_match_in_league_of, soup_completo, "table_v1", home_name, league_id, True, home_id)
+            future_last_away = executor.submit(extract_last_match_in_league_of, soup_completo, "table_v2", away_name, league_id, False, away_id)
             
             # Tarea H2H Col3 (requiere una nueva llamada de Selenium)
             key_id_a, rival_a_id, rival_a_name = get_rival_a_for_original_h2h_of(soup_completo, league_id)
             _, rival_b_id, rival_b_name = get_rival_b_for_original_h2h_of(soup_completo, league_id)
             # Usar el driver principal ya creado en lugar de crear uno nuevo
-            future_h2h_col3 = executor.submit(get_h2h_details_for_original_logic_of, driver, key_id_a, rival_a_id, rival_b_id, rival_a_name, rival_b_name)
+            future_h2h_col3 = executor.submit(get_h2h_details_for_original_logic_of, driver, key_id_a, rival_a_id, rival_b_id, rival_a_name, rival_b_name, deadline)
             
             # Obtener resultados
             datos["home_standings"] = future_home_standings.result()
@@ -937,13 +1157,19 @@ def obtener_datos_completos_partido(match_id: str):
             h2h_data = future_h2h_data.result()
             datos["main_match_odds_data"] = main_match_odds_data
             datos["h2h_data"] = h2h_data
+            _emit("standings", {key: datos[key] for key in ("home_standings", "away_standings", "home_ou_stats", "away_ou_stats")})
+            _emit("h2h", h2h_data)
             last_home_match = future_last_home.result()
             last_away_match = future_last_away.result()
+            _emit("last_matches", {"last_home": last_home_match, "last_away": last_away_match})
             details_h2h_col3 = future_h2h_col3.result()
+            _emit("h2h_col3", details_h2h_col3)
 
             # --- Comparativas (dependen de los resultados anteriores) ---
-            comp_L_vs_UV_A = extract_comparative_match_of(soup_completo, "table_v1", home_name, (last_away_match or {}).get('home_team'), league_id, True)
-            comp_V_vs_UL_H = extract_comparative_match_of(soup_completo, "table_v2", away_name, (last_home_match or {}).get('away_team'), league_id, False)
+            comp_L_vs_UV_A = extract_comparative_match_of(soup_completo, "table_v1", home_name, (last_away_match or {}).get('home_team'), league_id, True, home_id, (last_away_match or {}).get('home_id'))
+            comp_V_vs_UL_H = extract_comparative_match_of(soup_completo, "table_v2", away_name, (last_home_match or {}).get('away_team'), league_id, False, away_id, (last_home_match or {}).get('away_id'))
+
+            _emit("comparativas", {"comp_L_vs_UV_A": comp_L_vs_UV_A, "comp_V_vs_UL_H": comp_V_vs_UL_H})
 
             # --- Generar Análisis de Mercado ---
             datos["market_analysis_html"] = generar_analisis_completo_mercado(main_match_odds_data, h2h_data, home_name, away_name)
@@ -953,6 +1179,8 @@ def obtener_datos_completos_partido(match_id: str):
                 "ah_linea": format_ah_as_decimal_string_of(main_match_odds_data.get('ah_linea_raw', '?')),
                 "goals_linea": format_ah_as_decimal_string_of(main_match_odds_data.get('goals_linea_raw', '?'))
             }
+            _emit("odds", {"raw": main_match_odds_data, **datos["main_match_odds"]})
+            _emit("market_analysis", {"html": datos["market_analysis_html"]})
             
             # Recopilar todos los IDs de partidos históricos para obtener sus estadísticas de progresión
             match_ids_to_fetch_stats = {
@@ -965,11 +1193,9 @@ def obtener_datos_completos_partido(match_id: str):
                 'h2h_general': h2h_data.get('match6_id')
             }
             
-            # Obtener estadísticas de progresión en paralelo
-            stats_futures = {key: executor.submit(get_match_progression_stats_data, match_id)
-                             for key, match_id in match_ids_to_fetch_stats.items() if match_id}
-                             
-            stats_results = {key: future.result() for key, future in stats_futures.items()}
+            # Obtener estadísticas de progresión en paralelo, con lo que quede del presupuesto
+            stats_results = fetch_stats_and_pages_batch(match_ids_to_fetch_stats, deadline=deadline)
+            _emit("stats", {key: stats_to_rows(stats) for key, stats in stats_results.items()})
 
             # Empaquetar todo en el diccionario de datos final
             datos['last_home_match'] = {'details': last_home_match, 'stats': stats_results.get('last_home')}
@@ -980,6 +1206,12 @@ def obtener_datos_completos_partido(match_id: str):
             datos['h2h_stadium'] = {'details': h2h_data, 'stats': stats_results.get('h2h_stadium')}
             datos['h2h_general'] = {'details': h2h_data, 'stats': stats_results.get('h2h_general')}
 
+            # Sin presupuesto para los análisis: devolvemos lo reunido hasta aquí
+            if deadline.expired():
+                datos["partial"] = True
+                datos["advanced_analysis_html"] = ""
+                return datos
+
             # --- ANÁLISIS AVANZADO DE COMPARATIVAS INDIRECTAS ---
             # Extraer los datos de las comparativas indirectas
             indirect_comparison_data = extract_indirect_comparison_data(soup_completo)
@@ -992,23 +1224,25 @@ def obtener_datos_completos_partido(match_id: str):
             current_ah_line = parse_ah_to_number_of(main_match_odds_data.get('ah_linea_raw', '0'))
             
             # Analizar rendimiento reciente con handicap para equipo local
-            rendimiento_local = analizar_rendimiento_reciente_con_handicap(soup_completo, home_name, True)
+            rendimiento_local = analizar_rendimiento_reciente_con_handicap(soup_completo, home_name, True, home_id)
             datos["rendimiento_local_handicap"] = rendimiento_local
             
             # Analizar rendimiento reciente con handicap para equipo visitante
-            rendimiento_visitante = analizar_rendimiento_reciente_con_handicap(soup_completo, away_name, False)
+            rendimiento_visitante = analizar_rendimiento_reciente_con_handicap(soup_completo, away_name, False, away_id)
             datos["rendimiento_visitante_handicap"] = rendimiento_visitante
             
             # Comparar líneas de handicap recientes con la línea actual
             if current_ah_line is not None:
-                comparacion_local = comparar_lineas_handicap_recientes(soup_completo, home_name, current_ah_line, True)
+                comparacion_local = comparar_lineas_handicap_recientes(soup_completo, home_name, current_ah_line, True, home_id)
                 datos["comparacion_lineas_local"] = comparacion_local
                 
-                comparacion_visitante = comparar_lineas_handicap_recientes(soup_completo, away_name, current_ah_line, False)
+                comparacion_visitante = comparar_lineas_handicap_recientes(soup_completo, away_name, current_ah_line, False, away_id)
                 datos["comparacion_lineas_visitante"] = comparacion_visitante
             
             # --- ANÁLISIS DE RIVALES COMUNES ---
-            rivales_comunes = analizar_rivales_comunes(soup_completo, home_name, away_name)
+            # Índices por rival de table_v1/table_v2, compartidos por los tres análisis siguientes
+            opponent_indexes = build_opponent_indexes(soup_completo)
+            rivales_comunes = analizar_rivales_comunes(soup_completo, home_name, away_name, opponent_indexes)
             datos["rivales_comunes"] = rivales_comunes
             
             # --- ANÁLISIS CONTRA RIVAL DEL RIVAL ---
@@ -1018,14 +1252,18 @@ def obtener_datos_completos_partido(match_id: str):
             
             if rival_local_rival != 'N/A' and rival_visitante_rival != 'N/A':
                 analisis_contra_rival = analizar_contra_rival_del_rival(
-                    soup_completo, home_name, away_name, rival_local_rival, rival_visitante_rival
+                    soup_completo, home_name, away_name, rival_local_rival, rival_visitante_rival, opponent_indexes
                 )
                 datos["analisis_contra_rival_del_rival"] = analisis_contra_rival
             
             # --- ANÁLISIS DE RENDIMIENTO RECIENTE Y COMPARATIVAS INDIRECTAS ---
             # Generar resumen gráfico de rendimiento reciente y comparativas indirectas
-            resumen_rendimiento = generar_resumen_rendimiento_reciente(soup_completo, home_name, away_name, current_ah_line)
+            resumen_rendimiento = generar_resumen_rendimiento_reciente(soup_completo, home_name, away_name, current_ah_line, opponent_indexes)
             datos["resumen_rendimiento_reciente"] = resumen_rendimiento
+            _emit("analysis", {key: datos.get(key) for key in (
+                "advanced_analysis_html", "rendimiento_local_handicap", "rendimiento_visitante_handicap",
+                "comparacion_lineas_local", "comparacion_lineas_visitante", "rivales_comunes",
+                "analisis_contra_rival_del_rival", "resumen_rendimiento_reciente")})
             
             # --- FUNCIONES AUXILIARES PARA LA PLANTILLA ---
             # Añadir funciones auxiliares para el análisis gráfico
@@ -1067,13 +1305,17 @@ def obtener_datos_completos_partido(match_id: str):
 
 # ... (al final del archivo, después de obtener_datos_completos_partido)
 
-def obtener_datos_preview_rapido(match_id: str):
+def obtener_datos_preview_rapido(match_id: str, deadline=None):
     """
     Scraper ultraligero y optimizado para obtener solo los datos de la vista previa.
     Usa 'requests' para ser extremadamente rápido y evitar Selenium.
     """
     if not match_id or not match_id.isdigit():
         return {"error": "ID de partido inválido."}
+    deadline = Deadline.ensure(deadline)
+
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
 
     url = f"{BASE_URL_OF}/match/h2h-{match_id}"
     try:
@@ -1086,19 +1328,12 @@ def obtener_datos_preview_rapido(match_id: str):
         options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/116.0.0.0 Safari/537.36")
         options.add_argument('--blink-settings=imagesEnabled=false')
         driver = webdriver.Chrome(options=options)
-        driver.get(url)
-        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.ID, "table_v1")))
         # Ajustar selects a 8, igual que en el flujo completo
-        for select_id in ["hSelect_1", "hSelect_2", "hSelect_3"]:
-            try:
-                Select(WebDriverWait(driver, 3).until(EC.presence_of_element_located((By.ID, select_id)))).select_by_value("8")
-                WebDriverWait(driver, 1).until(EC.text_to_be_present_in_element((By.ID, select_id), "8"))
-            except TimeoutException:
-                continue
-        soup = BeautifulSoup(driver.page_source, 'lxml')
+        soup = parse_h2h_fragments(load_h2h_page_with_selenium(driver, url, deadline))
 
         # 2. Extraer identificadores y nombres (igual que en el scraper completo)
-        _, _, league_id, home_name, away_name, _ = get_team_league_info_from_script_of(soup)
+        home_id, away_id, league_id, home_name, away_name, _ = get_team_league_info_from_script_of(soup)
+        feed_team_history_of(soup, home_id, away_id)
         dt_info = get_match_datetime_from_script_of(soup)
 
         # 2b. Extraer línea AH actual (Bet365 inicial)
@@ -1113,11 +1348,11 @@ def obtener_datos_preview_rapido(match_id: str):
                 favorito_actual = away_name
 
         # 3. Analizar Rendimiento Reciente (últimos 8 partidos)
-        def analizar_rendimiento(tabla_id, equipo_nombre):
+        def analizar_rendimiento(tabla_id, equipo_nombre, equipo_id=None):
             tabla = soup.find("table", id=tabla_id)
             if not tabla:
                 return {"wins": 0, "draws": 0, "losses": 0, "total": 0}
-            partidos = tabla.find_all("tr", id=re.compile(rf"tr{tabla_id[-1]}_\d+"), limit=8)
+            partidos = tabla.find_all("tr", id=pat.history_row_re(tabla_id), limit=8)
             wins = draws = losses = 0
             for r in partidos:
                 celdas = r.find_all("td")
@@ -1140,13 +1375,13 @@ def obtener_datos_preview_rapido(match_id: str):
                     continue
                 score_text = celdas[3].get_text(strip=True)
                 try:
-                    goles_local, goles_visitante = map(int, re.split(r'[-:]', score_text))
+                    goles_local, goles_visitante = map(int, pat.SCORE_SPLIT_RE.split(score_text))
                 except Exception:
                     continue
                 home_t = celdas[2].get_text(strip=True)
                 away_t = celdas[4].get_text(strip=True)
-                equipo_es_local = equipo_nombre.lower() in home_t.lower()
-                equipo_es_visitante = equipo_nombre.lower() in away_t.lower()
+                equipo_es_local = same_team(equipo_nombre, home_t, equipo_id, team_id_from_cell(celdas[2]))
+                equipo_es_visitante = same_team(equipo_nombre, away_t, equipo_id, team_id_from_cell(celdas[4]))
                 if not equipo_es_local and not equipo_es_visitante:
                     continue
                 if equipo_es_local:
@@ -1165,28 +1400,29 @@ def obtener_datos_preview_rapido(match_id: str):
                         draws += 1
             return {"wins": wins, "draws": draws, "losses": losses, "total": len(partidos)}
 
-        rendimiento_local = analizar_rendimiento("table_v1", home_name)
-        rendimiento_visitante = analizar_rendimiento("table_v2", away_name)
+        rendimiento_local = analizar_rendimiento("table_v1", home_name, home_id)
+        rendimiento_visitante = analizar_rendimiento("table_v2", away_name, away_id)
 
         # 4. Analizar H2H Directo (últimos 8 enfrentamientos)
         # 3. H2H directo, usando la misma función del flujo principal
         h2h_stats = {"home_wins": 0, "away_wins": 0, "draws": 0}
         last_h2h_cover = "DESCONOCIDO"
         try:
-            h2h_data = extract_h2h_data_of(soup, home_name, away_name, None)
+            h2h_data = extract_h2h_data_of(soup, home_name, away_name, None, home_id, away_id)
             # Contar wins/draws a partir de tabla (como antes)
             h2h_table = soup.find("table", id="table_v3")
             if h2h_table:
-                partidos_h2h = h2h_table.find_all("tr", id=re.compile(r"tr3_\d+"), limit=8)
+                partidos_h2h = h2h_table.find_all("tr", id=pat.H2H_ROW_RE, limit=8)
                 for r in partidos_h2h:
                     tds = r.find_all("td")
                     if len(tds) < 5:
                         continue
                     home_h2h = tds[2].get_text(strip=True)
+                    home_h2h_id = team_id_from_cell(tds[2])
                     resultado_raw = tds[3].get_text(strip=True)
                     try:
                         goles_h, goles_a = map(int, resultado_raw.split("-"))
-                        es_local_en_h2h = home_name.lower() in home_h2h.lower()
+                        es_local_en_h2h = same_team(home_name, home_h2h, home_id, home_h2h_id)
                         if goles_h == goles_a:
                             h2h_stats["draws"] += 1
                         elif (es_local_en_h2h and goles_h > goles_a) or (not es_local_en_h2h and goles_a > goles_h):
@@ -1216,19 +1452,22 @@ def obtener_datos_preview_rapido(match_id: str):
         # 4. Datos de Rendimiento Reciente (último partido de cada uno) y H2H Rivales (Col3)
         recent_indirect = {"last_home": None, "last_away": None, "h2h_col3": None}
         try:
-            # Último del local en liga
-            last_home = extract_last_match_in_league_of(soup, "table_v1", home_name, league_id, True)
-            last_home_stats = get_match_progression_stats_data(str(last_home.get('match_id'))) if last_home and last_home.get('match_id') else None
-            def _df_to_rows(df):
-                rows = []
-                try:
-                    if df is not None and not df.empty:
-                        for idx, row in df.iterrows():
-                            label = idx.replace('Shots on Goal', 'Tiros a Puerta').replace('Shots', 'Tiros').replace('Dangerous Attacks', 'Ataques Peligrosos').replace('Attacks', 'Ataques')
-                            rows.append({"label": label, "home": row.get('Casa', ''), "away": row.get('Fuera', '')})
-                except Exception:
-                    pass
-                return rows
+            # Último del local y del visitante en liga
+            last_home = extract_last_match_in_league_of(soup, "table_v1", home_name, league_id, True, home_id)
+            last_away = extract_last_match_in_league_of(soup, "table_v2", away_name, league_id, False, away_id)
+            # H2H Rivales (Col3): necesita el driver, así que va antes del lote de estadísticas
+            key_id_a, rival_a_id, rival_a_name = get_rival_a_for_original_h2h_of(soup, league_id)
+            _, rival_b_id, rival_b_name = get_rival_b_for_original_h2h_of(soup, league_id)
+            col3 = None
+            if key_id_a and rival_a_id and rival_b_id:
+                col3 = get_h2h_details_for_original_logic_of(driver, key_id_a, rival_a_id, rival_b_id, rival_a_name, rival_b_name, deadline)
+                if not (col3 and col3.get('status') == 'found'):
+                    col3 = None
+            batch = fetch_stats_and_pages_batch({
+                "last_home": (last_home or {}).get('match_id'),
+                "last_away": (last_away or {}).get('match_id'),
+                "h2h_col3": (col3 or {}).get('match_id'),
+            }, deadline=deadline)
             if last_home:
                 recent_indirect["last_home"] = {
                     "home": last_home.get('home_team'),
@@ -1236,12 +1475,9 @@ def obtener_datos_preview_rapido(match_id: str):
                     "score": last_home.get('score'),
                     "ah": format_ah_as_decimal_string_of(last_home.get('handicap_line_raw', '-') or '-'),
                     "ou": "-",
-                    "stats_rows": _df_to_rows(last_home_stats),
+                    "stats_rows": stats_to_rows(batch.get("last_home")),
                     "date": last_home.get('date')
                 }
-            # Último del visitante en liga
-            last_away = extract_last_match_in_league_of(soup, "table_v2", away_name, league_id, False)
-            last_away_stats = get_match_progression_stats_data(str(last_away.get('match_id'))) if last_away and last_away.get('match_id') else None
             if last_away:
                 recent_indirect["last_away"] = {
                     "home": last_away.get('home_team'),
@@ -1249,98 +1485,25 @@ def obtener_datos_preview_rapido(match_id: str):
                     "score": last_away.get('score'),
                     "ah": format_ah_as_decimal_string_of(last_away.get('handicap_line_raw', '-') or '-'),
                     "ou": "-",
-                    "stats_rows": _df_to_rows(last_away_stats),
+                    "stats_rows": stats_to_rows(batch.get("last_away")),
                     "date": last_away.get('date')
                 }
-            # H2H Rivales (Col3)
-            key_id_a, rival_a_id, rival_a_name = get_rival_a_for_original_h2h_of(soup, league_id)
-            _, rival_b_id, rival_b_name = get_rival_b_for_original_h2h_of(soup, league_id)
-            if key_id_a and rival_a_id and rival_b_id:
-                col3 = get_h2h_details_for_original_logic_of(driver, key_id_a, rival_a_id, rival_b_id, rival_a_name, rival_b_name)
-                if col3 and col3.get('status') == 'found':
-                    score_line = f"{col3.get('h2h_home_team_name')} {col3.get('goles_home')}:{col3.get('goles_away')} {col3.get('h2h_away_team_name')}"
-                    col3_stats = get_match_progression_stats_data(str(col3.get('match_id')))
-                    recent_indirect["h2h_col3"] = {
-                        "score_line": score_line,
-                        "ah": format_ah_as_decimal_string_of(col3.get('handicap', '-') or '-'),
-                        "ou": "-",
-                        "stats_rows": _df_to_rows(col3_stats),
-                        "date": col3.get('date')
-                    }
+            if col3:
+                score_line = f"{col3.get('h2h_home_team_name')} {col3.get('goles_home')}:{col3.get('goles_away')} {col3.get('h2h_away_team_name')}"
+                recent_indirect["h2h_col3"] = {
+                    "score_line": score_line,
+                    "ah": format_ah_as_decimal_string_of(col3.get('handicap', '-') or '-'),
+                    "ou": "-",
+                    "stats_rows": stats_to_rows(batch.get("h2h_col3")),
+                    "date": col3.get('date')
+                }
         except Exception:
             pass
 
         # 5. Calcular H2H Indirecto (rivales comunes) de forma ligera
         indirect = {"home_better": 0, "away_better": 0, "draws": 0, "samples": []}
         try:
-            table_v1 = soup.find("table", id="table_v1")
-            table_v2 = soup.find("table", id="table_v2")
-
-            def _parse_score_to_tuple(score_text):
-                try:
-                    gh, ga = map(int, score_text.strip().split("-"))
-                    return gh, ga
-                except Exception:
-                    return None
-
-            def _find_match_info(table, rival_name_lower, team_name_ref):
-                if not table:
-                    return None
-                rows = table.find_all("tr", id=re.compile(r"tr[12]_\\d+"))
-                for r in rows:
-                    tds = r.find_all("td")
-                    if len(tds) < 5:
-                        continue
-                    home_t = tds[2].get_text(strip=True)
-                    away_t = tds[4].get_text(strip=True)
-                    if away_t.lower() == rival_name_lower or home_t.lower() == rival_name_lower:
-                        score_text = tds[3].get_text(strip=True)
-                        score = _parse_score_to_tuple(score_text)
-                        if not score:
-                            continue
-                        gh, ga = score
-                        if home_t.lower() == team_name_ref.lower():
-                            margin = gh - ga
-                        elif away_t.lower() == team_name_ref.lower():
-                            margin = ga - gh
-                        else:
-                            margin = gh - ga
-                        return {"rival": rival_name_lower, "margin": margin}
-                return None
-
-            if table_v1 and table_v2:
-                rivals_home = set()
-                for r in table_v1.find_all("tr", id=re.compile(r"tr1_\\d+")):
-                    tds = r.find_all("td")
-                    if len(tds) >= 5:
-                        rivals_home.add(tds[4].get_text(strip=True).lower())
-                rivals_away = set()
-                for r in table_v2.find_all("tr", id=re.compile(r"tr2_\\d+")):
-                    tds = r.find_all("td")
-                    if len(tds) >= 5:
-                        rivals_away.add(tds[2].get_text(strip=True).lower())
-                common = [rv for rv in rivals_home.intersection(rivals_away) if rv and rv != '?']
-                common = common[:3]
-                for rv in common:
-                    home_info = _find_match_info(table_v1, rv, home_name)
-                    away_info = _find_match_info(table_v2, rv, away_name)
-                    if not home_info or not away_info:
-                        continue
-                    if home_info["margin"] > away_info["margin"]:
-                        indirect["home_better"] += 1
-                        verdict = "home"
-                    elif home_info["margin"] < away_info["margin"]:
-                        indirect["away_better"] += 1
-                        verdict = "away"
-                    else:
-                        indirect["draws"] += 1
-                        verdict = "draw"
-                    indirect["samples"].append({
-                        "rival": rv,
-                        "home_margin": home_info["margin"],
-                        "away_margin": away_info["margin"],
-                        "verdict": verdict
-                    })
+            indirect = compare_common_rivals_preview_of(soup, home_name, away_name)
         except Exception:
             # Ignorar errores de comparativas indirectas en la vista previa
             pass
@@ -1373,9 +1536,8 @@ def obtener_datos_preview_rapido(match_id: str):
                     "very_superior": bool((own_ap - rival_ap) >= 5)
                 }
             # Identificar el bloque correspondiente al favorito
-            fav_name = (favorito_actual or '').lower()
             for key in ['team1','team2']:
-                if key in ataques_peligrosos and ataques_peligrosos[key]['name'].lower() == fav_name:
+                if key in ataques_peligrosos and same_team(ataques_peligrosos[key]['name'], favorito_actual):
                     favorite_da = {
                         "name": ataques_peligrosos[key]['name'],
                         "very_superior": ataques_peligrosos[key]['very_superior'],
@@ -1403,7 +1565,8 @@ def obtener_datos_preview_rapido(match_id: str):
             "dangerous_attacks": ataques_peligrosos,
             "favorite_dangerous_attacks": favorite_da,
             "h2h_indirect": indirect,
-            "h2h_stats": h2h_stats
+            "h2h_stats": h2h_stats,
+            "partial": deadline.expired()
         }
 
         return result
@@ -1422,24 +1585,30 @@ def obtener_datos_preview_rapido(match_id: str):
 
 
 
-def obtener_datos_preview_ligero(match_id: str):
+def obtener_datos_preview_ligero(match_id: str, deadline=None):
     """
     Vista previa LIGERA (solo on-click): usa requests + BeautifulSoup.
     Devuelve el mismo esquema que la versión 'rápida' con Selenium, pero sin abrir navegador.
     """
     if not match_id or not match_id.isdigit():
         return {"error": "ID de partido inválido."}
+    deadline = Deadline.ensure(deadline)
 
     url = f"{BASE_URL_OF}/match/h2h-{match_id}"
     try:
-        session = requests.Session()
-        session.headers.update({"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/116.0.0.0 Safari/537.36"})
-        response = session.get(url, timeout=5)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'lxml')
+        # La página principal también pasa por el lote: así los reintentos de urllib3
+        # quedan dentro del presupuesto de la petición
+        main_html = fetch_stats_and_pages_batch(pages={"main": url}, deadline=deadline).get("main")
+        if main_html is None:
+            # None también es un 404/5xx o un error de red: solo es "tardó demasiado" si se agotó el plazo
+            if deadline.expired():
+                return {"error": "La fuente de datos (Nowgoal) tardó demasiado en responder."}
+            return {"error": "No se pudieron obtener los datos de la vista previa (ligera): la página principal no respondió."}
+        soup = parse_h2h_fragments(main_html)
 
         # Equipos
-        _, _, league_id, home_name, away_name, _ = get_team_league_info_from_script_of(soup)
+        home_id, away_id, league_id, home_name, away_name, _ = get_team_league_info_from_script_of(soup)
+        feed_team_history_of(soup, home_id, away_id)
         dt_info = get_match_datetime_from_script_of(soup)
 
         # Línea AH (Bet365 inicial)
@@ -1454,11 +1623,11 @@ def obtener_datos_preview_ligero(match_id: str):
                 favorito_actual = away_name
 
         # Rendimiento reciente (últimos 8)
-        def analizar_rendimiento(tabla_id, equipo_nombre):
+        def analizar_rendimiento(tabla_id, equipo_nombre, equipo_id=None):
             tabla = soup.find("table", id=tabla_id)
             if not tabla:
                 return {"wins": 0, "draws": 0, "losses": 0, "total": 0}
-            partidos = tabla.find_all("tr", id=re.compile(rf"tr{tabla_id[-1]}_\\d+"), limit=8)
+            partidos = tabla.find_all("tr", id=pat.history_row_re(tabla_id), limit=8)
             wins = draws = losses = 0
             for r in partidos:
                 celdas = r.find_all("td")
@@ -1481,13 +1650,13 @@ def obtener_datos_preview_ligero(match_id: str):
                     continue
                 score_text = celdas[3].get_text(strip=True)
                 try:
-                    goles_local, goles_visitante = map(int, re.split(r'[-:]', score_text))
+                    goles_local, goles_visitante = map(int, pat.SCORE_SPLIT_RE.split(score_text))
                 except Exception:
                     continue
                 home_t = celdas[2].get_text(strip=True)
                 away_t = celdas[4].get_text(strip=True)
-                equipo_es_local = equipo_nombre.lower() in home_t.lower()
-                equipo_es_visitante = equipo_nombre.lower() in away_t.lower()
+                equipo_es_local = same_team(equipo_nombre, home_t, equipo_id, team_id_from_cell(celdas[2]))
+                equipo_es_visitante = same_team(equipo_nombre, away_t, equipo_id, team_id_from_cell(celdas[4]))
                 if not equipo_es_local and not equipo_es_visitante:
                     continue
                 if equipo_es_local:
@@ -1506,26 +1675,27 @@ def obtener_datos_preview_ligero(match_id: str):
                         draws += 1
             return {"wins": wins, "draws": draws, "losses": losses, "total": len(partidos)}
 
-        rendimiento_local = analizar_rendimiento("table_v1", home_name)
-        rendimiento_visitante = analizar_rendimiento("table_v2", away_name)
+        rendimiento_local = analizar_rendimiento("table_v1", home_name, home_id)
+        rendimiento_visitante = analizar_rendimiento("table_v2", away_name, away_id)
 
         # H2H directo (usar función existente para coherencia)
         h2h_stats = {"home_wins": 0, "away_wins": 0, "draws": 0}
         last_h2h_cover = "DESCONOCIDO"
         try:
-            h2h_data = extract_h2h_data_of(soup, home_name, away_name, None)
+            h2h_data = extract_h2h_data_of(soup, home_name, away_name, None, home_id, away_id)
             h2h_table = soup.find("table", id="table_v3")
             if h2h_table:
-                partidos_h2h = h2h_table.find_all("tr", id=re.compile(r"tr3_\\d+"), limit=8)
+                partidos_h2h = h2h_table.find_all("tr", id=pat.H2H_ROW_RE, limit=8)
                 for r in partidos_h2h:
                     tds = r.find_all("td")
                     if len(tds) < 5:
                         continue
                     home_h2h = tds[2].get_text(strip=True)
+                    home_h2h_id = team_id_from_cell(tds[2])
                     resultado_raw = tds[3].get_text(strip=True)
                     try:
                         goles_h, goles_a = map(int, resultado_raw.split("-"))
-                        es_local_en_h2h = home_name.lower() in home_h2h.lower()
+                        es_local_en_h2h = same_team(home_name, home_h2h, home_id, home_h2h_id)
                         if goles_h == goles_a:
                             h2h_stats["draws"] += 1
                         elif (es_local_en_h2h and goles_h > goles_a) or (not es_local_en_h2h and goles_a > goles_h):
@@ -1556,163 +1726,73 @@ def obtener_datos_preview_ligero(match_id: str):
         recent_indirect = {"last_home": None, "last_away": None, "h2h_col3": None}
         try:
             # Últimos partidos
-            last_home = extract_last_match_in_league_of(soup, "table_v1", home_name, league_id, True)
-            last_away = extract_last_match_in_league_of(soup, "table_v2", away_name, league_id, False)
-            def _df_to_rows(df):
-                rows = []
-                try:
-                    if df is not None and not df.empty:
-                        for idx, row in df.iterrows():
-                            label = idx.replace('Shots on Goal', 'Tiros a Puerta').replace('Shots', 'Tiros').replace('Dangerous Attacks', 'Ataques Peligrosos').replace('Attacks', 'Ataques')
-                            rows.append({"label": label, "home": row.get('Casa', ''), "away": row.get('Fuera', '')})
-                except Exception:
-                    pass
-                return rows
+            last_home = extract_last_match_in_league_of(soup, "table_v1", home_name, league_id, True, home_id)
+            last_away = extract_last_match_in_league_of(soup, "table_v2", away_name, league_id, False, away_id)
+            # H2H Rivales (Col3) sin Selenium: la página del key_id_a se descarga junto con las estadísticas
+            key_id_a, rival_a_id, rival_a_name = get_rival_a_for_original_h2h_of(soup, league_id)
+            _, rival_b_id, rival_b_name = get_rival_b_for_original_h2h_of(soup, league_id)
+            # Si el historial de rival A está al día y trae el partido contra B, el Col3 sale
+            # del índice y su estadística entra ya en el primer lote (sin página del key_id_a)
+            col3_hist = get_h2h_col3_from_team_history_of(rival_a_id, rival_b_id) if key_id_a else None
+            col3 = None
+            if col3_hist and col3_hist.get("status") == "found":
+                col3 = {
+                    "score_line": f"{col3_hist['h2h_home_team_name']} {col3_hist['goles_home']}:{col3_hist['goles_away']} {col3_hist['h2h_away_team_name']}",
+                    "ah_raw": col3_hist["handicap_line_raw"],
+                    "match_id": col3_hist["match_id"],
+                    "date": col3_hist["date"],
+                }
+            pages = {}
+            if col3_hist is None and key_id_a and rival_a_id and rival_b_id:
+                pages["key_page"] = f"{BASE_URL_OF}/match/h2h-{key_id_a}"
+            batch = fetch_stats_and_pages_batch(
+                {"last_home": (last_home or {}).get('match_id'), "last_away": (last_away or {}).get('match_id'),
+                 "h2h_col3": (col3 or {}).get('match_id')},
+                pages, deadline=deadline,
+            )
             if last_home:
-                lh_stats = get_match_progression_stats_data(str(last_home.get('match_id')))
                 recent_indirect["last_home"] = {
                     "home": last_home.get('home_team'),
                     "away": last_home.get('away_team'),
                     "score": last_home.get('score'),
                     "ah": format_ah_as_decimal_string_of(last_home.get('handicap_line_raw', '-') or '-'),
                     "ou": "-",
-                    "stats_rows": _df_to_rows(lh_stats),
+                    "stats_rows": stats_to_rows(batch.get("last_home")),
                     "date": last_home.get('date')
                 }
             if last_away:
-                la_stats = get_match_progression_stats_data(str(last_away.get('match_id')))
                 recent_indirect["last_away"] = {
                     "home": last_away.get('home_team'),
                     "away": last_away.get('away_team'),
                     "score": last_away.get('score'),
                     "ah": format_ah_as_decimal_string_of(last_away.get('handicap_line_raw', '-') or '-'),
                     "ou": "-",
-                    "stats_rows": _df_to_rows(la_stats),
+                    "stats_rows": stats_to_rows(batch.get("last_away")),
                     "date": last_away.get('date')
                 }
-            # H2H Rivales (Col3) sin Selenium: cargar la página del key_id_a
-            key_id_a, rival_a_id, rival_a_name = get_rival_a_for_original_h2h_of(soup, league_id)
-            _, rival_b_id, rival_b_name = get_rival_b_for_original_h2h_of(soup, league_id)
-            if key_id_a and rival_a_id and rival_b_id:
-                key_url = f"{BASE_URL_OF}/match/h2h-{key_id_a}"
-                session2 = requests.Session()
-                session2.headers.update({"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/116.0.0.0 Safari/537.36"})
-                key_resp = session2.get(key_url, timeout=6)
-                key_resp.raise_for_status()
-                soup_key = BeautifulSoup(key_resp.text, 'lxml')
-                table = soup_key.find("table", id="table_v2")
-                if table:
-                    for row in table.find_all("tr", id=re.compile(r"tr2_\\d+")):
-                        links = row.find_all("a", onclick=True)
-                        if len(links) < 2:
-                            continue
-                        m_h = re.search(r"team\((\d+)\)", links[0].get("onclick", ""))
-                        m_a = re.search(r"team\((\d+)\)", links[1].get("onclick", ""))
-                        if not (m_h and m_a):
-                            continue
-                        if {m_h.group(1), m_a.group(1)} == {str(rival_a_id), str(rival_b_id)}:
-                            score_span = row.find("span", class_="fscore_2")
-                            if not score_span or '-' not in score_span.text:
-                                break
-                            score_txt = score_span.text.strip().split("(")[0].strip()
-                            try:
-                                g_h, g_a = score_txt.split('-', 1)
-                            except Exception:
-                                break
-                            tds = row.find_all("td")
-                            ah_raw = "-"
-                            if len(tds) > 11:
-                                cell = tds[11]
-                                ah_raw = (cell.get("data-o") or cell.text).strip() or "-"
-                            match_id_col3 = row.get('index')
-                            score_line = f"{links[0].text.strip()} {g_h}:{g_a} {links[1].text.strip()}"
-                            col3_stats = get_match_progression_stats_data(str(match_id_col3))
-                            # Fecha si existe
-                            date_txt = None
-                            try:
-                                date_span = tds[1].find('span', attrs={'name': 'timeData'}) if len(tds) > 1 else None
-                                date_txt = date_span.get_text(strip=True) if date_span else None
-                            except Exception:
-                                date_txt = None
-                            recent_indirect["h2h_col3"] = {
-                                "score_line": score_line,
-                                "ah": format_ah_as_decimal_string_of(ah_raw or '-'),
-                                "ou": "-",
-                                "stats_rows": _df_to_rows(col3_stats),
-                                "date": date_txt
-                            }
-                            break
+            col3_stats = batch.get("h2h_col3")
+            if batch.get("key_page"):
+                soup_key = parse_h2h_fragments(batch["key_page"])
+                feed_team_history_of(soup_key, *get_team_league_info_from_script_of(soup_key)[:2])
+                col3 = extract_col3_from_key_page_of(soup_key, rival_a_id, rival_b_id)
+                if col3:
+                    # Segunda ronda: solo las estadísticas del partido Col3, con el mismo deadline
+                    col3_stats = fetch_stats_and_pages_batch({"h2h_col3": col3["match_id"]}, deadline=deadline).get("h2h_col3")
+            if col3:
+                recent_indirect["h2h_col3"] = {
+                    "score_line": col3["score_line"],
+                    "ah": format_ah_as_decimal_string_of(col3["ah_raw"] or '-'),
+                    "ou": "-",
+                    "stats_rows": stats_to_rows(col3_stats),
+                    "date": col3["date"]
+                }
         except Exception:
             pass
 
         # H2H indirecto ligero (rivales comunes)
         indirect = {"home_better": 0, "away_better": 0, "draws": 0, "samples": []}
         try:
-            table_v1 = soup.find("table", id="table_v1")
-            table_v2 = soup.find("table", id="table_v2")
-            def _parse_score_to_tuple(score_text):
-                try:
-                    gh, ga = map(int, score_text.strip().split("-"))
-                    return gh, ga
-                except Exception:
-                    return None
-            def _find_match_info(table, rival_name_lower, team_name_ref):
-                if not table:
-                    return None
-                rows = table.find_all("tr", id=re.compile(r"tr[12]_\\d+"))
-                for r in rows:
-                    tds = r.find_all("td")
-                    if len(tds) < 5:
-                        continue
-                    home_t = tds[2].get_text(strip=True)
-                    away_t = tds[4].get_text(strip=True)
-                    if away_t.lower() == rival_name_lower or home_t.lower() == rival_name_lower:
-                        score_text = tds[3].get_text(strip=True)
-                        score = _parse_score_to_tuple(score_text)
-                        if not score:
-                            continue
-                        gh, ga = score
-                        if home_t.lower() == team_name_ref.lower():
-                            margin = gh - ga
-                        elif away_t.lower() == team_name_ref.lower():
-                            margin = ga - gh
-                        else:
-                            margin = gh - ga
-                        return {"rival": rival_name_lower, "margin": margin}
-                return None
-            if table_v1 and table_v2:
-                rivals_home = set()
-                for r in table_v1.find_all("tr", id=re.compile(r"tr1_\\d+")):
-                    tds = r.find_all("td")
-                    if len(tds) >= 5:
-                        rivals_home.add(tds[4].get_text(strip=True).lower())
-                rivals_away = set()
-                for r in table_v2.find_all("tr", id=re.compile(r"tr2_\\d+")):
-                    tds = r.find_all("td")
-                    if len(tds) >= 5:
-                        rivals_away.add(tds[2].get_text(strip=True).lower())
-                common = [rv for rv in rivals_home.intersection(rivals_away) if rv and rv != '?']
-                common = common[:3]
-                for rv in common:
-                    home_info = _find_match_info(table_v1, rv, home_name)
-                    away_info = _find_match_info(table_v2, rv, away_name)
-                    if not home_info or not away_info:
-                        continue
-                    if home_info["margin"] > away_info["margin"]:
-                        indirect["home_better"] += 1
-                        verdict = "home"
-                    elif home_info["margin"] < away_info["margin"]:
-                        indirect["away_better"] += 1
-                        verdict = "away"
-                    else:
-                        indirect["draws"] += 1
-                        verdict = "draw"
-                    indirect["samples"].append({
-                        "rival": rv,
-                        "home_margin": home_info["margin"],
-                        "away_margin": away_info["margin"],
-                        "verdict": verdict
-                    })
+            indirect = compare_common_rivals_preview_of(soup, home_name, away_name)
         except Exception:
             pass
 
@@ -1743,9 +1823,8 @@ def obtener_datos_preview_ligero(match_id: str):
                     "rival": rival_ap,
                     "very_superior": bool((own_ap - rival_ap) >= 5)
                 }
-            fav_name = (favorito_actual or '').lower()
             for key in ['team1','team2']:
-                if key in ataques_peligrosos and ataques_peligrosos[key]['name'].lower() == fav_name:
+                if key in ataques_peligrosos and same_team(ataques_peligrosos[key]['name'], favorito_actual):
                     favorite_da = {
                         "name": ataques_peligrosos[key]['name'],
                         "very_superior": ataques_peligrosos[key]['very_superior'],
@@ -1772,7 +1851,8 @@ def obtener_datos_preview_ligero(match_id: str):
             "dangerous_attacks": ataques_peligrosos,
             "favorite_dangerous_attacks": favorite_da,
             "h2h_indirect": indirect,
-            "h2h_stats": h2h_stats
+            "h2h_stats": h2h_stats,
+            "partial": deadline.expired()
         }
         # Añadir campos de fecha/hora del partido a la respuesta
         result.update({
@@ -1781,8 +1861,6 @@ def obtener_datos_preview_ligero(match_id: str):
             "match_datetime": dt_info.get("match_datetime"),
         })
         return result
-    except requests.Timeout:
-        return {"error": "La fuente de datos (Nowgoal) tardó demasiado en responder."}
     except Exception as e:
         print(f"ERROR en scraper preview ligero para {match_id}: {e}")
         return {"error": f"No se pudieron obtener los datos de la vista previa (ligera): {type(e).__name__}"}
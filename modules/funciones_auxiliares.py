@@ -1,5 +1,7 @@
 # modules/funciones_auxiliares.py
 from modules.utils import parse_ah_to_number_of
+from modules.nombres_equipos import same_team
+from modules.liquidacion_ah import parse_score_pair, settle_single
 
 def _calcular_estadisticas_contra_rival(matches, equipo):
     """
@@ -25,9 +27,9 @@ def _calcular_estadisticas_contra_rival(matches, equipo):
             try:
                 goles_local, goles_visitante = map(int, match['score_raw'].split('-'))
                 
-                if match['home_team'].lower() == equipo.lower() and goles_local > goles_visitante:
+                if same_team(match['home_team'], equipo) and goles_local > goles_visitante:
                     victorias += 1
-                elif match['away_team'].lower() == equipo.lower() and goles_visitante > goles_local:
+                elif same_team(match['away_team'], equipo) and goles_visitante > goles_local:
                     victorias += 1
             except (ValueError, TypeError):
                 pass
@@ -93,30 +95,25 @@ def _analizar_ah_cubierto(resultado, handicap_raw, equipo_favorito, equipo_local
     if not resultado or '-' not in resultado or not handicap_raw:
         return "N/A"
     
-    try:
-        goles_local, goles_visitante = map(int, resultado.split('-'))
-        handicap_num = parse_ah_to_number_of(handicap_raw)
-        
-        if handicap_num is None:
-            return "N/A"
-        
-        # Determinar margen de victoria del favorito
-        if equipo_favorito.lower() == equipo_local.lower():
-            margen_favorito = goles_local - goles_visitante
-        elif equipo_favorito.lower() == equipo_visitante.lower():
-            margen_favorito = goles_visitante - goles_local
-        else:
-            return "N/A"
-        
-        # Verificar si se cubrió el handicap
-        if abs(margen_favorito) - abs(handicap_num) > 0.05:
-            return "Cubierto"
-        elif abs(margen_favorito) - abs(handicap_num) < -0.05:
-            return "No Cubierto"
-        else:
-            return "Push"
-    except (ValueError, TypeError):
+    score = parse_score_pair(resultado)
+    handicap_num = parse_ah_to_number_of(handicap_raw)
+    if score is None or handicap_num is None:
         return "N/A"
+    
+    # El favorito da la línea: apostamos a su lado con -|línea| (convención de la web)
+    if same_team(equipo_favorito, equipo_local):
+        perspectiva = 1
+    elif same_team(equipo_favorito, equipo_visitante):
+        perspectiva = -1
+    else:
+        return "N/A"
+    
+    outcome, _ = settle_single(score[0], score[1], perspectiva * abs(handicap_num), perspectiva)
+    if outcome > 0:
+        return "Cubierto"
+    elif outcome < 0:
+        return "No Cubierto"
+    return "Push"
 
 def _analizar_desempeno_casa_fuera(matches, equipo):
     """
@@ -134,7 +131,7 @@ def _analizar_desempeno_casa_fuera(matches, equipo):
     
     for match in matches:
         # Verificar si el equipo jugó como local o visitante
-        if match['home_team'].lower() == equipo.lower():
+        if same_team(match['home_team'], equipo):
             # Jugó como local
             casa['total'] += 1
             if '-' in match['score_raw']:
@@ -144,7 +141,7 @@ def _analizar_desempeno_casa_fuera(matches, equipo):
                         casa['victorias'] += 1
                 except (ValueError, TypeError):
                     pass
-        elif match['away_team'].lower() == equipo.lower():
+        elif same_team(match['away_team'], equipo):
             # Jugó como visitante
             fuera['total'] += 1
             if '-' in match['score_raw']:
@@ -176,9 +173,9 @@ def _contar_victorias_h2h(matches, equipo):
         if '-' in match['score_raw']:
             try:
                 goles_local, goles_visitante = map(int, match['score_raw'].split('-'))
-                if match['home_team'].lower() == equipo.lower() and goles_local > goles_visitante:
+                if same_team(match['home_team'], equipo) and goles_local > goles_visitante:
                     victorias += 1
-                elif match['away_team'].lower() == equipo.lower() and goles_visitante > goles_local:
+                elif same_team(match['away_team'], equipo) and goles_visitante > goles_local:
                     victorias += 1
             except (ValueError, TypeError):
                 pass
@@ -243,9 +240,9 @@ def _contar_victorias_h2h_general(matches, equipo):
         if '-' in match['score_raw']:
             try:
                 goles_local, goles_visitante = map(int, match['score_raw'].split('-'))
-                if match['home_team'].lower() == equipo.lower() and goles_local > goles_visitante:
+                if same_team(match['home_team'], equipo) and goles_local > goles_visitante:
                     victorias += 1
-                elif match['away_team'].lower() == equipo.lower() and goles_visitante > goles_local:
+                elif same_team(match['away_team'], equipo) and goles_visitante > goles_local:
                     victorias += 1
             except (ValueError, TypeError):
                 pass
@@ -1,9 +1,10 @@
 # modules/funciones_resumen.py
-import re
 from bs4 import BeautifulSoup
-from modules.utils import parse_ah_to_number_of, format_ah_as_decimal_string_of, check_handicap_cover
+from html_patterns import history_row_re
+from modules.nombres_equipos import same_team
+from modules.utils import parse_ah_to_number_of, format_ah_as_decimal_string_of, check_handicap_cover, build_opponent_indexes
 
-def generar_resumen_rendimiento_reciente(soup, home_name, away_name, current_ah_line):
+def generar_resumen_rendimiento_reciente(soup, home_name, away_name, current_ah_line, opponent_indexes=None):
     """
     Genera un resumen gráfico del rendimiento reciente y comparativas indirectas,
     analizando la colocación de handicap de la misma manera que el apartado 
@@ -14,6 +15,7 @@ def generar_resumen_rendimiento_reciente(soup, home_name, away_name, current_ah_
         home_name: Nombre del equipo local
         away_name: Nombre del equipo visitante
         current_ah_line: Línea de handicap actual (número)
+        opponent_indexes: (índice table_v1, índice table_v2) ya construidos para la página
     
     Returns:
         dict: Diccionario con el resumen del rendimiento reciente
@@ -27,7 +29,7 @@ def generar_resumen_rendimiento_reciente(soup, home_name, away_name, current_ah_
     analisis_visitante = _analizar_rendimiento(partidos_visitante, current_ah_line, away_name)
     
     # Obtener comparativas indirectas
-    comparativas = _obtener_comparativas_indirectas(soup)
+    comparativas = _obtener_comparativas_indirectas(soup, opponent_indexes)
     
     # Generar resumen
     resumen = {
@@ -58,7 +60,7 @@ def _obtener_partidos_recientes(soup, table_id, team_name, is_home_team=True):
     partidos = []
     score_selector = 'fscore_1' if is_home_team else 'fscore_2'
     
-    for row in table.find_all("tr", id=re.compile(rf"tr{table_id[-1]}_\d+")):
+    for row in table.find_all("tr", id=history_row_re(table_id)):
         if len(partidos) >= 5:  # Limitar a 5 partidos recientes
             break
             
@@ -71,7 +73,7 @@ def _obtener_partidos_recientes(soup, table_id, team_name, is_home_team=True):
         away_team = cells[4].get_text(strip=True)
         
         # Verificar si el equipo está en este partido
-        if team_name.lower() not in [home_team.lower(), away_team.lower()]:
+        if not (same_team(home_team, team_name) or same_team(away_team, team_name)):
             continue
             
         # Obtener resultado
@@ -104,7 +106,7 @@ def _obtener_partidos_recientes(soup, table_id, team_name, is_home_team=True):
             'ah_line_raw': ah_line_raw,
             'ah_line_num': ah_line_num,
             'favorito': favorito,
-            'equipo_es_favorito': team_name.lower() == favorito.lower() if favorito else False
+            'equipo_es_favorito': same_team(team_name, favorito)
         })
     
     return partidos
@@ -145,9 +147,9 @@ def _analizar_rendimiento(partidos, current_ah_line, team_name):
                 goles_local, goles_visitante = int(goles_local), int(goles_visitante)
                 
                 # Verificar si el equipo ganó
-                if partido['home_team'].lower() == team_name.lower() and goles_local > goles_visitante:
+                if same_team(partido['home_team'], team_name) and goles_local > goles_visitante:
                     victorias += 1
-                elif partido['away_team'].lower() == team_name.lower() and goles_visitante > goles_local:
+                elif same_team(partido['away_team'], team_name) and goles_visitante > goles_local:
                     victorias += 1
             except (ValueError, IndexError):
                 continue
@@ -161,78 +163,44 @@ def _analizar_rendimiento(partidos, current_ah_line, team_name):
         'promedio_linea': promedio_linea
     }
 
-def _obtener_comparativas_indirectas(soup):
+def _obtener_comparativas_indirectas(soup, opponent_indexes=None):
     """Obtiene las comparativas indirectas."""
     # Buscar información de comparativas indirectas
     comparativas = []
     
-    # Buscar en las tablas de partidos rivales
-    table_v1 = soup.find("table", id="table_v1")  # Partidos del equipo local
-    table_v2 = soup.find("table", id="table_v2")  # Partidos del equipo visitante
+    # Índices de las tablas de partidos rivales (local: table_v1, visitante: table_v2)
+    index_local, index_visitante = opponent_indexes or build_opponent_indexes(soup)
     
-    if table_v1 and table_v2:
-        # Obtener rivales del equipo local
-        rivales_local = set()
-        for row in table_v1.find_all("tr", id=re.compile(r"tr1_\d+")):
-            cells = row.find_all('td')
-            if len(cells) >= 5:
-                rival = cells[4].get_text(strip=True)  # Equipo visitante
-                if rival and rival != '?':
-                    rivales_local.add(rival.lower())
+    if index_local and index_visitante:
+        # Obtener rivales del equipo local (equipo visitante de cada fila), por clave canónica
+        rivales_local = set(index_local.raw_by_away) - {''}
         
-        # Obtener rivales del equipo visitante
-        rivales_visitante = set()
-        for row in table_v2.find_all("tr", id=re.compile(r"tr2_\d+")):
-            cells = row.find_all('td')
-            if len(cells) >= 5:
-                rival = cells[2].get_text(strip=True)  # Equipo local
-                if rival and rival != '?':
-                    rivales_visitante.add(rival.lower())
+        # Obtener rivales del equipo visitante (equipo local de cada fila)
+        rivales_visitante = set(index_visitante.raw_by_home) - {''}
         
         # Encontrar rivales comunes
         rivales_comunes = rivales_local.intersection(rivales_visitante)
         
-        # Para cada rival común, obtener información de partidos
+        # Para cada rival común, el primer partido de cada equipo contra él
         for rival in list(rivales_comunes)[:3]:  # Limitar a 3 rivales comunes
-            # Buscar partido del equipo local contra este rival
-            partido_local = None
-            for row in table_v1.find_all("tr", id=re.compile(r"tr1_\d+")):
-                cells = row.find_all('td')
-                if len(cells) >= 5 and cells[4].get_text(strip=True).lower() == rival:
-                    score = cells[3].get_text(strip=True)
-                    ah_cell = cells[11] if len(cells) > 11 else None
-                    handicap = ah_cell.get('data-o') or ah_cell.get_text(strip=True) if ah_cell else "-"
-                    
-                    partido_local = {
+            fila_local = (index_local.raw_by_away.get(rival) or [None])[0]
+            fila_visitante = (index_visitante.raw_by_home.get(rival) or [None])[0]
+            
+            if fila_local and fila_visitante:
+                comparativas.append({
+                    'rival': rival,
+                    'partido_local': {
                         'equipo': 'local',
                         'rival': rival,
-                        'resultado': score,
-                        'handicap': handicap
-                    }
-                    break
-            
-            # Buscar partido del equipo visitante contra este rival
-            partido_visitante = None
-            for row in table_v2.find_all("tr", id=re.compile(r"tr2_\d+")):
-                cells = row.find_all('td')
-                if len(cells) >= 5 and cells[2].get_text(strip=True).lower() == rival:
-                    score = cells[3].get_text(strip=True)
-                    ah_cell = cells[11] if len(cells) > 11 else None
-                    handicap = ah_cell.get('data-o') or ah_cell.get_text(strip=True) if ah_cell else "-"
-                    
-                    partido_visitante = {
+                        'resultado': fila_local['score'],
+                        'handicap': fila_local['ah']
+                    },
+                    'partido_visitante': {
                         'equipo': 'visitante',
                         'rival': rival,
-                        'resultado': score,
-                        'handicap': handicap
+                        'resultado': fila_visitante['score'],
+                        'handicap': fila_visitante['ah']
                     }
-                    break
-            
-            if partido_local and partido_visitante:
-                comparativas.append({
-                    'rival': rival,
-                    'partido_local': partido_local,
-                    'partido_visitante': partido_visitante
                 })
     
     return comparativas
@@ -0,0 +1,78 @@
+# modules/liquidacion_ah.py
+"""
+Liquidación de hándicap asiático en bloque. Recibe arrays de goles local/visitante,
+línea (convención de la web: positiva = el local da goles) y perspectiva (+1 apuesta
+al local, -1 al visitante) y devuelve, en una sola pasada de NumPy, el resultado de
+cada fila y su beneficio por unidad apostada.
+
+Las líneas de cuarto (0.25, 0.75, ...) se liquidan como media apuesta a cada línea
+vecina (0.25 = 0 + 0.5), así que pueden dar medio ganado / medio perdido.
+"""
+import numpy as np
+
+WIN = 2
+HALF_WIN = 1
+PUSH = 0
+HALF_LOSS = -1
+LOSS = -2
+INVALID = -9
+
+OUTCOME_LABELS = {
+    WIN: "GANADA", HALF_WIN: "MEDIO GANADA", PUSH: "PUSH",
+    HALF_LOSS: "MEDIO PERDIDA", LOSS: "PERDIDA", INVALID: "indeterminado",
+}
+
+DEFAULT_DECIMAL_ODDS = 2.0
+
+
+def settle_asian_handicap(home_goals, away_goals, lines, perspective=1, odds=DEFAULT_DECIMAL_ODDS):
+    """
+    Liquida N apuestas de hándicap asiático a la vez.
+
+    Args:
+        home_goals, away_goals: goles de cada partido (NaN = sin resultado)
+        lines: línea AH de cada partido en la convención de la web (NaN = sin línea)
+        perspective: +1 apuesta al local, -1 al visitante (escalar o array)
+        odds: cuota decimal de la apuesta (escalar o array)
+
+    Returns:
+        (outcome, pnl): outcome int8 con WIN/HALF_WIN/PUSH/HALF_LOSS/LOSS/INVALID y
+        pnl float64 con el beneficio por unidad (NaN en las filas inválidas).
+    """
+    home = np.asarray(home_goals, dtype=np.float64)
+    away = np.asarray(away_goals, dtype=np.float64)
+    line = np.asarray(lines, dtype=np.float64)
+    side = np.asarray(perspective, dtype=np.float64)
+    home, away, line, side = np.broadcast_arrays(home, away, line, side)
+    valid = ~(np.isnan(home) | np.isnan(away) | np.isnan(line)) & (side != 0)
+
+    # Redondeamos al cuarto más cercano: cuartos impares = línea partida en dos medias
+    quarters = np.rint(np.where(valid, line, 0.0) * 4.0)
+    is_split = (quarters % 2) != 0
+    line_q = quarters / 4.0
+    low = np.where(is_split, line_q - 0.25, line_q)
+    high = np.where(is_split, line_q + 0.25, line_q)
+
+    margin = np.where(valid, home - away, 0.0)
+    outcome = (np.sign(side * (margin - low)) + np.sign(side * (margin - high))).astype(np.int8)
+
+    odds_arr = np.broadcast_to(np.asarray(odds, dtype=np.float64), outcome.shape)
+    pnl = np.where(outcome > 0, outcome / 2.0 * (odds_arr - 1.0), outcome / 2.0)
+    outcome[~valid] = INVALID
+    pnl = np.where(valid, pnl, np.nan)
+    return outcome, pnl
+
+
+def settle_single(home_goals, away_goals, line, perspective=1, odds=DEFAULT_DECIMAL_ODDS):
+    """Versión escalar de settle_asian_handicap: devuelve (outcome, pnl) de un partido."""
+    outcome, pnl = settle_asian_handicap([home_goals], [away_goals], [line], perspective, odds)
+    return int(outcome[0]), float(pnl[0])
+
+
+def parse_score_pair(resultado_raw):
+    """'2-1' / '2:1' -> (2, 1); None si el marcador no es válido."""
+    try:
+        goles_h, goles_a = map(int, str(resultado_raw).replace(':', '-').split('-'))
+        return goles_h, goles_a
+    except (ValueError, TypeError, AttributeError):
+        return None
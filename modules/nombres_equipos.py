@@ -0,0 +1,46 @@
+# modules/nombres_equipos.py
+"""
+Normalización de nombres de equipo. Cada nombre en bruto se convierte una sola vez
+(caché) en una clave canónica internada: minúsculas, sin acentos, sin posiciones
+tipo "[3]" y con la puntuación reducida a espacios. Las comparaciones usan el id
+de equipo (_matchInfo / onclick "team(123)") cuando ambos lados lo tienen y, si
+no, igualdad de claves: "FC Tokyo" ya no coincide con "FC Tokyo U23".
+"""
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+from html_patterns import TEAM_ID_RE
+
+_RANKING_RE = re.compile(r"\[[^\]]*\]")
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+@lru_cache(maxsize=8192)
+def normalize_team_name(raw_name):
+    """Clave canónica internada de un nombre de equipo ('' si no hay nombre)."""
+    if not raw_name:
+        return ''
+    text = unicodedata.normalize('NFKD', str(raw_name))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = _RANKING_RE.sub(' ', text)
+    text = _NON_WORD_RE.sub(' ', text.lower()).strip()
+    return sys.intern(text)
+
+
+def team_id_from_cell(cell):
+    """Id de equipo del enlace onclick="team(123)" de una celda, o None."""
+    if cell is None:
+        return None
+    link = cell.find('a', onclick=True)
+    match = TEAM_ID_RE.search(link.get('onclick', '')) if link else None
+    return match.group(1) if match else None
+
+
+def same_team(name_a, name_b, id_a=None, id_b=None):
+    """True si son el mismo equipo: por id si ambos lo tienen, si no por clave canónica."""
+    if id_a and id_b:
+        return str(id_a) == str(id_b)
+    key_a = normalize_team_name(name_a)
+    return bool(key_a) and key_a == normalize_team_name(name_b)
@@ -0,0 +1,181 @@
+# modules/utils.py
+import math
+from modules.nombres_equipos import normalize_team_name, same_team, team_id_from_cell
+from handicap import parse_ah_to_number_of, format_ah_as_decimal_string_of
+from match_records import HistoryRow
+from html_patterns import AWAY_ROW_RE, HOME_ROW_RE
+from modules.liquidacion_ah import INVALID, parse_score_pair, settle_single
+
+def get_match_details_from_row_of(row_element, score_class_selector='score', source_table_type='h2h'):
+    """Extrae detalles de un partido desde una fila de la tabla (HistoryRow, se lee como dict)."""
+    try:
+        cells = row_element.find_all('td')
+        home_idx, score_idx, away_idx, ah_idx = 2, 3, 4, 11
+        if len(cells) <= ah_idx: 
+            return None
+        date_span = cells[1].find('span', attrs={'name': 'timeData'})
+        date_txt = date_span.get_text(strip=True) if date_span else ''
+        
+        def get_cell_txt(idx):
+            a = cells[idx].find('a')
+            return a.get_text(strip=True) if a else cells[idx].get_text(strip=True)
+            
+        home, away = get_cell_txt(home_idx), get_cell_txt(away_idx)
+        if not home or not away: 
+            return None
+            
+        score_cell = cells[score_idx]
+        score_span = score_cell.find('span', class_=lambda c: isinstance(c, str) and score_class_selector in c)
+        score_raw_text = (score_span.get_text(strip=True) if score_span else score_cell.get_text(strip=True)) or ''
+        ah_cell = cells[ah_idx]
+        ah_line_raw = (ah_cell.get('data-o') or ah_cell.text).strip()
+
+        return HistoryRow(
+            date_txt, home, away, score_raw_text, ah_line_raw,
+            row_element.get('index'), row_element.get('vs'), row_element.get('name'),
+            team_id_from_cell(cells[home_idx]), team_id_from_cell(cells[away_idx])
+        )
+    except Exception:
+        return None
+
+def handicap_outcome_of(resultado_raw: str, ah_line_num: float, favorite_team_name: str,
+                        home_team_in_h2h: str, away_team_in_h2h: str, main_home_team_name: str):
+    """
+    Resultado (WIN/HALF_WIN/PUSH/HALF_LOSS/LOSS/INVALID de liquidacion_ah) de apostar al
+    favorito con la línea actual sobre un resultado histórico. Con línea 0 la apuesta
+    es al equipo local del partido principal (draw no bet).
+    """
+    score = parse_score_pair(resultado_raw)
+    if score is None or ah_line_num is None:
+        return INVALID
+    magnitude = abs(ah_line_num)
+    if ah_line_num == 0.0:
+        perspective = 1 if same_team(main_home_team_name, home_team_in_h2h) else -1
+    elif same_team(favorite_team_name, home_team_in_h2h):
+        perspective = 1
+    elif same_team(favorite_team_name, away_team_in_h2h):
+        perspective = -1
+    else:
+        return INVALID
+    outcome, _ = settle_single(score[0], score[1], perspective * magnitude, perspective)
+    return outcome
+
+def check_handicap_cover(resultado_raw: str, ah_line_num: float, favorite_team_name: str, 
+                        home_team_in_h2h: str, away_team_in_h2h: str, main_home_team_name: str):
+    """Verifica si un equipo cubrió el handicap en un partido (medio ganado cuenta como cubierto)."""
+    outcome = handicap_outcome_of(resultado_raw, ah_line_num, favorite_team_name,
+                                  home_team_in_h2h, away_team_in_h2h, main_home_team_name)
+    if outcome == INVALID:
+        return ("indeterminado", None)
+    if outcome > 0:
+        return ("CUBIERTO", True)
+    if outcome < 0:
+        return ("NO CUBIERTO", False)
+    return ("PUSH", None)
+
+def check_goal_line_cover(resultado_raw: str, goal_line_num: float = 2.5):
+    """Verifica si un partido superó la línea de goles."""
+    try:
+        goles_h, goles_a = map(int, resultado_raw.split('-'))
+        total_goles = goles_h + goles_a
+        
+        if total_goles > goal_line_num:
+            return ("SUPERADA (Over)", True)
+        elif total_goles < goal_line_num:
+            return ("NO SUPERADA (Under)", False)
+        else:
+            return ("PUSH (Empate)", None)
+    except (ValueError, TypeError):
+        return ("indeterminado", None)
+
+def extract_final_score_of(soup):
+    """
+    Extrae el resultado final del partido desde el header.
+    """
+    try:
+        score_div = soup.find("div", id="mScore")
+        if not score_div:
+            return "vs"
+
+        # Intento 1: Selector específico para partidos finalizados
+        scores = score_div.select("div.end div.score")
+        if len(scores) == 2:
+            return f"{scores[0].text.strip()} - {scores[1].text.strip()}"
+
+        # Intento 2: Selector más general dentro de mScore
+        scores = score_div.find_all("div", class_="score")
+        if len(scores) == 2:
+            return f"{scores[0].text.strip()} - {scores[1].text.strip()}"
+
+        # Si no se encuentra, verificar el estado del partido
+        state_div = score_div.find("div", class_="state")
+        if state_div and "Finished" not in state_div.text:
+            return "vs" # Not finished
+            
+    except Exception:
+        return "vs"
+    
+    return "vs"
+
+
+class OpponentIndex:
+    """
+    Filas de un lado (table_v1 o table_v2) parseadas una sola vez e indexadas por
+    equipo con la clave canónica de normalize_team_name. Guarda dos vistas de cada fila,
+    igual que las funciones que lo usan: 'details' (get_match_details_from_row_of) y
+    'raw' (texto de las celdas 2/3/4/11). Las listas de cada clave conservan el orden
+    de la tabla y se consultan con rows_for (un acceso al diccionario).
+    """
+    __slots__ = ("details_rows", "details_by_home", "details_by_away", "raw_rows", "raw_by_home", "raw_by_away", "raw_by_team")
+
+    def __init__(self, table=None, row_pattern=None, score_class_selector='score'):
+        self.details_rows = []  # (details, home_key, away_key)
+        self.details_by_home = {}
+        self.details_by_away = {}
+        self.raw_rows = []
+        self.raw_by_home = {}
+        self.raw_by_away = {}
+        self.raw_by_team = {}
+        if table is None:
+            return
+        for row in table.find_all("tr", id=row_pattern):
+            cells = row.find_all('td')
+            if len(cells) >= 5:
+                ah_cell = cells[11] if len(cells) > 11 else None
+                raw = {
+                    'home': cells[2].get_text(strip=True),
+                    'away': cells[4].get_text(strip=True),
+                    'score': cells[3].get_text(strip=True),
+                    'ah': (ah_cell.get('data-o') or ah_cell.get_text(strip=True)) if ah_cell else '-',
+                }
+                home_k, away_k = normalize_team_name(raw['home']), normalize_team_name(raw['away'])
+                self.raw_rows.append(raw)
+                self.raw_by_home.setdefault(home_k, []).append(raw)
+                self.raw_by_away.setdefault(away_k, []).append(raw)
+                self.raw_by_team.setdefault(home_k, []).append(raw)
+                if away_k != home_k:
+                    self.raw_by_team.setdefault(away_k, []).append(raw)
+            details = get_match_details_from_row_of(row, score_class_selector=score_class_selector, source_table_type='hist')
+            if details:
+                entry = (details, normalize_team_name(details['home']), normalize_team_name(details['away']))
+                self.details_rows.append(entry)
+                self.details_by_home.setdefault(entry[1], []).append(entry)
+                self.details_by_away.setdefault(entry[2], []).append(entry)
+
+    @staticmethod
+    def rows_for(mapping, team_name):
+        """Filas de `mapping` (uno de los *_by_home / *_by_away / raw_by_team) del equipo `team_name`."""
+        key = normalize_team_name(team_name)
+        return mapping.get(key, ()) if key else ()
+
+
+def build_opponent_indexes(soup):
+    """Índices de table_v1 (local) y table_v2 (visitante) de una página h2h, construidos una vez por página."""
+    if soup is None:
+        return None, None
+    table_v1 = soup.find("table", id="table_v1")
+    table_v2 = soup.find("table", id="table_v2")
+    return (
+        OpponentIndex(table_v1, HOME_ROW_RE, 'fscore_1') if table_v1 else None,
+        OpponentIndex(table_v2, AWAY_ROW_RE, 'fscore_2') if table_v2 else None,
+    )
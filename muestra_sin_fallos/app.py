@@ -1,31 +1,35 @@
 # app.py - Servidor web principal (Flask)
-from flask import Flask, render_template, abort, request
+from flask import Flask, render_template, abort, request, Response, stream_with_context
 import asyncio
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
 import datetime
-import re
 import math
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
+import queue
 import time
 import logging
 from pathlib import Path
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-# ¡Importante! Importa tu nuevo módulo de scraping
-from modules.estudio_scraper import (
-    obtener_datos_completos_partido, 
-    format_ah_as_decimal_string_of, 
-    obtener_datos_preview_rapido, 
-    obtener_datos_preview_ligero, 
-    generar_analisis_mercado_simplificado,
-    check_handicap_cover,
-    parse_ah_to_number_of
-)
+import sys
+
+# El lanzador ejecuta `py muestra_sin_fallos\app.py`, así que sys.path solo trae esta
+# carpeta; el paquete modules/ está en la raíz del proyecto. Se añade al final para que
+# los ficheros de aquí sigan teniendo prioridad.
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+# El módulo de scraping (modules.estudio_scraper), playwright, requests y bs4 se importan
+# dentro de las rutas que los usan: arrastran selenium, pandas y todos los módulos de
+# análisis, y la mayoría de peticiones solo sirven data.json.
 from flask import jsonify # Asegúrate de que jsonify está importado
+import handicap
+from handicap import format_ah_as_decimal_string_of, parse_ah_to_number_of
+from html_patterns import FINAL_SCORE_RE, SIGNED_NUMBER_RE
+from match_table import filter_args, get_match_table, sort_arg
+from list_cursors import CursorExpired, get_cursor_store
+from render_cache import cached_list_page, render_cached_content, render_match_list, render_match_rows
+from deadline import Deadline
 
 app = Flask(__name__)
 
@@ -45,7 +49,6 @@ _requests_session = None
 _requests_session_lock = threading.Lock()
 _requests_fetch_lock = threading.Lock()
 
-_EMPTY_DATA_TEMPLATE = {"upcoming_matches": [], "finished_matches": []}
 _DATA_FILE_CANDIDATES = [
     Path(__file__).resolve().parent / 'data.json',
     Path(__file__).resolve().parent.parent / 'data.json',
@@ -57,46 +60,6 @@ for _candidate in _DATA_FILE_CANDIDATES:
 else:
     DATA_FILE = _DATA_FILE_CANDIDATES[0]
 
-_data_file_lock = threading.Lock()
-
-
-def load_data_from_file():
-    """Carga los datos desde el archivo JSON, similar a la app ligera."""
-    with _data_file_lock:
-        if not DATA_FILE.exists():
-            return {key: [] for key in _EMPTY_DATA_TEMPLATE}
-        try:
-            with DATA_FILE.open('r', encoding='utf-8') as fh:
-                data = json.load(fh)
-        except (json.JSONDecodeError, OSError) as exc:
-            print(f"Error al leer {DATA_FILE}: {exc}")
-            return {key: [] for key in _EMPTY_DATA_TEMPLATE}
-        if not isinstance(data, dict):
-            return {key: [] for key in _EMPTY_DATA_TEMPLATE}
-
-        normalized = {}
-        for key in _EMPTY_DATA_TEMPLATE:
-            value = data.get(key, [])
-            if isinstance(value, list):
-                normalized[key] = [item for item in value if isinstance(item, dict)]
-            else:
-                normalized[key] = []
-        return normalized
-
-
-def _parse_time_obj(value):
-    if isinstance(value, datetime.datetime):
-        return value
-    if isinstance(value, str):
-        try:
-            return datetime.datetime.fromisoformat(value)
-        except ValueError:
-            try:
-                return datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                return None
-    return None
-
 
 def _ensure_time_string(entry, parsed_time):
     if entry.get('time') or not parsed_time:
@@ -104,50 +67,69 @@ def _ensure_time_string(entry, parsed_time):
     entry['time'] = parsed_time.strftime('%d/%m %H:%M')
 
 
-def _filter_and_slice_matches(section, limit=None, offset=0, handicap_filter=None, sort_desc=False):
-    data = load_data_from_file()
-    matches = data.get(section, [])
-    prepared = []
-    for original in matches:
-        entry = dict(original)
-        parsed_time = _parse_time_obj(entry.get('time_obj'))
-        entry['_sort_time'] = parsed_time or datetime.datetime.min
-        _ensure_time_string(entry, parsed_time)
-        prepared.append(entry)
-
+def _list_mask(section, handicap_filter=None, args=None):
+    # Tabla por columnas de data.json (se rehace solo si cambia el fichero) y máscara del
+    # filtro de hándicap (None = todas). Con `args` se aplican también los filtros de
+    # filter_args (línea de goles, liga, equipo, fechas, estado)
+    table = get_match_table(section, DATA_FILE)
+    target = None
     if handicap_filter:
         try:
-            target = normalize_handicap_to_half_bucket_str(handicap_filter)
+            # Misma normalización con la que se calcularon los tramos de la tabla
+            target = handicap.normalize_handicap_to_half_bucket_str(handicap_filter)
         except Exception:
             target = None
-        if target is not None:
-            filtered = []
-            for entry in prepared:
-                hv = normalize_handicap_to_half_bucket_str(entry.get('handicap', ''))
-                if hv == target:
-                    filtered.append(entry)
-            prepared = filtered
-
-    prepared.sort(key=lambda item: (item['_sort_time'], item.get('id', '')), reverse=sort_desc)
-
-    offset = max(int(offset or 0), 0)
-    if offset:
-        if offset >= len(prepared):
-            prepared = []
-        else:
-            prepared = prepared[offset:]
+    criteria = filter_args(args) if args is not None else {}
+    mask = None
+    if target is not None or any(v is not None for v in criteria.values()):
+        mask = table.filter(bucket=target, **criteria)
+    return table, mask
+
 
+def _prepare_records(records):
+    # Solo las entradas de la página que se devuelve pasan a dict
+    prepared = []
+    for record in records:
+        entry = record.to_dict()
+        _ensure_time_string(entry, record.kickoff)
+        prepared.append(entry)
+    return prepared
+
+
+def _filter_and_slice_matches(section, limit=None, offset=0, handicap_filter=None, sort_desc=False):
+    table, mask = _list_mask(section, handicap_filter)
+
+    limit_val = None
     if limit is not None:
         try:
             limit_val = int(limit)
         except (TypeError, ValueError):
             limit_val = None
-        if limit_val is not None and limit_val >= 0:
-            prepared = prepared[:limit_val]
+        if limit_val is not None and limit_val < 0:
+            limit_val = None
 
-    for entry in prepared:
-        entry.pop('_sort_time', None)
-    return prepared
+    return _prepare_records(table.page(mask, offset, limit_val, order='-kickoff' if sort_desc else 'kickoff'))
+
+
+def _api_list_page(section, sort_desc=False):
+    """
+    Página de /api/matches o /api/finished_matches. La primera llamada (sin ?cursor=)
+    filtra (handicap y los filtros de filter_args), ordena (?sort= file, kickoff,
+    handicap, goal_line; '-' invierte) y guarda la instantánea; las siguientes siguen el
+    cursor devuelto en 'next_cursor' (None al final) y salen de la misma versión de
+    data.json. ValueError si algún parámetro no se entiende.
+    """
+    args = request.args
+    limit = min(int(args.get('limit', 5)), 50)
+    cursors = get_cursor_store()
+    if args.get('cursor'):
+        records, next_cursor, version = cursors.next(section, args['cursor'], limit)
+    else:
+        table, mask = _list_mask(section, args.get('handicap'), args)
+        order = sort_arg(args, '-kickoff' if sort_desc else 'kickoff')
+        records, next_cursor = cursors.open(section, table, mask, order, int(args.get('offset', 0)), limit)
+        version = table.version
+    return {'matches': _prepare_records(records), 'next_cursor': next_cursor, 'version': version}
 
 
 def _get_preview_cache_dir():
@@ -158,9 +140,16 @@ def _get_preview_cache_dir():
     return static_root / 'cached_previews'
 
 
-def load_preview_from_cache(match_id: str):
+def _preview_cache_name(match_id: str, kind: str = 'analisis') -> str:
+    # El análisis profundo conserva {id}.json porque index.html lo pide directamente a /static
+    if kind == 'analisis':
+        return f'{match_id}.json'
+    return f'{match_id}.{kind}.json'
+
+
+def load_preview_from_cache(match_id: str, kind: str = 'analisis'):
     cache_dir = _get_preview_cache_dir()
-    cache_path = cache_dir / f'{match_id}.json'
+    cache_path = cache_dir / _preview_cache_name(match_id, kind)
     if cache_path.exists():
         try:
             with cache_path.open('r', encoding='utf-8') as fh:
@@ -172,17 +161,73 @@ def load_preview_from_cache(match_id: str):
     return None
 
 
-def save_preview_to_cache(match_id: str, payload: dict):
+def save_preview_to_cache(match_id: str, payload: dict, kind: str = 'analisis'):
     cache_dir = _get_preview_cache_dir()
     try:
         cache_dir.mkdir(parents=True, exist_ok=True)
-        cache_path = cache_dir / f'{match_id}.json'
+        cache_path = cache_dir / _preview_cache_name(match_id, kind)
         with cache_path.open('w', encoding='utf-8') as fh:
             json.dump(payload, fh, ensure_ascii=False)
     except OSError as exc:
         print(f"Error al escribir cache de analisis para {match_id}: {exc}")
 
 
+# --- Pool compartido para los análisis por lotes ---
+ANALYSIS_POOL_MAX_WORKERS = 3  # cada análisis profundo abre su propio Chrome
+BATCH_MAX_IDS = 60
+
+_analysis_pool = None
+_analysis_pool_lock = threading.Lock()
+_analysis_inflight = {}  # (kind, match_id) -> Future, compartido entre lotes simultáneos
+
+
+def _get_analysis_pool():
+    global _analysis_pool
+    if _analysis_pool is None:
+        with _analysis_pool_lock:
+            if _analysis_pool is None:
+                _analysis_pool = ThreadPoolExecutor(max_workers=ANALYSIS_POOL_MAX_WORKERS, thread_name_prefix='analisis')
+    return _analysis_pool
+
+
+def _run_analysis_job(kind: str, match_id: str) -> dict:
+    try:
+        if kind == 'preview':
+            return build_preview_payload(match_id)
+        return build_analysis_payload(match_id)
+    except Exception as exc:
+        print(f"Error en el análisis por lotes de {match_id}: {exc}")
+        return {'error': 'Ocurrió un error interno en el servidor.'}
+
+
+def _submit_analysis_job(kind: str, match_id: str):
+    """Encola el análisis en el pool; si otro lote ya lo tiene en marcha, reutiliza su Future."""
+    key = (kind, match_id)
+    pool = _get_analysis_pool()
+    with _analysis_pool_lock:
+        future = _analysis_inflight.get(key)
+        if future is not None:
+            return future
+        future = pool.submit(_run_analysis_job, kind, match_id)
+        _analysis_inflight[key] = future
+    # Fuera del lock: si ya ha terminado, el callback se ejecuta aquí mismo
+    future.add_done_callback(lambda _f: _analysis_inflight.pop(key, None))
+    return future
+
+
+def _encode_batch_event(match_id: str, payload: dict, use_sse: bool, cached: bool = False) -> str:
+    record = {
+        'match_id': match_id,
+        'status': 'error' if payload.get('error') else 'ok',
+        'cached': cached,
+        'data': payload,
+    }
+    line = json.dumps(record, ensure_ascii=False)
+    if use_sse:
+        return f"event: result\nid: {match_id}\ndata: {line}\n\n"
+    return line + "\n"
+
+
 def _build_nowgoal_url(path: str | None = None) -> str:
     if not path:
         return URL_NOWGOAL
@@ -195,6 +240,9 @@ def _get_shared_requests_session():
     global _requests_session
     with _requests_session_lock:
         if _requests_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
             session = requests.Session()
             retries = Retry(total=3, backoff_factor=0.4, status_forcelist=[500, 502, 503, 504])
             adapter = HTTPAdapter(max_retries=retries)
@@ -232,6 +280,7 @@ async def _fetch_nowgoal_html(path: str | None = None, filter_state: int | None
         return html_content
 
     try:
+        from playwright.async_api import async_playwright
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
             page = await browser.new_page()
@@ -259,7 +308,7 @@ def _parse_number_clean(s: str):
     txt = txt.replace(',', '.')
     txt = txt.replace('+', '')
     txt = txt.replace(' ', '')
-    m = re.search(r"^[+-]?\d+(?:\.\d+)?$", txt)
+    m = SIGNED_NUMBER_RE.search(txt)
     if m:
         try:
             return float(m.group(0))
@@ -276,7 +325,7 @@ def _parse_number(s: str):
     txt = txt.replace(',', '.')
     txt = txt.replace(' ', '')
     # Coincide con un número decimal con signo
-    m = re.search(r"^[+-]?\d+(?:\.\d+)?$", txt)
+    m = SIGNED_NUMBER_RE.search(txt)
     if m:
         try:
             return float(m.group(0))
@@ -289,7 +338,7 @@ def _parse_handicap_to_float(text: str):
         return None
     t = str(text).strip()
     if '/' in t:
-        parts = [p for p in re.split(r"/", t) if p]
+        parts = [p for p in t.split("/") if p]
         nums = []
         for p in parts:
             v = _parse_number_clean(p)
@@ -338,6 +387,7 @@ def normalize_handicap_to_half_bucket_str(text: str):
     return f"{b:.1f}"
 
 def parse_main_page_matches(html_content, limit=20, offset=0, handicap_filter=None):
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html_content, 'html.parser')
     match_rows = soup.find_all('tr', id=lambda x: x and x.startswith('tr1_'))
     upcoming_matches = []
@@ -400,6 +450,7 @@ def parse_main_page_matches(html_content, limit=20, offset=0, handicap_filter=No
     return paginated_matches
 
 def parse_main_page_finished_matches(html_content, limit=20, offset=0, handicap_filter=None):
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html_content, 'html.parser')
     match_rows = soup.find_all('tr', id=lambda x: x and x.startswith('tr1_'))
     finished_matches = []
@@ -426,7 +477,7 @@ def parse_main_page_finished_matches(html_content, limit=20, offset=0, handicap_
             else:
                 score_text = score_cell.get_text(strip=True)
 
-        if not re.match(r'^\d+\s*-\s*\d+$', score_text):
+        if not FINAL_SCORE_RE.match(score_text):
             continue
 
         odds_data = row.get('odds', '').split(',')
@@ -496,18 +547,28 @@ async def get_main_page_finished_matches_async(limit=None, offset=0, handicap_fi
         sort_desc=True,
     )
 
-@app.route('/')
-def index():
-    try:
-        print("Recibida petición para Próximos Partidos...")
-        hf = request.args.get('handicap')
-        matches = asyncio.run(get_main_page_matches_async(handicap_filter=hf))
+def _render_list_page(section, page_mode, page_title, handicap_filter, sort_desc=False):
+    # La página completa se guarda por versión de data.json y filtro; si no está, se
+    # monta con las filas de la caché de filas
+    table, mask = _list_mask(section, handicap_filter)
+
+    def render():
+        matches = _prepare_records(table.page(mask, order='-kickoff' if sort_desc else 'kickoff'))
         print(f"Datos cargados desde {DATA_FILE.name}. {len(matches)} partidos disponibles.")
         opts = sorted({
             normalize_handicap_to_half_bucket_str(m.get('handicap'))
             for m in matches if normalize_handicap_to_half_bucket_str(m.get('handicap')) is not None
         }, key=lambda x: float(x))
-        return render_template('index.html', matches=matches, handicap_filter=hf, handicap_options=opts, page_mode='upcoming', page_title='Próximos Partidos')
+        return render_match_list('index.html', page_mode, matches, handicap_filter=handicap_filter,
+                                 handicap_options=opts, page_title=page_title, next_cursor=None)
+
+    return cached_list_page('index.html', section, table.version, [('handicap', handicap_filter)], render)
+
+@app.route('/')
+def index():
+    try:
+        print("Recibida petición para Próximos Partidos...")
+        return _render_list_page('upcoming_matches', 'upcoming', 'Próximos Partidos', request.args.get('handicap'))
     except Exception as e:
         print(f"ERROR en la ruta principal: {e}")
         return render_template('index.html', matches=[], error=f"No se pudieron cargar los partidos: {e}", page_mode='upcoming', page_title='Próximos Partidos')
@@ -516,14 +577,7 @@ def index():
 def resultados():
     try:
         print("Recibida petición para Partidos Finalizados...")
-        hf = request.args.get('handicap')
-        matches = asyncio.run(get_main_page_finished_matches_async(handicap_filter=hf))
-        print(f"Datos cargados desde {DATA_FILE.name}. {len(matches)} partidos disponibles.")
-        opts = sorted({
-            normalize_handicap_to_half_bucket_str(m.get('handicap'))
-            for m in matches if normalize_handicap_to_half_bucket_str(m.get('handicap')) is not None
-        }, key=lambda x: float(x))
-        return render_template('index.html', matches=matches, handicap_filter=hf, handicap_options=opts, page_mode='finished', page_title='Resultados Finalizados')
+        return _render_list_page('finished_matches', 'finished', 'Resultados Finalizados', request.args.get('handicap'), sort_desc=True)
     except Exception as e:
         print(f"ERROR en la ruta de resultados: {e}")
         return render_template('index.html', matches=[], error=f"No se pudieron cargar los partidos: {e}", page_mode='finished', page_title='Resultados Finalizados')
@@ -531,37 +585,81 @@ def resultados():
 @app.route('/api/matches')
 def api_matches():
     try:
-        offset = int(request.args.get('offset', 0))
-        limit = int(request.args.get('limit', 5))
-        limit = min(limit, 50)
-        matches = asyncio.run(get_main_page_matches_async(limit, offset, request.args.get('handicap')))
-        return jsonify({'matches': matches})
+        return jsonify(_api_list_page('upcoming_matches'))
+    except CursorExpired as e:
+        return jsonify({'error': str(e), 'cursor_expired': True}), 410
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/finished_matches')
 def api_finished_matches():
     try:
-        offset = int(request.args.get('offset', 0))
-        limit = int(request.args.get('limit', 5))
-        limit = min(limit, 50)
-        matches = asyncio.run(get_main_page_finished_matches_async(limit, offset, request.args.get('handicap')))
-        return jsonify({'matches': matches})
+        return jsonify(_api_list_page('finished_matches', sort_desc=True))
+    except CursorExpired as e:
+        return jsonify({'error': str(e), 'cursor_expired': True}), 410
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Panel "En directo" de index.html. live_tracker está en la raíz del proyecto y solo
+# arranca su hilo de sondeo mientras haya alguien suscrito al stream.
+@app.route('/api/live')
+def api_live():
+    """Estado actual de los partidos en juego (un sondeo si el modelo está viejo)."""
+    from live_tracker import get_live_tracker
+    tracker = get_live_tracker()
+    if time.time() - tracker.updated_at > tracker.poll_seconds:
+        try:
+            tracker.poll_once()
+        except Exception as e:
+            print(f"Error al refrescar los partidos en directo: {e}")
+    return jsonify(tracker.snapshot())
+
+@app.route('/api/live/stream')
+def api_live_stream():
+    """
+    Partidos en juego como server-sent events: un 'snapshot' al conectar y después un
+    'update' con solo los campos que cambian ({'changed': {id: campos}, 'removed': [ids]}).
+    """
+    from live_tracker import get_live_tracker
+    tracker = get_live_tracker()
+    events = tracker.subscribe()
+
+    def generate():
+        try:
+            while True:
+                try:
+                    name, payload = events.get(timeout=20)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {name}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+        finally:
+            # El cliente se fue: sin suscriptores el hilo de sondeo se detiene solo
+            tracker.unsubscribe(events)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/proximos')
 def proximos():
     try:
         print("Recibida petición. Cargando datos desde cache...")
         hf = request.args.get('handicap')
-        matches = asyncio.run(get_main_page_matches_async(25, 0, hf))
+        table, mask = _list_mask('upcoming_matches', hf)
+        records, next_cursor = get_cursor_store().open('upcoming_matches', table, mask, 'kickoff', 0, 25)
+        matches = _prepare_records(records)
         print(f"Datos cargados desde {DATA_FILE.name}. {len(matches)} partidos disponibles.")
         opts = sorted({
             normalize_handicap_to_half_bucket_str(m.get('handicap'))
             for m in matches if normalize_handicap_to_half_bucket_str(m.get('handicap')) is not None
         }, key=lambda x: float(x))
-        return render_template('index.html', matches=matches, handicap_filter=hf, handicap_options=opts)
+        return render_template('index.html', matches=matches, match_rows=render_match_rows(None, matches), handicap_filter=hf, handicap_options=opts, next_cursor=next_cursor)
     except Exception as e:
         print(f"ERROR en la ruta principal: {e}")
         return render_template('index.html', matches=[], error=f"No se pudieron cargar los partidos: {e}")
@@ -571,9 +669,17 @@ def proximos():
 def mostrar_estudio(match_id):
     """
     Esta ruta se activa cuando un usuario visita /estudio/ID_DEL_PARTIDO.
+    Por defecto devuelve la página al momento y cada sección se rellena desde
+    /api/estudio/<id>/stream; con ?stream=0 se renderiza completa en el servidor.
     """
     print(f"Recibida petición para el estudio del partido ID: {match_id}")
-    
+    if request.args.get('stream', '1') != '0':
+        if not match_id.isdigit():
+            abort(400, description="ID de partido inválido.")
+        return render_template('estudio.html', data={'match_id': match_id}, streaming=True)
+
+    from modules.estudio_scraper import obtener_datos_completos_partido
+
     # Llama a la función principal de tu módulo de scraping
     datos_partido = obtener_datos_completos_partido(match_id)
     
@@ -584,7 +690,118 @@ def mostrar_estudio(match_id):
 
     # Si todo va bien, renderiza la plantilla HTML pasándole los datos
     print(f"Datos obtenidos para {datos_partido['home_name']} vs {datos_partido['away_name']}. Renderizando plantilla...")
-    return render_template('estudio.html', data=datos_partido, format_ah=format_ah_as_decimal_string_of)
+    return render_cached_content('estudio.html', datos_partido, data=datos_partido, format_ah=format_ah_as_decimal_string_of)
+
+def _encode_stream_event(event: str, payload, use_sse: bool) -> str:
+    data = json.dumps(payload, ensure_ascii=False, default=str)
+    if use_sse:
+        return f"event: {event}\ndata: {data}\n\n"
+    return json.dumps({"event": event, "data": json.loads(data)}, ensure_ascii=False) + "\n"
+
+
+# Bloques de estudio.html que se pueden pintar en cuanto llega cada sección del scraper
+ESTUDIO_SECTION_BLOCKS = {
+    'match': ('cabecera',),
+    'standings': ('clasificacion',),
+    'market_analysis': ('detalle',),
+    'stats': ('rendimiento', 'comparativas', 'h2h'),
+    'analysis': ('analisis',),
+}
+
+
+def _apply_estudio_section(vista: dict, partes: dict, name: str, payload) -> tuple:
+    """
+    Incorpora una sección del scraper a `vista` (los datos con la forma que espera
+    estudio.html) y devuelve los bloques de la plantilla que ya se pueden renderizar.
+    """
+    if name in ('match', 'standings', 'analysis'):
+        vista.update(payload)
+    elif name == 'h2h':
+        vista['h2h_data'] = payload
+    elif name in ('last_matches', 'comparativas'):
+        partes.update(payload)
+    elif name == 'h2h_col3':
+        partes['h2h_col3'] = payload
+    elif name == 'odds':
+        vista['main_match_odds'] = {'ah_linea': payload.get('ah_linea'), 'goals_linea': payload.get('goals_linea')}
+    elif name == 'market_analysis':
+        vista['market_analysis_html'] = payload.get('html', '')
+    elif name == 'stats':
+        from modules.estudio_scraper import MatchProgressionStats
+        stats = {key: MatchProgressionStats.from_rows(rows) for key, rows in payload.items()}
+        for key, details_key in (('last_home_match', 'last_home'), ('last_away_match', 'last_away'),
+                                 ('h2h_col3', 'h2h_col3'), ('comp_L_vs_UV_A', 'comp_L_vs_UV_A'),
+                                 ('comp_V_vs_UL_H', 'comp_V_vs_UL_H')):
+            vista[key] = {'details': partes.get(details_key), 'stats': stats.get(details_key)}
+        h2h_data = vista.get('h2h_data') or {}
+        vista['h2h_stadium'] = {'details': h2h_data, 'stats': stats.get('h2h_stadium')}
+        vista['h2h_general'] = {'details': h2h_data, 'stats': stats.get('h2h_general')}
+    return ESTUDIO_SECTION_BLOCKS.get(name, ())
+
+
+def _render_estudio_blocks(names, vista: dict) -> dict:
+    template = app.jinja_env.get_template('estudio.html')
+    context = template.new_context({'data': vista, 'format_ah': format_ah_as_decimal_string_of, 'streaming': False})
+    return {name: ''.join(template.blocks[name](context)) for name in names}
+
+
+@app.route('/api/estudio/<string:match_id>/stream')
+def api_estudio_stream(match_id):
+    """
+    Variante en streaming del estudio: envía cada sección del scraper (match, standings,
+    h2h, last_matches, h2h_col3, comparativas, odds, market_analysis, stats, analysis) en
+    cuanto está lista, seguida de los bloques de estudio.html que ya se pueden pintar
+    (evento 'bloque' con {id, html}). Server-sent events por defecto o NDJSON
+    (?format=ndjson); termina con 'done' o 'error'.
+    """
+    from modules.estudio_scraper import obtener_datos_completos_partido
+    use_sse = request.args.get('format', 'sse').lower() != 'ndjson'
+    deadline = Deadline()
+    events = queue.Queue()
+
+    def worker():
+        try:
+            datos = obtener_datos_completos_partido(
+                match_id, deadline=deadline, on_section=lambda name, payload: events.put((name, payload))
+            )
+            if not datos or "error" in datos:
+                events.put(("error", {"error": (datos or {}).get("error", "Error desconocido")}))
+            else:
+                events.put(("done", {"partial": datos.get("partial", False)}))
+        except Exception as e:
+            events.put(("error", {"error": f"Ocurrió una excepción inesperada: {e}"}))
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+
+    def generate():
+        vista, partes = {'match_id': match_id}, {}
+        while True:
+            try:
+                name, payload = events.get(timeout=10)
+            except queue.Empty:
+                if not thread.is_alive() and events.empty():
+                    yield _encode_stream_event("error", {"error": "El análisis terminó sin respuesta."}, use_sse)
+                    return
+                # Mantiene viva la conexión mientras Selenium trabaja
+                if use_sse:
+                    yield ": keepalive\n\n"
+                continue
+            yield _encode_stream_event(name, payload, use_sse)
+            if name in ("done", "error"):
+                return
+            try:
+                blocks = _render_estudio_blocks(_apply_estudio_section(vista, partes, name, payload), vista)
+            except Exception as e:
+                print(f"Error renderizando la sección '{name}' del estudio {match_id}: {e}")
+                continue
+            for block_id, html in blocks.items():
+                yield _encode_stream_event("bloque", {"id": block_id, "html": html}, use_sse)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream' if use_sse else 'application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 # --- NUEVA RUTA PARA ANALIZAR PARTIDOS FINALIZADOS ---
 @app.route('/analizar_partido', methods=['GET', 'POST'])
@@ -596,6 +813,7 @@ def analizar_partido():
         match_id = request.form.get('match_id')
         if match_id:
             print(f"Recibida petición para analizar partido finalizado ID: {match_id}")
+            from modules.estudio_scraper import obtener_datos_completos_partido, generar_analisis_mercado_simplificado
             
             # Llama a la función principal de tu módulo de scraping
             datos_partido = obtener_datos_completos_partido(match_id)
@@ -618,10 +836,11 @@ def analizar_partido():
 
             # Si todo va bien, renderiza la plantilla HTML pasándole los datos
             print(f"Datos obtenidos para {datos_partido['home_name']} vs {datos_partido['away_name']}. Renderizando plantilla...")
-            return render_template('estudio.html', 
-                                   data=datos_partido, 
-                                   format_ah=format_ah_as_decimal_string_of,
-                                   analisis_simplificado_html=analisis_simplificado_html)
+            return render_cached_content('estudio.html',
+                                         [datos_partido, analisis_simplificado_html],
+                                         data=datos_partido,
+                                         format_ah=format_ah_as_decimal_string_of,
+                                         analisis_simplificado_html=analisis_simplificado_html)
         else:
             return render_template('analizar_partido.html', error="Por favor, introduce un ID de partido válido.")
     
@@ -639,9 +858,10 @@ def api_preview(match_id):
         # Por defecto usa la vista previa LIGERA (requests). Si ?mode=selenium, usa la completa.
         mode = request.args.get('mode', 'light').lower()
         if mode in ['full', 'selenium']:
+            from modules.estudio_scraper import obtener_datos_preview_rapido
             preview_data = obtener_datos_preview_rapido(match_id)
         else:
-            preview_data = obtener_datos_preview_ligero(match_id)
+            preview_data = load_preview_from_cache(match_id, 'preview') or build_preview_payload(match_id)
         if "error" in preview_data:
             return jsonify(preview_data), 500
         return jsonify(preview_data)
@@ -650,6 +870,265 @@ def api_preview(match_id):
         return jsonify({'error': 'Ocurrió un error interno en el servidor.'}), 500
 
 
+def build_preview_payload(match_id: str) -> dict:
+    """
+    Vista previa ligera de un partido (sin consultar la caché). Se guarda en su propia
+    entrada de caché salvo que haya fallado o se haya cortado por el plazo (partial).
+    """
+    from modules.estudio_scraper import obtener_datos_preview_ligero
+
+    payload = obtener_datos_preview_ligero(match_id)
+    if not payload.get('error') and not payload.get('partial'):
+        save_preview_to_cache(match_id, payload, 'preview')
+    return payload
+
+
+def build_analysis_payload(match_id: str) -> dict:
+    """
+    Análisis profundo de un partido (sin consultar la caché). Devuelve el payload
+    complejo + el HTML simplificado y lo guarda en caché; {'error': ...} si falla.
+    """
+    from modules.estudio_scraper import obtener_datos_completos_partido, generar_analisis_mercado_simplificado
+    from modules.utils import check_handicap_cover
+
+    start_time = time.time()
+    logging.warning(f"CACHE MISS para {match_id}. Iniciando análisis profundo...")
+
+    datos = obtener_datos_completos_partido(match_id)
+    if not datos or (isinstance(datos, dict) and datos.get('error')):
+        return {'error': (datos or {}).get('error', 'No se pudieron obtener datos.')}
+
+    # --- Lógica para el payload complejo (la original) ---
+    def df_to_rows(df):
+        rows = []
+        try:
+            if df is not None and hasattr(df, 'to_rows'):
+                return df.to_rows()
+            if df is not None and hasattr(df, 'iterrows'):
+                for idx, row in df.iterrows():
+                    label = str(idx)
+                    label = label.replace('Shots on Goal', 'Tiros a Puerta')                                     .replace('Shots', 'Tiros')                                     .replace('Dangerous Attacks', 'Ataques Peligrosos')                                     .replace('Attacks', 'Ataques')
+                    try:
+                        home_val = row['Casa']
+                    except Exception:
+                        home_val = ''
+                    try:
+                        away_val = row['Fuera']
+                    except Exception:
+                        away_val = ''
+                    rows.append({'label': label, 'home': home_val or '', 'away': away_val or ''})
+        except Exception:
+            pass
+        return rows
+
+    payload = {
+        'match_id': match_id,
+        'home_team': datos.get('home_name', ''),
+        'away_team': datos.get('away_name', ''),
+        'final_score': datos.get('score'),
+        'match_date': datos.get('match_date'),
+        'match_time': datos.get('match_time'),
+        'match_datetime': datos.get('match_datetime'),
+        'recent_indirect_full': {
+            'last_home': None,
+            'last_away': None,
+            'h2h_col3': None
+        },
+        'comparativas_indirectas': {
+            'left': None,
+            'right': None
+        }
+    }
+    
+    # --- START COVERAGE CALCULATION ---
+    main_odds = datos.get("main_match_odds_data")
+    home_name = datos.get("home_name")
+    away_name = datos.get("away_name")
+    ah_actual_num = parse_ah_to_number_of(main_odds.get('ah_linea_raw', ''))
+    
+    favorito_actual_name = "Ninguno (línea en 0)"
+    if ah_actual_num is not None:
+        if ah_actual_num > 0: favorito_actual_name = home_name
+        elif ah_actual_num < 0: favorito_actual_name = away_name
+
+    def get_cover_status_vs_current(details):
+        if not details or ah_actual_num is None:
+            return 'NEUTRO'
+        try:
+            score_str = details.get('score', '').replace(' ', '').replace(':', '-')
+            if not score_str or '?' in score_str:
+                return 'NEUTRO'
+
+            h_home = details.get('home_team')
+            h_away = details.get('away_team')
+            
+            status, _ = check_handicap_cover(score_str, ah_actual_num, favorito_actual_name, h_home, h_away, home_name)
+            return status
+        except Exception:
+            return 'NEUTRO'
+            
+    # --- Análisis mejorado de H2H Rivales ---
+    def analyze_h2h_rivals(home_result, away_result):
+        if not home_result or not away_result:
+            return None
+            
+        try:
+            # Obtener resultados de los partidos
+            home_goals = list(map(int, home_result.get('score', '0-0').split('-')))
+            away_goals = list(map(int, away_result.get('score', '0-0').split('-')))
+            
+            # Calcular diferencia de goles
+            home_goal_diff = home_goals[0] - home_goals[1]
+            away_goal_diff = away_goals[0] - away_goals[1]
+            
+            # Comparar resultados
+            if home_goal_diff > away_goal_diff:
+                return "Contra rivales comunes, el Equipo Local ha obtenido mejores resultados"
+            elif away_goal_diff > home_goal_diff:
+                return "Contra rivales comunes, el Equipo Visitante ha obtenido mejores resultados"
+            else:
+                return "Los rivales han tenido resultados similares"
+        except Exception:
+            return None
+            
+    # --- Análisis de Comparativas Indirectas ---
+    def analyze_indirect_comparison(result, team_name):
+        if not result:
+            return None
+            
+        try:
+            # Determinar si el equipo cubrió el handicap
+            status = get_cover_status_vs_current(result)
+            
+            if status == 'CUBIERTO':
+                return f"Contra este rival, {team_name} habría cubierto el handicap"
+            elif status == 'NO CUBIERTO':
+                return f"Contra este rival, {team_name} no habría cubierto el handicap"
+            else:
+                return f"Contra este rival, el resultado para {team_name} sería indeterminado"
+        except Exception:
+            return None
+    # --- END COVERAGE CALCULATION ---
+
+    last_home = (datos.get('last_home_match') or {})
+    last_home_details = last_home.get('details') or {}
+    if last_home_details:
+        payload['recent_indirect_full']['last_home'] = {
+            'home': last_home_details.get('home_team'),
+            'away': last_home_details.get('away_team'),
+            'score': (last_home_details.get('score') or '').replace(':', ' : '),
+            'ah': format_ah_as_decimal_string_of(last_home_details.get('handicap_line_raw') or '-'),
+            'ou': last_home_details.get('ouLine') or '-',
+            'stats_rows': df_to_rows(last_home.get('stats')),
+            'date': last_home_details.get('date'),
+            'cover_status': get_cover_status_vs_current(last_home_details)
+        }
+
+    last_away = (datos.get('last_away_match') or {})
+    last_away_details = last_away.get('details') or {}
+    if last_away_details:
+        payload['recent_indirect_full']['last_away'] = {
+            'home': last_away_details.get('home_team'),
+            'away': last_away_details.get('away_team'),
+            'score': (last_away_details.get('score') or '').replace(':', ' : '),
+            'ah': format_ah_as_decimal_string_of(last_away_details.get('handicap_line_raw') or '-'),
+            'ou': last_away_details.get('ouLine') or '-',
+            'stats_rows': df_to_rows(last_away.get('stats')),
+            'date': last_away_details.get('date'),
+            'cover_status': get_cover_status_vs_current(last_away_details)
+        }
+
+    h2h_col3 = (datos.get('h2h_col3') or {})
+    h2h_col3_details = h2h_col3.get('details') or {}
+    if h2h_col3_details and h2h_col3_details.get('status') == 'found':
+        h2h_col3_details_adapted = {
+            'score': f"{h2h_col3_details.get('goles_home')}:{h2h_col3_details.get('goles_away')}",
+            'home_team': h2h_col3_details.get('h2h_home_team_name'),
+            'away_team': h2h_col3_details.get('h2h_away_team_name')
+        }
+        payload['recent_indirect_full']['h2h_col3'] = {
+            'home': h2h_col3_details.get('h2h_home_team_name'),
+            'away': h2h_col3_details.get('h2h_away_team_name'),
+            'score': f"{h2h_col3_details.get('goles_home')} : {h2h_col3_details.get('goles_away')}",
+            'ah': format_ah_as_decimal_string_of(h2h_col3_details.get('handicap_line_raw') or '-'),
+            'ou': h2h_col3_details.get('ou_result') or '-',
+            'stats_rows': df_to_rows(h2h_col3.get('stats')),
+            'date': h2h_col3_details.get('date'),
+            'cover_status': get_cover_status_vs_current(h2h_col3_details_adapted),
+            'analysis': analyze_h2h_rivals(last_home_details, last_away_details)
+        }
+
+    h2h_general = (datos.get('h2h_general') or {})
+    h2h_general_details = h2h_general.get('details') or {}
+    if h2h_general_details:
+        score_text = h2h_general_details.get('res6') or ''
+        cover_input = {
+            'score': score_text,
+            'home_team': h2h_general_details.get('h2h_gen_home'),
+            'away_team': h2h_general_details.get('h2h_gen_away')
+        }
+        payload['recent_indirect_full']['h2h_general'] = {
+            'home': h2h_general_details.get('h2h_gen_home'),
+            'away': h2h_general_details.get('h2h_gen_away'),
+            'score': score_text.replace(':', ' : '),
+            'ah': h2h_general_details.get('ah6') or '-',
+            'ou': h2h_general_details.get('ou_result6') or '-',
+            'stats_rows': df_to_rows(h2h_general.get('stats')),
+            'date': h2h_general_details.get('date'),
+            'cover_status': get_cover_status_vs_current(cover_input) if score_text else 'NEUTRO'
+        }
+
+    comp_left = (datos.get('comp_L_vs_UV_A') or {})
+    comp_left_details = comp_left.get('details') or {}
+    if comp_left_details:
+        payload['comparativas_indirectas']['left'] = {
+            'title_home_name': datos.get('home_name'),
+            'title_away_name': datos.get('away_name'),
+            'home_team': comp_left_details.get('home_team'),
+            'away_team': comp_left_details.get('away_team'),
+            'score': (comp_left_details.get('score') or '').replace(':', ' : '),
+            'ah': format_ah_as_decimal_string_of(comp_left_details.get('ah_line') or '-'),
+            'ou': comp_left_details.get('ou_line') or '-',
+            'localia': comp_left_details.get('localia') or '',
+            'stats_rows': df_to_rows(comp_left.get('stats')),
+            'cover_status': get_cover_status_vs_current(comp_left_details),
+            'analysis': analyze_indirect_comparison(comp_left_details, datos.get('home_name'))
+        }
+
+    comp_right = (datos.get('comp_V_vs_UL_H') or {})
+    comp_right_details = comp_right.get('details') or {}
+    if comp_right_details:
+        payload['comparativas_indirectas']['right'] = {
+            'title_home_name': datos.get('home_name'),
+            'title_away_name': datos.get('away_name'),
+            'home_team': comp_right_details.get('home_team'),
+            'away_team': comp_right_details.get('away_team'),
+            'score': (comp_right_details.get('score') or '').replace(':', ' : '),
+            'ah': format_ah_as_decimal_string_of(comp_right_details.get('ah_line') or '-'),
+            'ou': comp_right_details.get('ou_line') or '-',
+            'localia': comp_right_details.get('localia') or '',
+            'stats_rows': df_to_rows(comp_right.get('stats')),
+            'cover_status': get_cover_status_vs_current(comp_right_details),
+            'analysis': analyze_indirect_comparison(comp_right_details, datos.get('away_name'))
+        }
+
+    # --- Lógica para el HTML simplificado ---
+    h2h_data = datos.get("h2h_data")
+    simplified_html = ""
+    if all([main_odds, h2h_data, home_name, away_name]):
+        simplified_html = generar_analisis_mercado_simplificado(main_odds, h2h_data, home_name, away_name)
+    
+    payload['simplified_html'] = simplified_html
+
+    save_preview_to_cache(match_id, payload)
+
+    end_time = time.time()
+    elapsed = end_time - start_time
+    logging.warning(f"[PERFORMANCE] El análisis completo para el partido {match_id} tardó {elapsed:.2f} segundos.")
+
+    return payload
+
+
 @app.route('/api/analisis/<string:match_id>')
 def api_analisis(match_id):
     """
@@ -662,245 +1141,63 @@ def api_analisis(match_id):
             print(f"Devolviendo analisis cacheado para {match_id}")
             return jsonify(cached_payload)
 
-        start_time = time.time()
-        logging.warning(f"CACHE MISS para {match_id}. Iniciando análisis profundo...")
-
-        datos = obtener_datos_completos_partido(match_id)
-        if not datos or (isinstance(datos, dict) and datos.get('error')):
-            return jsonify({'error': (datos or {}).get('error', 'No se pudieron obtener datos.')}), 500
-
-        # --- Lógica para el payload complejo (la original) ---
-        def df_to_rows(df):
-            rows = []
-            try:
-                if df is not None and hasattr(df, 'iterrows'):
-                    for idx, row in df.iterrows():
-                        label = str(idx)
-                        label = label.replace('Shots on Goal', 'Tiros a Puerta')                                     .replace('Shots', 'Tiros')                                     .replace('Dangerous Attacks', 'Ataques Peligrosos')                                     .replace('Attacks', 'Ataques')
-                        try:
-                            home_val = row['Casa']
-                        except Exception:
-                            home_val = ''
-                        try:
-                            away_val = row['Fuera']
-                        except Exception:
-                            away_val = ''
-                        rows.append({'label': label, 'home': home_val or '', 'away': away_val or ''})
-            except Exception:
-                pass
-            return rows
-
-        payload = {
-            'match_id': match_id,
-            'home_team': datos.get('home_name', ''),
-            'away_team': datos.get('away_name', ''),
-            'final_score': datos.get('score'),
-            'match_date': datos.get('match_date'),
-            'match_time': datos.get('match_time'),
-            'match_datetime': datos.get('match_datetime'),
-            'recent_indirect_full': {
-                'last_home': None,
-                'last_away': None,
-                'h2h_col3': None
-            },
-            'comparativas_indirectas': {
-                'left': None,
-                'right': None
-            }
-        }
-        
-        # --- START COVERAGE CALCULATION ---
-        main_odds = datos.get("main_match_odds_data")
-        home_name = datos.get("home_name")
-        away_name = datos.get("away_name")
-        ah_actual_num = parse_ah_to_number_of(main_odds.get('ah_linea_raw', ''))
-        
-        favorito_actual_name = "Ninguno (línea en 0)"
-        if ah_actual_num is not None:
-            if ah_actual_num > 0: favorito_actual_name = home_name
-            elif ah_actual_num < 0: favorito_actual_name = away_name
-
-        def get_cover_status_vs_current(details):
-            if not details or ah_actual_num is None:
-                return 'NEUTRO'
-            try:
-                score_str = details.get('score', '').replace(' ', '').replace(':', '-')
-                if not score_str or '?' in score_str:
-                    return 'NEUTRO'
-
-                h_home = details.get('home_team')
-                h_away = details.get('away_team')
-                
-                status, _ = check_handicap_cover(score_str, ah_actual_num, favorito_actual_name, h_home, h_away, home_name)
-                return status
-            except Exception:
-                return 'NEUTRO'
-                
-        # --- Análisis mejorado de H2H Rivales ---
-        def analyze_h2h_rivals(home_result, away_result):
-            if not home_result or not away_result:
-                return None
-                
-            try:
-                # Obtener resultados de los partidos
-                home_goals = list(map(int, home_result.get('score', '0-0').split('-')))
-                away_goals = list(map(int, away_result.get('score', '0-0').split('-')))
-                
-                # Calcular diferencia de goles
-                home_goal_diff = home_goals[0] - home_goals[1]
-                away_goal_diff = away_goals[0] - away_goals[1]
-                
-                # Comparar resultados
-                if home_goal_diff > away_goal_diff:
-                    return "Contra rivales comunes, el Equipo Local ha obtenido mejores resultados"
-                elif away_goal_diff > home_goal_diff:
-                    return "Contra rivales comunes, el Equipo Visitante ha obtenido mejores resultados"
-                else:
-                    return "Los rivales han tenido resultados similares"
-            except Exception:
-                return None
-                
-        # --- Análisis de Comparativas Indirectas ---
-        def analyze_indirect_comparison(result, team_name):
-            if not result:
-                return None
-                
-            try:
-                # Determinar si el equipo cubrió el handicap
-                status = get_cover_status_vs_current(result)
-                
-                if status == 'CUBIERTO':
-                    return f"Contra este rival, {team_name} habría cubierto el handicap"
-                elif status == 'NO CUBIERTO':
-                    return f"Contra este rival, {team_name} no habría cubierto el handicap"
-                else:
-                    return f"Contra este rival, el resultado para {team_name} sería indeterminado"
-            except Exception:
-                return None
-        # --- END COVERAGE CALCULATION ---
-
-        last_home = (datos.get('last_home_match') or {})
-        last_home_details = last_home.get('details') or {}
-        if last_home_details:
-            payload['recent_indirect_full']['last_home'] = {
-                'home': last_home_details.get('home_team'),
-                'away': last_home_details.get('away_team'),
-                'score': (last_home_details.get('score') or '').replace(':', ' : '),
-                'ah': format_ah_as_decimal_string_of(last_home_details.get('handicap_line_raw') or '-'),
-                'ou': last_home_details.get('ouLine') or '-',
-                'stats_rows': df_to_rows(last_home.get('stats')),
-                'date': last_home_details.get('date'),
-                'cover_status': get_cover_status_vs_current(last_home_details)
-            }
-
-        last_away = (datos.get('last_away_match') or {})
-        last_away_details = last_away.get('details') or {}
-        if last_away_details:
-            payload['recent_indirect_full']['last_away'] = {
-                'home': last_away_details.get('home_team'),
-                'away': last_away_details.get('away_team'),
-                'score': (last_away_details.get('score') or '').replace(':', ' : '),
-                'ah': format_ah_as_decimal_string_of(last_away_details.get('handicap_line_raw') or '-'),
-                'ou': last_away_details.get('ouLine') or '-',
-                'stats_rows': df_to_rows(last_away.get('stats')),
-                'date': last_away_details.get('date'),
-                'cover_status': get_cover_status_vs_current(last_away_details)
-            }
-
-        h2h_col3 = (datos.get('h2h_col3') or {})
-        h2h_col3_details = h2h_col3.get('details') or {}
-        if h2h_col3_details and h2h_col3_details.get('status') == 'found':
-            h2h_col3_details_adapted = {
-                'score': f"{h2h_col3_details.get('goles_home')}:{h2h_col3_details.get('goles_away')}",
-                'home_team': h2h_col3_details.get('h2h_home_team_name'),
-                'away_team': h2h_col3_details.get('h2h_away_team_name')
-            }
-            payload['recent_indirect_full']['h2h_col3'] = {
-                'home': h2h_col3_details.get('h2h_home_team_name'),
-                'away': h2h_col3_details.get('h2h_away_team_name'),
-                'score': f"{h2h_col3_details.get('goles_home')} : {h2h_col3_details.get('goles_away')}",
-                'ah': format_ah_as_decimal_string_of(h2h_col3_details.get('handicap_line_raw') or '-'),
-                'ou': h2h_col3_details.get('ou_result') or '-',
-                'stats_rows': df_to_rows(h2h_col3.get('stats')),
-                'date': h2h_col3_details.get('date'),
-                'cover_status': get_cover_status_vs_current(h2h_col3_details_adapted),
-                'analysis': analyze_h2h_rivals(last_home_details, last_away_details)
-            }
-
-        h2h_general = (datos.get('h2h_general') or {})
-        h2h_general_details = h2h_general.get('details') or {}
-        if h2h_general_details:
-            score_text = h2h_general_details.get('res6') or ''
-            cover_input = {
-                'score': score_text,
-                'home_team': h2h_general_details.get('h2h_gen_home'),
-                'away_team': h2h_general_details.get('h2h_gen_away')
-            }
-            payload['recent_indirect_full']['h2h_general'] = {
-                'home': h2h_general_details.get('h2h_gen_home'),
-                'away': h2h_general_details.get('h2h_gen_away'),
-                'score': score_text.replace(':', ' : '),
-                'ah': h2h_general_details.get('ah6') or '-',
-                'ou': h2h_general_details.get('ou_result6') or '-',
-                'stats_rows': df_to_rows(h2h_general.get('stats')),
-                'date': h2h_general_details.get('date'),
-                'cover_status': get_cover_status_vs_current(cover_input) if score_text else 'NEUTRO'
-            }
-
-        comp_left = (datos.get('comp_L_vs_UV_A') or {})
-        comp_left_details = comp_left.get('details') or {}
-        if comp_left_details:
-            payload['comparativas_indirectas']['left'] = {
-                'title_home_name': datos.get('home_name'),
-                'title_away_name': datos.get('away_name'),
-                'home_team': comp_left_details.get('home_team'),
-                'away_team': comp_left_details.get('away_team'),
-                'score': (comp_left_details.get('score') or '').replace(':', ' : '),
-                'ah': format_ah_as_decimal_string_of(comp_left_details.get('ah_line') or '-'),
-                'ou': comp_left_details.get('ou_line') or '-',
-                'localia': comp_left_details.get('localia') or '',
-                'stats_rows': df_to_rows(comp_left.get('stats')),
-                'cover_status': get_cover_status_vs_current(comp_left_details),
-                'analysis': analyze_indirect_comparison(comp_left_details, datos.get('home_name'))
-            }
-
-        comp_right = (datos.get('comp_V_vs_UL_H') or {})
-        comp_right_details = comp_right.get('details') or {}
-        if comp_right_details:
-            payload['comparativas_indirectas']['right'] = {
-                'title_home_name': datos.get('home_name'),
-                'title_away_name': datos.get('away_name'),
-                'home_team': comp_right_details.get('home_team'),
-                'away_team': comp_right_details.get('away_team'),
-                'score': (comp_right_details.get('score') or '').replace(':', ' : '),
-                'ah': format_ah_as_decimal_string_of(comp_right_details.get('ah_line') or '-'),
-                'ou': comp_right_details.get('ou_line') or '-',
-                'localia': comp_right_details.get('localia') or '',
-                'stats_rows': df_to_rows(comp_right.get('stats')),
-                'cover_status': get_cover_status_vs_current(comp_right_details),
-                'analysis': analyze_indirect_comparison(comp_right_details, datos.get('away_name'))
-            }
-
-        # --- Lógica para el HTML simplificado ---
-        h2h_data = datos.get("h2h_data")
-        simplified_html = ""
-        if all([main_odds, h2h_data, home_name, away_name]):
-            simplified_html = generar_analisis_mercado_simplificado(main_odds, h2h_data, home_name, away_name)
-        
-        payload['simplified_html'] = simplified_html
-
-        save_preview_to_cache(match_id, payload)
-
-        end_time = time.time()
-        elapsed = end_time - start_time
-        logging.warning(f"[PERFORMANCE] El análisis completo para el partido {match_id} tardó {elapsed:.2f} segundos.")
-
+        payload = build_analysis_payload(match_id)
+        if payload.get('error'):
+            return jsonify(payload), 500
         return jsonify(payload)
 
     except Exception as e:
         print(f"Error en la ruta /api/analisis/{match_id}: {e}")
         return jsonify({'error': 'Ocurrió un error interno en el servidor.'}), 500
 
+@app.route('/api/analisis/batch', methods=['GET', 'POST'])
+def api_analisis_batch():
+    """
+    Análisis por lotes: recibe varios match_id (?ids=1,2,3 o JSON {"ids": [...]}) y envía
+    cada resultado en cuanto está listo, como NDJSON (por defecto) o como server-sent
+    events (?format=sse o Accept: text/event-stream). Lo que ya está en caché sale al
+    momento; el resto se reparte en el pool de análisis. ?kind=preview usa la vista
+    previa ligera en lugar del análisis profundo.
+    """
+    body = request.get_json(silent=True) or {}
+    raw_ids = body.get('ids') or request.args.get('ids', '')
+    if isinstance(raw_ids, str):
+        raw_ids = raw_ids.split(',')
+    match_ids = list(dict.fromkeys(str(i).strip() for i in raw_ids if str(i).strip().isdigit()))
+    if not match_ids:
+        return jsonify({'error': 'No se proporcionaron IDs de partido válidos.'}), 400
+    if len(match_ids) > BATCH_MAX_IDS:
+        return jsonify({'error': f'Como máximo {BATCH_MAX_IDS} partidos por lote.'}), 400
+
+    kind = str(body.get('kind') or request.args.get('kind', 'analisis')).lower()
+    if kind not in ('analisis', 'preview'):
+        return jsonify({'error': f'Tipo de análisis desconocido: {kind}'}), 400
+    fmt = str(body.get('format') or request.args.get('format', '')).lower()
+    use_sse = fmt == 'sse' or (not fmt and 'text/event-stream' in request.headers.get('Accept', ''))
+
+    # Primero se encolan los que faltan, para que el pool empiece mientras se envía la caché
+    cached, pending = [], {}
+    for match_id in match_ids:
+        cached_payload = load_preview_from_cache(match_id, kind)
+        if isinstance(cached_payload, dict) and cached_payload.get('home_team'):
+            cached.append((match_id, cached_payload))
+        else:
+            pending[_submit_analysis_job(kind, match_id)] = match_id
+
+    def generate():
+        for match_id, payload in cached:
+            yield _encode_batch_event(match_id, payload, use_sse, cached=True)
+        # Si el cliente se desconecta, los trabajos siguen y dejan su resultado en caché
+        for future in as_completed(pending):
+            yield _encode_batch_event(pending[future], future.result(), use_sse)
+        if use_sse:
+            yield "event: done\ndata: {}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream' if use_sse else 'application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/start_analysis_background', methods=['POST'])
 def start_analysis_background():
     match_id = request.json.get('match_id')
@@ -911,6 +1208,7 @@ def start_analysis_background():
         with app.app_context():
             print(f"Iniciando análisis en segundo plano para el ID: {match_id}")
             try:
+                from modules.estudio_scraper import obtener_datos_completos_partido
                 obtener_datos_completos_partido(match_id)
                 print(f"Análisis en segundo plano finalizado para el ID: {match_id}")
             except Exception as e:
@@ -4,11 +4,19 @@ import time
 import requests
 import re
 import math
+import sys
+from pathlib import Path
 from bs4 import BeautifulSoup
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor
+# handicap.py está en la raíz del proyecto (dos niveles por encima de este script)
+PROJECT_ROOT = str(Path(__file__).resolve().parents[2])
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+from handicap import parse_ah_to_number_of, format_ah_as_decimal_string_of
+from modules.nombres_equipos import normalize_team_name, same_team
 # Importaciones de Selenium
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options as ChromeOptions
@@ -24,61 +32,6 @@ SELENIUM_POLL_FREQUENCY_OF = 0.2
 PLACEHOLDER_NODATA = "*(No disponible)*"
 
 # --- FUNCIONES HELPER PARA PARSEO Y FORMATEO ---
-def parse_ah_to_number_of(ah_line_str: str):
-    if not isinstance(ah_line_str, str): return None
-    s = ah_line_str.strip().replace(' ', '')
-    if not s or s in ['-', '?']: return None
-    original_starts_with_minus = ah_line_str.strip().startswith('-')
-    try:
-        if '/' in s:
-            parts = s.split('/')
-            if len(parts) != 2: return None
-            p1_str, p2_str = parts[0], parts[1]
-            val1 = float(p1_str)
-            val2 = float(p2_str)
-            if val1 < 0 and not p2_str.startswith('-') and val2 > 0:
-                 val2 = -abs(val2)
-            elif original_starts_with_minus and val1 == 0.0 and \
-                 (p1_str == "0" or p1_str == "-0") and \
-                 not p2_str.startswith('-') and val2 > 0:
-                val2 = -abs(val2)
-            return (val1 + val2) / 2.0
-        else:
-            return float(s)
-    except (ValueError, IndexError):
-        return None
-
-def format_ah_as_decimal_string_of(ah_line_str: str, for_sheets=False):
-    if not isinstance(ah_line_str, str) or not ah_line_str.strip() or ah_line_str.strip() in ['-', '?']:
-        return ah_line_str.strip() if isinstance(ah_line_str, str) and ah_line_str.strip() in ['-','?'] else '-'
-    numeric_value = parse_ah_to_number_of(ah_line_str)
-    if numeric_value is None:
-        return ah_line_str.strip() if ah_line_str.strip() in ['-','?'] else '-'
-    if numeric_value == 0.0: return "0"
-    sign = -1 if numeric_value < 0 else 1
-    abs_num = abs(numeric_value)
-    mod_val = abs_num % 1
-    if mod_val == 0.0: abs_rounded = abs_num
-    elif mod_val == 0.25: abs_rounded = math.floor(abs_num) + 0.25
-    elif mod_val == 0.5: abs_rounded = abs_num
-    elif mod_val == 0.75: abs_rounded = math.floor(abs_num) + 0.75
-    else:
-        if mod_val < 0.25: abs_rounded = math.floor(abs_num)
-        elif mod_val < 0.75: abs_rounded = math.floor(abs_num) + 0.5
-        else: abs_rounded = math.ceil(abs_num)
-    final_value_signed = sign * abs_rounded
-    if final_value_signed == 0.0: output_str = "0"
-    elif abs(final_value_signed - round(final_value_signed, 0)) < 1e-9 : output_str = str(int(round(final_value_signed, 0)))
-    elif abs(final_value_signed - (math.floor(final_value_signed) + 0.5)) < 1e-9: output_str = f"{final_value_signed:.1f}"
-    elif abs(final_value_signed - (math.floor(final_value_signed) + 0.25)) < 1e-9 or \
-         abs(final_value_signed - (math.floor(final_value_signed) + 0.75)) < 1e-9: output_str = f"{final_value_signed:.2f}".replace(".25", ".25").replace(".75", ".75")
-    else: output_str = f"{final_value_signed:.2f}"
-    if for_sheets:
-        return "'" + output_str.replace('.', ',') if output_str not in ['-','?'] else output_str
-    return output_str
-
-# --- SISTEMA EXCEPCIONAL DE ANÁLISIS DE MERCADO ---
-
 def check_handicap_cover(resultado_raw: str, ah_line_num: float, favorite_team_name: str, home_team_in_h2h: str, away_team_in_h2h: str, main_home_team_name: str):
     """
     Simula si un resultado histórico habría cubierto la línea de hándicap actual.
@@ -90,7 +43,7 @@ def check_handicap_cover(resultado_raw: str, ah_line_num: float, favorite_team_n
         # --- LÓGICA ESPECIAL PARA HÁNDICAP 0 (DRAW NO BET) ---
         if ah_line_num == 0.0:
             # Simulamos la apuesta sobre el equipo local del partido principal
-            if main_home_team_name.lower() == home_team_in_h2h.lower(): # Si nuestro local jugaba de local
+            if same_team(main_home_team_name, home_team_in_h2h): # Si nuestro local jugaba de local
                 if goles_h > goles_a: return ("CUBIERTO", True)
                 elif goles_a > goles_h: return ("NO CUBIERTO", False)
                 else: return ("PUSH", None)
@@ -100,9 +53,9 @@ def check_handicap_cover(resultado_raw: str, ah_line_num: float, favorite_team_n
                 else: return ("PUSH", None)
         
         # --- LÓGICA ANTERIOR PARA HÁNDICAPS CON FAVORITO ---
-        if favorite_team_name.lower() == home_team_in_h2h.lower():
+        if same_team(favorite_team_name, home_team_in_h2h):
             favorite_margin = goles_h - goles_a
-        elif favorite_team_name.lower() == away_team_in_h2h.lower():
+        elif same_team(favorite_team_name, away_team_in_h2h):
             favorite_margin = goles_a - goles_h
         else:
             return ("indeterminado", None)
@@ -173,7 +126,7 @@ def _analizar_precedente_handicap(precedente_data, ah_actual_num, favorito_actua
             favorito_historico_name = away_team_precedente
         
         # 2. Lógica de comparación unificada
-        if favorito_actual_name.lower() == (favorito_historico_name or "").lower():
+        if same_team(favorito_actual_name, favorito_historico_name):
             # El favorito es el mismo equipo (o ambos son 'Ninguno'), ahora comparamos la magnitud.
             if abs(ah_actual_num) > abs(ah_historico_num):
                 comparativa_texto = f"El mercado considera a este equipo <strong>más favorito</strong> que en el precedente (movimiento: <strong style='color: green; font-size:1.2em;'>{line_movement_str}</strong>). "
@@ -512,8 +465,8 @@ def extract_last_match_in_league_of(soup, table_id, team_name, league_id, is_hom
             continue
         if league_id and details.get("league_id_hist") != str(league_id):
             continue
-        is_team_home = team_name.lower() in details.get('home', '').lower()
-        is_team_away = team_name.lower() in details.get('away', '').lower()
+        is_team_home = same_team(team_name, details.get('home'))
+        is_team_away = same_team(team_name, details.get('away'))
         if (is_home_game and is_team_home) or (not is_home_game and is_team_away):
             candidate_matches.append(details)
     if not candidate_matches: return None
@@ -569,18 +522,21 @@ def extract_standings_data_from_h2h_page_of(soup, team_name):
     is_home_table = False
 
     # 2. Identificar la tabla correcta (local o visitante) para el equipo buscado
-    home_div = standings_section.find("div", class_="home-div")
-    # Se busca el nombre del equipo en todo el bloque para más seguridad
-    if home_div and team_name.lower() in home_div.get_text(strip=True).lower():
-        team_table_soup = home_div.find("table", class_="team-table-home")
+    # El nombre va en el enlace de cabecera de cada tabla ('[AFC U23-3]Singapore U23')
+    def _table_of(side):
+        side_div = standings_section.find("div", class_=f"{side}-div")
+        table = side_div.find("table", class_=f"team-table-{side}") if side_div else None
+        link = table.find("a") if table else None
+        return table if link and same_team(link.get_text(separator=" ", strip=True), team_name) else None
+
+    if (home_table := _table_of("home")):
+        team_table_soup = home_table
         is_home_table = True
         data["specific_type"] = "Est. como Local (en Liga)"
-    else:
-        guest_div = standings_section.find("div", class_="guest-div")
-        if guest_div and team_name.lower() in guest_div.get_text(strip=True).lower():
-            team_table_soup = guest_div.find("table", class_="team-table-guest")
-            is_home_table = False
-            data["specific_type"] = "Est. como Visitante (en Liga)"
+    elif (guest_table := _table_of("guest")):
+        team_table_soup = guest_table
+        is_home_table = False
+        data["specific_type"] = "Est. como Visitante (en Liga)"
 
     if not team_table_soup:
         return data  # Si no se encuentra la tabla del equipo, se retorna data vacía
@@ -709,7 +665,7 @@ def extract_h2h_data_of(soup, home_name, away_name, league_id=None):
     most_recent = all_matches[0]
     results.update({'ah6': most_recent.get('ahLine', '-'), 'res6': most_recent.get('score', '?:?'), 'res6_raw': most_recent.get('score_raw', '?-?'), 'match6_id': most_recent.get('matchIndex'), 'h2h_gen_home': most_recent.get('home'), 'h2h_gen_away': most_recent.get('away')})
     for d in all_matches:
-        if d['home'].lower() == home_name.lower() and d['away'].lower() == away_name.lower():
+        if same_team(d['home'], home_name) and same_team(d['away'], away_name):
             results.update({'ah1': d.get('ahLine', '-'), 'res1': d.get('score', '?:?'), 'res1_raw': d.get('score_raw', '?-?'), 'match1_id': d.get('matchIndex')})
             break
     return results
@@ -720,9 +676,9 @@ def extract_comparative_match_of(soup, table_id, main_team, opponent, league_id,
     for row in table.find_all("tr", id=re.compile(rf"tr{table_id[-1]}_\d+")):
         if not (details := get_match_details_from_row_of(row, score_class_selector=score_selector, source_table_type='hist')): continue
         if league_id and details.get('league_id_hist') and details.get('league_id_hist') != str(league_id): continue
-        h, a = details.get('home','').lower(), details.get('away','').lower()
-        main, opp = main_team.lower(), opponent.lower()
-        if (main == h and opp == a) or (main == a and opp == h):
+        h, a = normalize_team_name(details.get('home')), normalize_team_name(details.get('away'))
+        main, opp = normalize_team_name(main_team), normalize_team_name(opponent)
+        if main and opp and ((main == h and opp == a) or (main == a and opp == h)):
             return {"score": details.get('score', '?:?'), "ah_line": details.get('ahLine', '-'), "localia": 'H' if main == h else 'A', "home_team": details.get('home'), "away_team": details.get('away'), "match_id": details.get('matchIndex')}
     return None
 
@@ -0,0 +1,114 @@
+# parse_pool.py - Parseo de páginas h2h en varios procesos para trabajos por lotes
+# BeautifulSoup/lxml es CPU puro: en hilos se queda bajo el GIL y usa un solo núcleo.
+# Para calentar cachés, backfills o backtests separamos las dos etapas: la descarga va
+# en hilos (E/S) y el parseo completo (estudio_scraper.parse_h2h_page_record) en un
+# pool de procesos del tamaño de la máquina. Cada proceso devuelve un registro
+# compacto; el proceso principal vuelca sus filas al historial de equipos.
+#
+#   python parse_pool.py 2719987 2741673 ...     (sin ids: los próximos de data.json)
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import requests
+
+PARSE_POOL_MAX_WORKERS = os.cpu_count() or 1
+FETCH_MAX_WORKERS = 8
+FETCH_TIMEOUT_SECONDS = 15
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    """Pool de procesos compartido (uno por núcleo). 'spawn': el proceso web tiene hilos."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PARSE_POOL_MAX_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _parse_job(match_id, html):
+    from modules.estudio_scraper import parse_h2h_page_record
+    try:
+        return parse_h2h_page_record(match_id, html)
+    except Exception as e:
+        return {"match_id": str(match_id), "error": f"{type(e).__name__}: {e}"}
+
+
+def parse_pages(pages):
+    """
+    Parsea en el pool {match_id: html (bytes o str)}. Devuelve un generador de
+    registros en orden de finalización.
+    """
+    pool = get_parse_pool()
+    futures = [pool.submit(_parse_job, match_id, html) for match_id, html in pages.items() if html]
+    for future in as_completed(futures):
+        yield future.result()
+
+
+def _fetch_h2h_bytes(match_id):
+    from modules.estudio_scraper import BASE_URL_OF, _get_http_session
+    response = _get_http_session().get(f"{BASE_URL_OF}/match/h2h-{match_id}", timeout=FETCH_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.content  # bytes: lxml detecta la codificación en el proceso hijo
+
+
+def warm_matches(match_ids, feed_history=True, fetch_workers=FETCH_MAX_WORKERS):
+    """
+    Descarga (hilos) y parsea (procesos) las páginas h2h de match_ids. Cada página se
+    manda al pool en cuanto llega, así descarga y parseo se solapan. Devuelve
+    {match_id: registro}; los fallos de descarga quedan como {'error': ...}.
+    """
+    from team_history import get_team_history_index
+    pool = get_parse_pool()
+    history = get_team_history_index() if feed_history else None
+    records = {}
+    parse_futures = []
+    with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as fetchers:
+        fetch_futures = {fetchers.submit(_fetch_h2h_bytes, mid): str(mid) for mid in dict.fromkeys(match_ids)}
+        for future in as_completed(fetch_futures):
+            match_id = fetch_futures[future]
+            try:
+                parse_futures.append(pool.submit(_parse_job, match_id, future.result()))
+            except requests.RequestException as e:
+                records[match_id] = {"match_id": match_id, "error": f"{type(e).__name__}: {e}"}
+    for future in as_completed(parse_futures):
+        record = future.result()
+        if history is not None and record.get("history_rows"):
+            history.ingest_rows(record["history_rows"], record.get("home_id"), record.get("away_id"))
+        records[record["match_id"]] = record
+    if history is not None:
+        history.save(force=True)
+    return records
+
+
+def main(argv=None):
+    match_ids = list(argv if argv is not None else sys.argv[1:])
+    if not match_ids:
+        with open('data.json', 'r', encoding='utf-8') as f:
+            match_ids = [m['id'] for m in json.load(f).get('upcoming_matches', [])]
+    t0 = time.perf_counter()
+    records = warm_matches(match_ids)
+    errors = sum(1 for r in records.values() if 'error' in r)
+    print(f"{len(records)} partidos procesados ({errors} con error) en {time.perf_counter() - t0:.1f}s "
+          f"con {PARSE_POOL_MAX_WORKERS} procesos de parseo.")
+    shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
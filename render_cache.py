@@ -0,0 +1,170 @@
+# render_cache.py - Caché de HTML renderizado
+# index() y resultados() volvían a renderizar index.html con todas las filas en cada
+# visita, aunque el resultado solo cambia cuando cambia data.json, y estudio.html se
+# renderizaba otra vez para los mismos datos. Aquí se guardan:
+#   - páginas completas por (plantilla, sección, versión de data.json, parámetros)
+#   - filas de la tabla de partidos (match_row.html) por su contenido, de modo que una
+#     vista filtrada o una versión nueva de data.json se montan con filas ya hechas y
+#     solo se renderizan las que cambian
+#   - páginas de estudio por un resumen (sha1) de los datos que recibe la plantilla
+# Las dos cachés son LRU con un tope de caracteres, así que la memoria está acotada.
+import datetime
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from flask import render_template
+from markupsafe import Markup
+
+PAGE_CACHE_MAX_CHARS = 8 * 1024 * 1024
+ROW_CACHE_MAX_CHARS = 4 * 1024 * 1024
+# Campos de la entrada que pinta match_row.html (si cambia alguno, es otra fila)
+ROW_FIELDS = ("id", "time", "home_team", "away_team", "score", "handicap", "goal_line")
+
+
+class RenderCache:
+    """LRU de cadenas HTML con un tope de caracteres en total."""
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return html
+
+    def put(self, key, html):
+        if len(html) > self.max_chars:
+            return  # no cabe: se sirve sin guardar
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = html
+            self.size += len(html)
+            while self.size > self.max_chars:
+                _, dropped = self._entries.popitem(last=False)
+                self.size -= len(dropped)
+
+    def get_or_render(self, key, render):
+        html = self.get(key)
+        if html is None:
+            html = render()
+            self.put(key, html)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+page_cache = RenderCache(PAGE_CACHE_MAX_CHARS)
+row_cache = RenderCache(ROW_CACHE_MAX_CHARS)
+
+
+def render_match_rows(page_mode, matches):
+    """Filas <tr> de `matches` (dicts de las listas) montadas desde la caché de filas."""
+    parts = []
+    for match in matches:
+        key = (page_mode,) + tuple(match.get(field) for field in ROW_FIELDS)
+        parts.append(row_cache.get_or_render(
+            key, lambda: render_template('match_row.html', match=match, page_mode=page_mode)
+        ))
+    return Markup(''.join(parts))
+
+
+def render_match_list(template, page_mode, matches, **context):
+    """Renderiza `template` (index.html) con las filas de la tabla ya montadas."""
+    return render_template(
+        template, matches=matches, match_rows=render_match_rows(page_mode, matches), page_mode=page_mode, **context
+    )
+
+
+def cached_list_page(template, section, version, params, render):
+    """
+    Página de una lista para (plantilla, sección, versión de data.json, parámetros de
+    filtro). `render` solo se llama si no estaba guardada.
+    """
+    return page_cache.get_or_render((template, section, version, tuple(params)), render)
+
+
+def _digest_default(value):
+    """
+    Forma JSON exacta de los valores que json no serializa por sí solo. Lo que no se
+    puede representar por su contenido lanza TypeError y la página se sirve sin caché:
+    vars() o repr() de un objeto cualquiera (un DataFrame, p. ej.) no recoge sus datos
+    y dos contenidos distintos acabarían con el mismo resumen.
+    """
+    if isinstance(value, Mapping):
+        return dict(value)
+    if hasattr(value, 'to_rows'):
+        return value.to_rows()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=_digest_text)
+    # pandas / numpy solo se miran si ya están cargados: aquí no se importan
+    pd = sys.modules.get('pandas')
+    if pd is not None:
+        if isinstance(value, pd.Series):
+            value = value.to_frame()
+        if isinstance(value, pd.DataFrame):
+            return {'type': 'DataFrame', **value.to_dict('split')}
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} no se puede resumir por su contenido")
+
+
+def _digest_text(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=_digest_default)
+
+
+def content_digest(data):
+    """sha1 de `data` serializado de forma estable, o None si no se puede serializar."""
+    try:
+        text = _digest_text(data)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _data_only(value):
+    """
+    Quita de los dicts de `value` (o de una lista/tupla de ellos) lo que no son datos: las
+    funciones auxiliares y las claves '_...' que obtener_datos_completos_partido añade
+    para la plantilla. Son código, no contenido, y harían que el resumen fallara siempre.
+    """
+    if isinstance(value, (list, tuple)):
+        return [_data_only(item) for item in value]
+    if isinstance(value, Mapping):
+        return {k: v for k, v in value.items() if not callable(v) and not str(k).startswith('_')}
+    return value
+
+
+def render_cached_content(template, key_data, **context):
+    """
+    render_template(template, **context) guardado por el contenido de `key_data` (lo que
+    determina la página, p. ej. los datos del estudio). Si no se puede resumir, sin caché.
+    """
+    digest = content_digest(_data_only(key_data))
+    if digest is None:
+        return render_template(template, **context)
+    return page_cache.get_or_render((template, digest), lambda: render_template(template, **context))
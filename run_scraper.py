@@ -1,34 +1,277 @@
+import argparse
 import asyncio
+import datetime
 import json
+import os
+import time
 
 # Importamos las funciones de scraping desde el nuevo módulo
-from scraping_logic import get_main_page_matches_async, get_main_page_finished_matches_async
+from scraping_logic import (
+    scrape_upcoming_lists, scrape_finished_lists, upcoming_list_shards, finished_list_shards, FINISHED_EXTRA_DAYS
+)
+
+DATA_FILE = 'data.json'
+
+# --- Modo programado (--programado) ---
+# En vez de refrescar a ciegas cada hora, se planifica a partir de las horas de inicio
+# de upcoming_matches: a menudo cuando hay muchos partidos cerca o uno a punto de
+# empezar, poco en los huecos vacíos, y los resultados justo después del final.
+MIN_INTERVAL_SECONDS = 3 * 60
+MAX_INTERVAL_SECONDS = 60 * 60
+PRE_KICKOFF_MINUTES = 30          # ventana previa al inicio en la que se refresca al mínimo
+DENSE_WINDOW_MINUTES = 90         # ventana para medir cuántos partidos hay "cerca"
+DENSITY_TIERS = ((20, 5 * 60), (5, 10 * 60), (1, 20 * 60))  # (partidos en la ventana, intervalo)
+FULL_TIME_MINUTES = 110           # inicio + 2 partes + descanso + añadido
+FINISHED_RETRY_SECONDS = 5 * 60
+FINISHED_GIVE_UP_MINUTES = 4 * 60  # aplazados / suspendidos: dejamos de esperarlos
+REQUEST_BUDGET_PER_HOUR = 120       # páginas descargadas por hora (cada lista son varios trozos)
+
 
 async def main():
     """
     Función principal que ejecuta ambos scrapers y combina los resultados.
     """
     print("Iniciando el proceso de scraping principal...")
-    
-    # Obtenemos los partidos próximos y los finalizados en paralelo
-    proximos, finalizados = await asyncio.gather(
-        get_main_page_matches_async(limit=500), # Aumentamos el límite para tener más datos
-        get_main_page_finished_matches_async(limit=500)
+
+    # Todos los trozos (días) de ambas listas se descargan en paralelo y sin recortar
+    (proximos, fallidos_prox), (finalizados, fallidos_fin) = await asyncio.gather(
+        scrape_upcoming_lists(),
+        scrape_finished_lists()
     )
-    
+
     print(f"Scraping de listas finalizado. {len(proximos)} partidos próximos y {len(finalizados)} finalizados.")
+    if fallidos_prox or fallidos_fin:
+        print(f"Trozos sin datos: {[p or '/' for p, _ in fallidos_prox + fallidos_fin]}")
+        anteriores = _load_data()
+        proximos = _carry_over_upcoming(anteriores.get("upcoming_matches", []), proximos, fallidos_prox)
+        finalizados = _carry_over_finished(anteriores.get("finished_matches", []), finalizados)
 
     # Creamos un diccionario con todos los datos
     scraped_data = {
         "upcoming_matches": proximos,
         "finished_matches": finalizados
     }
-    
-    # Guardamos los datos en el archivo data.json
-    with open('data.json', 'w', encoding='utf-8') as f:
-        json.dump(scraped_data, f, indent=2, ensure_ascii=False)
-    
+
+    # Guardamos los datos en el archivo data.json (la web puede estar leyéndolo)
+    _save_data_atomic(scraped_data)
+
     print("Archivo data.json guardado correctamente.")
 
+
+def _kickoff_of(match):
+    try:
+        return datetime.datetime.fromisoformat(match['time_obj'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def plan_upcoming_interval(upcoming, now):
+    """Segundos hasta el próximo refresco de la lista de próximos según la densidad de inicios."""
+    kickoffs = [k for k in map(_kickoff_of, upcoming) if k and k >= now]
+    if not kickoffs:
+        return MAX_INTERVAL_SECONDS
+    minutes_to_next = (min(kickoffs) - now).total_seconds() / 60
+    if minutes_to_next <= PRE_KICKOFF_MINUTES:
+        return MIN_INTERVAL_SECONDS
+    nearby = sum(1 for k in kickoffs if (k - now).total_seconds() <= DENSE_WINDOW_MINUTES * 60)
+    for min_matches, interval in DENSITY_TIERS:
+        if nearby >= min_matches:
+            return interval
+    # Hueco vacío: dormimos hasta que se abra la ventana previa del siguiente partido
+    wake_up = (minutes_to_next - PRE_KICKOFF_MINUTES) * 60
+    return int(max(MIN_INTERVAL_SECONDS, min(MAX_INTERVAL_SECONDS, wake_up)))
+
+
+def plan_finished_interval(awaiting_kickoffs, now):
+    """
+    Segundos hasta el próximo refresco de finalizados: justo tras el final previsto del
+    primer partido pendiente, y cada FINISHED_RETRY_SECONDS mientras falte alguno.
+    """
+    full_times = [k + datetime.timedelta(minutes=FULL_TIME_MINUTES) for k in awaiting_kickoffs]
+    if not full_times:
+        return MAX_INTERVAL_SECONDS
+    first = min(full_times)
+    if first <= now:
+        return FINISHED_RETRY_SECONDS
+    return int(max(MIN_INTERVAL_SECONDS, min(MAX_INTERVAL_SECONDS, (first - now).total_seconds())))
+
+
+class RequestBudget:
+    """Cubo de fichas: como mucho `per_hour` páginas por hora, repartidas sin ráfagas largas."""
+
+    def __init__(self, per_hour=REQUEST_BUDGET_PER_HOUR):
+        self.capacity = float(per_hour)
+        self.tokens = float(per_hour)
+        self.rate = per_hour / 3600.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, cost=1):
+        self._refill()
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+    def seconds_until_available(self, cost=1):
+        self._refill()
+        return max(0.0, (cost - self.tokens) / self.rate) if self.rate else float('inf')
+
+
+def _save_data_atomic(data):
+    # La web lee data.json mientras tanto: nunca debe ver un fichero a medio escribir
+    tmp_path = f"{DATA_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, DATA_FILE)
+
+
+def _load_data():
+    try:
+        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"upcoming_matches": [], "finished_matches": []}
+
+
+def _carry_over_finished(previous, finished):
+    """
+    Si falló algún día de resultados no perdemos lo que ya teníamos de él: se añaden
+    los finalizados anteriores (de la ventana de días que se scrapea) que no han vuelto.
+    """
+    cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=FINISHED_EXTRA_DAYS + 1)).isoformat()
+    seen = {str(m['id']) for m in finished}
+    kept = [m for m in previous if str(m['id']) not in seen and m.get('time_obj', '') >= cutoff]
+    return sorted(finished + kept, key=lambda m: m.get('time_obj', ''), reverse=True)
+
+
+def _carry_over_upcoming(previous, upcoming, failed, now=None):
+    """
+    Lo mismo para próximos: de los días cuyo trozo falló se mantienen los partidos
+    anteriores que aún no han empezado; los días que sí llegaron se sustituyen enteros.
+    """
+    if not failed:
+        return upcoming
+    now = now or datetime.datetime.utcnow()
+    # El trozo i de upcoming_list_shards es el día de hoy + i
+    failed_days = {
+        now.date() + datetime.timedelta(days=i) for i, shard in enumerate(upcoming_list_shards(today=now.date()))
+        if shard in failed
+    }
+    seen = {str(m['id']) for m in upcoming}
+    kept = [
+        m for m in previous
+        if str(m['id']) not in seen and (kickoff := _kickoff_of(m)) and kickoff > now and kickoff.date() in failed_days
+    ]
+    return sorted(upcoming + kept, key=lambda m: m.get('time_obj', ''))
+
+
+class ScrapeScheduler:
+    """
+    Bucle de refrescos de data.json. Cada lista (próximos / finalizados) tiene su propia
+    hora de próximo refresco; ambas consumen del mismo RequestBudget.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget or RequestBudget()
+        self.data = _load_data()
+        # Partidos que vimos en próximos y aún no aparecen en finalizados: {id: inicio}
+        self.awaiting = {}
+        self.next_upcoming = datetime.datetime.utcnow()
+        self.next_finished = datetime.datetime.utcnow()
+        self.refreshes_made = 0
+
+    def _track_upcoming(self, upcoming):
+        for m in upcoming:
+            kickoff = _kickoff_of(m)
+            if kickoff:
+                self.awaiting[str(m['id'])] = kickoff
+
+    def _awaiting_kickoffs(self, now):
+        give_up = datetime.timedelta(minutes=FINISHED_GIVE_UP_MINUTES)
+        for mid, kickoff in list(self.awaiting.items()):
+            if now - kickoff > give_up:
+                del self.awaiting[mid]
+        return list(self.awaiting.values())
+
+    async def refresh_upcoming(self):
+        upcoming, failed = await scrape_upcoming_lists(budget=self.budget)
+        self.refreshes_made += 1
+        if upcoming:
+            upcoming = _carry_over_upcoming(self.data.get("upcoming_matches", []), upcoming, failed)
+            self.data["upcoming_matches"] = upcoming
+            self._track_upcoming(upcoming)
+            _save_data_atomic(self.data)
+        return upcoming
+
+    async def refresh_finished(self):
+        finished, failed = await scrape_finished_lists(budget=self.budget)
+        self.refreshes_made += 1
+        if finished:
+            if failed:
+                finished = _carry_over_finished(self.data.get("finished_matches", []), finished)
+            finished_ids = {str(m['id']) for m in finished}
+            self.data["finished_matches"] = finished
+            # Lo que ya terminó sale de próximos sin esperar al siguiente refresco de la lista
+            self.data["upcoming_matches"] = [m for m in self.data.get("upcoming_matches", []) if str(m['id']) not in finished_ids]
+            for mid in finished_ids:
+                self.awaiting.pop(mid, None)
+            _save_data_atomic(self.data)
+        return finished
+
+    async def run(self, max_minutes=None):
+        stop_at = time.monotonic() + max_minutes * 60 if max_minutes else None
+        self._track_upcoming(self.data.get("upcoming_matches", []))
+        # Fichas que cuesta cada refresco: un trozo por día de la lista
+        costs = {"upcoming": len(upcoming_list_shards()), "finished": len(finished_list_shards())}
+        if max(costs.values()) > self.budget.capacity:
+            raise ValueError(f"Un presupuesto de {self.budget.capacity:.0f} páginas/hora no cubre un refresco de {max(costs.values())}.")
+        while stop_at is None or time.monotonic() < stop_at:
+            now = datetime.datetime.utcnow()
+            due = [name for name, at in (("upcoming", self.next_upcoming), ("finished", self.next_finished)) if at <= now]
+            for name in due:
+                # scrape_*_lists cobra la lista entera de una vez: hay que esperar a tenerla
+                wait_s = self.budget.seconds_until_available(costs[name])
+                if wait_s > 0:
+                    print(f"Presupuesto de peticiones agotado; '{name}' espera {wait_s:.0f}s.")
+                    setattr(self, f"next_{name}", now + datetime.timedelta(seconds=wait_s))
+                    continue
+                if name == "upcoming":
+                    matches = await self.refresh_upcoming()
+                    interval = plan_upcoming_interval(self.data.get("upcoming_matches", []), datetime.datetime.utcnow())
+                    self.next_upcoming = datetime.datetime.utcnow() + datetime.timedelta(seconds=interval)
+                else:
+                    matches = await self.refresh_finished()
+                    interval = plan_finished_interval(self._awaiting_kickoffs(datetime.datetime.utcnow()), datetime.datetime.utcnow())
+                    self.next_finished = datetime.datetime.utcnow() + datetime.timedelta(seconds=interval)
+                print(f"[{datetime.datetime.utcnow():%H:%M:%S}] {name}: {len(matches)} partidos; siguiente en {interval // 60} min.")
+            # El plan de finalizados depende de los próximos que acabamos de ver
+            finished_plan = datetime.datetime.utcnow() + datetime.timedelta(
+                seconds=plan_finished_interval(self._awaiting_kickoffs(datetime.datetime.utcnow()), datetime.datetime.utcnow()))
+            self.next_finished = min(self.next_finished, finished_plan)
+            sleep_s = (min(self.next_upcoming, self.next_finished) - datetime.datetime.utcnow()).total_seconds()
+            if stop_at is not None:
+                sleep_s = min(sleep_s, stop_at - time.monotonic())
+            await asyncio.sleep(max(1.0, sleep_s))
+        print(f"Modo programado terminado: {self.refreshes_made} refrescos.")
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scraper de listas de partidos (data.json).")
+    parser.add_argument('--programado', action='store_true',
+                        help="proceso continuo que planifica los refrescos según las horas de inicio")
+    parser.add_argument('--max-minutos', type=float, default=None, help="en modo programado, terminar tras N minutos")
+    parser.add_argument('--presupuesto', type=int, default=REQUEST_BUDGET_PER_HOUR, help="páginas descargadas como máximo por hora")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    args = _parse_args()
+    if args.programado:
+        asyncio.run(ScrapeScheduler(RequestBudget(args.presupuesto)).run(args.max_minutos))
+    else:
+        asyncio.run(main())
@@ -1,17 +1,24 @@
 
 import asyncio
-from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 import datetime
-import re
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import threading
 from app_utils import normalize_handicap_to_half_bucket_str
+from html_patterns import FINAL_SCORE_RE
 
 URL_NOWGOAL = "https://live20.nowgoal25.com/"
 REQUEST_TIMEOUT_SECONDS = 12
+# Listas por "trozos": la portada y los resultados de hoy más páginas por fecha. Si la
+# web cambia el formato de las rutas por fecha, basta con tocar estas plantillas.
+RESULTS_PATH_BY_DATE = 'football/results?date={date:%Y-%m-%d}'
+FIXTURES_PATH_BY_DATE = 'football/fixture?date={date:%Y-%m-%d}'
+UPCOMING_EXTRA_DAYS = 1
+FINISHED_EXTRA_DAYS = 2
+LIST_FETCH_CONCURRENCY = 4
+STREAM_CHUNK_BYTES = 64 * 1024
 _REQUEST_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
@@ -22,7 +29,8 @@ _REQUEST_HEADERS = {
 
 _requests_session = None
 _requests_session_lock = threading.Lock()
-_requests_fetch_lock = threading.Lock()
+# Como mucho LIST_FETCH_CONCURRENCY descargas a la vez contra nowgoal (antes era un Lock)
+_requests_fetch_slots = threading.BoundedSemaphore(LIST_FETCH_CONCURRENCY)
 
 def _build_nowgoal_url(path: str | None = None) -> str:
     if not path:
@@ -47,7 +55,7 @@ def _get_shared_requests_session():
 def _fetch_nowgoal_html_sync(url: str) -> str | None:
     session = _get_shared_requests_session()
     try:
-        with _requests_fetch_lock:
+        with _requests_fetch_slots:
             response = session.get(url, timeout=REQUEST_TIMEOUT_SECONDS)
         response.raise_for_status()
         return response.text
@@ -55,39 +63,8 @@ def _fetch_nowgoal_html_sync(url: str) -> str | None:
         print(f"Error al obtener {url} con requests: {exc}")
         return None
 
-async def _fetch_nowgoal_html(path: str | None = None, filter_state: int | None = None, requests_first: bool = True) -> str | None:
-    target_url = _build_nowgoal_url(path)
-    html_content = None
-
-    if requests_first:
-        try:
-            html_content = await asyncio.to_thread(_fetch_nowgoal_html_sync, target_url)
-        except Exception as exc:
-            print(f"Error asincronico al lanzar la carga con requests ({target_url}): {exc}")
-            html_content = None
-
-    if html_content:
-        return html_content
-
-    try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            try:
-                await page.goto(target_url, wait_until="domcontentloaded", timeout=20000)
-                await page.wait_for_timeout(4000)
-                if filter_state is not None:
-                    try:
-                        await page.evaluate("(state) => { if (typeof HideByState === 'function') { HideByState(state); } }", filter_state)
-                        await page.wait_for_timeout(1500)
-                    except Exception as eval_err:
-                        print(f"Advertencia al aplicar HideByState({filter_state}) en {target_url}: {eval_err}")
-                return await page.content()
-            finally:
-                await browser.close()
-    except Exception as browser_exc:
-        print(f"Error al obtener la pagina con Playwright ({target_url}): {browser_exc}")
-    return None
+def _slice(matches, limit, offset):
+    return matches[offset:] if limit is None else matches[offset:offset + limit]
 
 def parse_main_page_matches(html_content, limit=20, offset=0, handicap_filter=None):
     soup = BeautifulSoup(html_content, 'html.parser')
@@ -142,7 +119,7 @@ def parse_main_page_matches(html_content, limit=20, offset=0, handicap_filter=No
 
     upcoming_matches.sort(key=lambda x: x['time_obj'])
     
-    paginated_matches = upcoming_matches[offset:offset+limit]
+    paginated_matches = _slice(upcoming_matches, limit, offset)
 
     for match in paginated_matches:
         match['time'] = (match['time_obj'] + datetime.timedelta(hours=2)).strftime('%H:%M')
@@ -178,7 +155,7 @@ def parse_main_page_finished_matches(html_content, limit=20, offset=0, handicap_
             else:
                 score_text = score_cell.get_text(strip=True)
 
-        if not re.match(r'^\d+\s*-\s*\d+$', score_text):
+        if not FINAL_SCORE_RE.match(score_text):
             continue
 
         odds_data = row.get('odds', '').split(',')
@@ -221,7 +198,7 @@ def parse_main_page_finished_matches(html_content, limit=20, offset=0, handicap_
 
     finished_matches.sort(key=lambda x: x['time_obj'], reverse=True)
     
-    paginated_matches = finished_matches[offset:offset+limit]
+    paginated_matches = _slice(finished_matches, limit, offset)
 
     for match in paginated_matches:
         match['time'] = (match['time_obj'] + datetime.timedelta(hours=2)).strftime('%d/%m %H:%M')
@@ -229,30 +206,249 @@ def parse_main_page_finished_matches(html_content, limit=20, offset=0, handicap_
 
     return paginated_matches
 
-async def get_main_page_matches_async(limit=20, offset=0, handicap_filter=None):
-    html_content = await _fetch_nowgoal_html(filter_state=3)
-    if not html_content:
-        html_content = await _fetch_nowgoal_html(filter_state=3, requests_first=False)
-        if not html_content:
-            return []
-    matches = parse_main_page_matches(html_content, limit, offset, handicap_filter)
-    if not matches:
-        html_content = await _fetch_nowgoal_html(filter_state=3, requests_first=False)
-        if not html_content:
-            return []
-        matches = parse_main_page_matches(html_content, limit, offset, handicap_filter)
-    return matches
-
-async def get_main_page_finished_matches_async(limit=20, offset=0, handicap_filter=None):
-    html_content = await _fetch_nowgoal_html(path='football/results')
-    if not html_content:
-        html_content = await _fetch_nowgoal_html(path='football/results', requests_first=False)
-        if not html_content:
-            return []
-    matches = parse_main_page_finished_matches(html_content, limit, offset, handicap_filter)
-    if not matches:
-        html_content = await _fetch_nowgoal_html(path='football/results', requests_first=False)
-        if not html_content:
-            return []
-        matches = parse_main_page_finished_matches(html_content, limit, offset, handicap_filter)
-    return matches
+# --- Parseo en streaming ---
+# Las listas se parsean según llegan los trozos de la respuesta: lxml emite cada fila
+# tr1_* al cerrarse, se convierte en dict y se borra del árbol (con las filas de cabecera
+# de liga que la preceden). Así nunca conviven el HTML entero, el árbol completo y las
+# listas de resultados, que es lo que disparaba la memoria en las instancias de 512 MB.
+
+def iter_index_rows(chunks, encoding=None):
+    """Elementos lxml de las filas tr1_* de `chunks` (bytes o str) en orden de documento."""
+    from lxml import etree
+    parser = etree.HTMLPullParser(events=('end',), tag='tr', encoding=encoding)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _drain_index_rows(parser)
+    parser.close()
+    yield from _drain_index_rows(parser)
+
+def _drain_index_rows(parser):
+    for _, elem in parser.read_events():
+        if not (elem.get('id') or '').startswith('tr1_'):
+            continue
+        yield elem
+        # Ya consumida: fuera la fila y todo lo anterior a ella
+        elem.clear()
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+def _element_text(elem, strip_parts=False):
+    if strip_parts:  # equivalente a get_text(strip=True) de BeautifulSoup
+        return ''.join(part.strip() for part in elem.itertext())
+    return ''.join(elem.itertext()).strip()
+
+def _row_teams_and_odds(row, match_id):
+    home_team_tag = row.find(f'.//a[@id="team1_{match_id}"]')
+    away_team_tag = row.find(f'.//a[@id="team2_{match_id}"]')
+    odds_data = (row.get('odds') or '').split(',')
+    return (
+        _element_text(home_team_tag) if home_team_tag is not None else "N/A",
+        _element_text(away_team_tag) if away_team_tag is not None else "N/A",
+        odds_data[2] if len(odds_data) > 2 else "N/A",
+        odds_data[10] if len(odds_data) > 10 else "N/A",
+    )
+
+def _row_kickoff(row):
+    time_cell = row.find('.//td[@name="timeData"]')
+    if time_cell is None or time_cell.get('data-t') is None:
+        return None
+    return datetime.datetime.strptime(time_cell.get('data-t'), '%Y-%m-%d %H:%M:%S')
+
+def _handicap_matcher(handicap_filter):
+    target = normalize_handicap_to_half_bucket_str(handicap_filter) if handicap_filter else None
+    if target is None:
+        return lambda m: True
+    return lambda m: normalize_handicap_to_half_bucket_str(m.get('handicap', '')) == target
+
+def iter_main_page_matches(chunks, encoding=None, handicap_filter=None):
+    """
+    Versión en streaming de parse_main_page_matches: genera los próximos en orden de
+    documento (sin ordenar ni paginar) según se cierra cada fila.
+    """
+    now_utc = datetime.datetime.utcnow()
+    wanted = _handicap_matcher(handicap_filter)
+    for row in iter_index_rows(chunks, encoding):
+        match_id = row.get('id')[len('tr1_'):]
+        if not match_id: continue
+        try:
+            match_time = _row_kickoff(row)
+        except (ValueError, IndexError):
+            continue
+        if match_time is None or match_time < now_utc: continue
+        home_team, away_team, handicap, goal_line = _row_teams_and_odds(row, match_id)
+        if handicap == "N/A":
+            continue
+        match = {
+            "id": match_id,
+            "time_obj": match_time.isoformat(),
+            "home_team": home_team,
+            "away_team": away_team,
+            "handicap": handicap,
+            "goal_line": goal_line,
+            "time": (match_time + datetime.timedelta(hours=2)).strftime('%H:%M'),
+        }
+        if (league_id := row.get('sclassid')):
+            match["league_id"] = league_id  # filtro ?league= de las listas (match_table)
+        if wanted(match):
+            yield match
+
+def iter_main_page_finished_matches(chunks, encoding=None, handicap_filter=None):
+    """Versión en streaming de parse_main_page_finished_matches (sin ordenar ni paginar)."""
+    wanted = _handicap_matcher(handicap_filter)
+    for row in iter_index_rows(chunks, encoding):
+        match_id = row.get('id')[len('tr1_'):]
+        if not match_id: continue
+        state = row.get('state')
+        if state is not None and state != "-1":
+            continue
+        cells = list(row.iter('td'))
+        if len(cells) < 8: continue
+        b_tag = cells[6].find('.//b')
+        score_text = _element_text(b_tag) if b_tag is not None else _element_text(cells[6], strip_parts=True)
+        if not FINAL_SCORE_RE.match(score_text):
+            continue
+        home_team, away_team, handicap, goal_line = _row_teams_and_odds(row, match_id)
+        if handicap == "N/A":
+            continue
+        try:
+            match_time = _row_kickoff(row) or datetime.datetime.now()
+        except (ValueError, IndexError):
+            continue
+        match = {
+            "id": match_id,
+            "time_obj": match_time.isoformat(),
+            "home_team": home_team,
+            "away_team": away_team,
+            "score": score_text,
+            "handicap": handicap,
+            "goal_line": goal_line,
+            "time": (match_time + datetime.timedelta(hours=2)).strftime('%d/%m %H:%M'),
+        }
+        if (league_id := row.get('sclassid')):
+            match["league_id"] = league_id
+        if wanted(match):
+            yield match
+
+def _declared_encoding(response):
+    # Sin charset en la cabecera requests supone ISO-8859-1; mejor que lxml lea el <meta>
+    return response.encoding if 'charset' in response.headers.get('Content-Type', '').lower() else None
+
+def upcoming_list_shards(days_ahead=UPCOMING_EXTRA_DAYS, today=None):
+    """Trozos (ruta, filter_state) de próximos: la portada y los `days_ahead` días siguientes."""
+    today = today or datetime.datetime.utcnow().date()
+    return [(None, 3)] + [
+        (FIXTURES_PATH_BY_DATE.format(date=today + datetime.timedelta(days=i)), 3) for i in range(1, days_ahead + 1)
+    ]
+
+def finished_list_shards(days_back=FINISHED_EXTRA_DAYS, today=None):
+    """Trozos (ruta, filter_state) de finalizados: los resultados de hoy y los `days_back` días anteriores."""
+    today = today or datetime.datetime.utcnow().date()
+    return [('football/results', None)] + [
+        (RESULTS_PATH_BY_DATE.format(date=today - datetime.timedelta(days=i)), None) for i in range(1, days_back + 1)
+    ]
+
+def _fetch_and_parse_shard_sync(path, parse):
+    """Descarga en streaming y parsea a la vez: `parse(trozos, encoding)` -> lista de partidos."""
+    url = _build_nowgoal_url(path)
+    session = _get_shared_requests_session()
+    try:
+        with _requests_fetch_slots:
+            with session.get(url, timeout=REQUEST_TIMEOUT_SECONDS, stream=True) as response:
+                response.raise_for_status()
+                return parse(response.iter_content(STREAM_CHUNK_BYTES), _declared_encoding(response))
+    except Exception as exc:
+        print(f"Error al obtener {url} con requests: {exc}")
+        return []
+
+async def _fetch_shards_with_playwright(shards):
+    """Reintento de los trozos fallidos con un único navegador. Devuelve {trozo: html}."""
+    pages = {}
+    try:
+        from playwright.async_api import async_playwright
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            try:
+                for path, filter_state in shards:
+                    page = await browser.new_page()
+                    try:
+                        await page.goto(_build_nowgoal_url(path), wait_until="domcontentloaded", timeout=20000)
+                        await page.wait_for_timeout(4000)
+                        if filter_state is not None:
+                            await page.evaluate("(state) => { if (typeof HideByState === 'function') { HideByState(state); } }", filter_state)
+                            await page.wait_for_timeout(1500)
+                        pages[(path, filter_state)] = await page.content()
+                    except Exception as page_exc:
+                        print(f"Error al obtener {path or '/'} con Playwright: {page_exc}")
+                    finally:
+                        await page.close()
+            finally:
+                await browser.close()
+    except Exception as browser_exc:
+        print(f"Error al lanzar Playwright para {len(shards)} trozos: {browser_exc}")
+    return pages
+
+async def scrape_list_shards(shards, parse, budget=None):
+    """
+    Descarga y parsea los trozos a la vez (requests en hilos, limitado por
+    _requests_fetch_slots); solo los que fallan o salen vacíos se reintentan con
+    Playwright. `budget` (opcional, con try_acquire(cost)) cobra la lista entera antes
+    de empezar, una ficha por trozo, y otra por cada reintento; si no alcanza no se
+    descarga nada: una lista a medias dejaría fuera días enteros que sí tienen partidos.
+    Devuelve (partidos sin duplicar por id, trozos fallidos o sin ficha).
+    """
+    if budget is not None and not budget.try_acquire(len(shards)):
+        return [], list(shards)
+    results = {}
+    parsed = await asyncio.gather(
+        *(asyncio.to_thread(_fetch_and_parse_shard_sync, path, parse) for path, _ in shards),
+        return_exceptions=True
+    )
+    retry = []
+    for shard, rows in zip(shards, parsed):
+        if isinstance(rows, Exception) or not rows:
+            retry.append(shard)
+        else:
+            results[shard] = rows
+    retry = [shard for shard in retry if budget is None or budget.try_acquire()]
+    if retry:
+        print(f"Reintentando con Playwright {len(retry)} de {len(shards)} trozos: {[p or '/' for p, _ in retry]}")
+        for shard, html_content in (await _fetch_shards_with_playwright(retry)).items():
+            rows = parse([html_content], None)
+            if rows:
+                results[shard] = rows
+    failed = [shard for shard in shards if shard not in results]
+    merged = {}
+    for shard in shards:
+        for match in results.get(shard, []):
+            merged.setdefault(match['id'], match)
+    return list(merged.values()), failed
+
+async def scrape_upcoming_lists(days_ahead=UPCOMING_EXTRA_DAYS, handicap_filter=None, budget=None):
+    """(próximos de todos los trozos ordenados por hora, trozos fallidos)."""
+    matches, failed = await scrape_list_shards(
+        upcoming_list_shards(days_ahead),
+        lambda chunks, encoding: list(iter_main_page_matches(chunks, encoding, handicap_filter)),
+        budget
+    )
+    matches.sort(key=lambda m: m['time_obj'])
+    return matches, failed
+
+async def scrape_finished_lists(days_back=FINISHED_EXTRA_DAYS, handicap_filter=None, budget=None):
+    """(finalizados de todos los trozos, del más reciente al más antiguo, trozos fallidos)."""
+    matches, failed = await scrape_list_shards(
+        finished_list_shards(days_back),
+        lambda chunks, encoding: list(iter_main_page_finished_matches(chunks, encoding, handicap_filter)),
+        budget
+    )
+    matches.sort(key=lambda m: m['time_obj'], reverse=True)
+    return matches, failed
+
+async def get_main_page_matches_async(limit=20, offset=0, handicap_filter=None, days_ahead=UPCOMING_EXTRA_DAYS, budget=None):
+    matches, _ = await scrape_upcoming_lists(days_ahead, handicap_filter, budget)
+    return _slice(matches, limit, offset)
+
+async def get_main_page_finished_matches_async(limit=20, offset=0, handicap_filter=None, days_back=FINISHED_EXTRA_DAYS, budget=None):
+    matches, _ = await scrape_finished_lists(days_back, handicap_filter, budget)
+    return _slice(matches, limit, offset)
@@ -0,0 +1,212 @@
+# team_history.py - Índice persistente del historial reciente de cada equipo
+# Cada página h2h que parseamos trae las últimas filas de los dos equipos (table_v1 /
+# table_v2) y su h2h (table_v3). Las guardamos por equipo, sin duplicados, para que
+# otras consultas (p. ej. el H2H Col3 entre dos rivales) se respondan sin descargar
+# otra página mientras el historial del equipo sea reciente.
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+
+from html_patterns import DATE_DMY_RE, SCORE_RE, TEAM_ID_RE, history_row_re
+
+TEAM_HISTORY_FILE = 'team_history.json'
+HISTORY_FRESH_SECONDS = 6 * 3600
+HISTORY_SAVE_INTERVAL_SECONDS = 60
+MAX_ROWS_PER_TEAM = 60
+
+_TABLE_ROW_IDS = {table_id: history_row_re(table_id) for table_id in ("table_v1", "table_v2", "table_v3")}
+
+
+def _date_key(date_txt):
+    m = DATE_DMY_RE.search(date_txt or '')
+    return (int(m.group(3)), int(m.group(2)), int(m.group(1))) if m else (1900, 1, 1)
+
+
+def parse_history_row(row):
+    """Fila de table_v1/v2/v3 -> registro del índice (None si le faltan equipos, ids o marcador)."""
+    match_id = row.get('index')
+    links = [a for a in row.find_all('a', onclick=True) if TEAM_ID_RE.search(a.get('onclick', ''))]
+    if not match_id or len(links) < 2:
+        return None
+    score_span = row.find('span', class_=lambda c: isinstance(c, str) and c.startswith('fscore'))
+    score_m = SCORE_RE.search(score_span.get_text(strip=True) if score_span else '')
+    if not score_m:
+        return None
+    tds = row.find_all('td')
+    date_span = tds[1].find('span', attrs={'name': 'timeData'}) if len(tds) > 1 else None
+    ah_raw = '-'
+    if len(tds) > 11:
+        ah_raw = (tds[11].get('data-o') or tds[11].get_text(strip=True) or '-').strip()
+    return {
+        'match_id': match_id,
+        'date': date_span.get_text(strip=True) if date_span else '',
+        'home': links[0].get_text(strip=True),
+        'away': links[1].get_text(strip=True),
+        'home_id': TEAM_ID_RE.search(links[0]['onclick']).group(1),
+        'away_id': TEAM_ID_RE.search(links[1]['onclick']).group(1),
+        'score': f"{score_m.group(1)}-{score_m.group(2)}",
+        'ah_raw': ah_raw,
+        'league_id': row.get('name'),
+    }
+
+
+def extract_history_rows(soup):
+    """{table_id: [registros]} de las tablas table_v1/v2/v3 presentes en la página."""
+    rows_by_table = {}
+    for table_id, row_id_re in _TABLE_ROW_IDS.items():
+        table = soup.find('table', id=table_id)
+        if not table:
+            continue
+        rows_by_table[table_id] = [r for r in map(parse_history_row, table.find_all('tr', id=row_id_re)) if r]
+    return rows_by_table
+
+
+def _trim_rows(team):
+    """Deja como mucho MAX_ROWS_PER_TEAM filas, las más recientes."""
+    if len(team['rows']) > MAX_ROWS_PER_TEAM:
+        newest = sorted(team['rows'].values(), key=lambda r: _date_key(r['date']), reverse=True)[:MAX_ROWS_PER_TEAM]
+        team['rows'] = {r['match_id']: r for r in newest}
+
+
+class TeamHistoryIndex:
+    """
+    Historial por equipo (clave: id de equipo) con filas deduplicadas por match_id.
+    'updated_at' solo se marca cuando vemos la tabla propia del equipo (table_v1 del
+    local, table_v2 del visitante): es lo que indica que su historial está al día.
+    """
+
+    def __init__(self, path=TEAM_HISTORY_FILE):
+        self.path = path
+        self._teams = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # un solo guardado a la vez dentro del proceso
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._load()
+
+    def _load(self):
+        self._teams = self._read_disk()
+
+    def _read_disk(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"No se pudo leer el historial de equipos {self.path}: {e}")
+            return {}
+
+    def _merge_locked(self, on_disk):
+        """Incorpora lo que otro proceso haya guardado entretanto; ante el mismo partido gana lo de memoria."""
+        for team_id, disk_team in on_disk.items():
+            team = self._teams.get(team_id)
+            if team is None:
+                self._teams[team_id] = disk_team
+                continue
+            for match_id, record in disk_team.get('rows', {}).items():
+                team['rows'].setdefault(match_id, record)
+            team['updated_at'] = max(team.get('updated_at', 0), disk_team.get('updated_at', 0))
+            _trim_rows(team)
+
+    def save(self, force=False):
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                if not force and time.monotonic() - self._last_save < HISTORY_SAVE_INTERVAL_SECONDS:
+                    return
+            # Varios procesos (workers, scraper) comparten el fichero: se relee justo antes
+            # de sustituirlo para no tirar las filas que otro haya guardado desde nuestra carga
+            on_disk = self._read_disk()
+            with self._lock:
+                self._merge_locked(on_disk)
+                snapshot = json.dumps(self._teams, ensure_ascii=False)
+                self._dirty = False
+                self._last_save = time.monotonic()
+            tmp_path = None
+            try:
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', delete=False,
+                                                 dir=os.path.dirname(os.path.abspath(self.path)),
+                                                 prefix=f"{os.path.basename(self.path)}.", suffix='.tmp') as f:
+                    tmp_path = f.name
+                    f.write(snapshot)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"No se pudo guardar el historial de equipos {self.path}: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def _add_row_locked(self, team_id, name, record):
+        team = self._teams.setdefault(team_id, {'name': name, 'updated_at': 0, 'rows': {}})
+        team['name'] = name or team['name']
+        team['rows'][record['match_id']] = record
+        _trim_rows(team)
+
+    def ingest_h2h_soup(self, soup, home_id=None, away_id=None):
+        """Vuelca las tablas de una página h2h ya parseada. Devuelve cuántas filas se leyeron."""
+        if soup is None:
+            return 0
+        return self.ingest_rows(extract_history_rows(soup), home_id, away_id)
+
+    def ingest_rows(self, rows_by_table, home_id=None, away_id=None):
+        """Igual que ingest_h2h_soup pero con las filas ya extraídas (p. ej. en otro proceso)."""
+        owners = {"table_v1": home_id, "table_v2": away_id, "table_v3": None}
+        now = time.time()
+        count = 0
+        with self._lock:
+            for table_id, records in rows_by_table.items():
+                for record in records:
+                    self._add_row_locked(record['home_id'], record['home'], record)
+                    self._add_row_locked(record['away_id'], record['away'], record)
+                    count += 1
+                owner = owners.get(table_id)
+                if owner and str(owner) in self._teams:
+                    self._teams[str(owner)]['updated_at'] = now
+            self._dirty = self._dirty or count > 0
+        self.save()
+        return count
+
+    def is_fresh(self, team_id, max_age=HISTORY_FRESH_SECONDS):
+        team = self._teams.get(str(team_id))
+        return bool(team) and time.time() - team.get('updated_at', 0) <= max_age
+
+    def recent_matches(self, team_id, league_id=None, limit=None):
+        """Filas del equipo, de la más reciente a la más antigua."""
+        with self._lock:
+            team = self._teams.get(str(team_id))
+            rows = list(team['rows'].values()) if team else []
+        if league_id:
+            rows = [r for r in rows if r.get('league_id') == str(league_id)]
+        rows.sort(key=lambda r: _date_key(r['date']), reverse=True)
+        return rows[:limit] if limit else rows
+
+    def all_rows(self):
+        """Todas las filas del índice sin duplicar (cada partido aparece en dos equipos)."""
+        with self._lock:
+            return list({row['match_id']: row for team in self._teams.values() for row in team['rows'].values()}.values())
+
+    def find_match_between(self, team_id, opponent_id):
+        """Último partido entre los dos equipos según el historial de team_id (o None)."""
+        opponent_id = str(opponent_id)
+        for row in self.recent_matches(team_id):
+            if opponent_id in (row['home_id'], row['away_id']):
+                return row
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_team_history_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TeamHistoryIndex()
+                atexit.register(_index.save, True)
+    return _index
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+bs4 = pytest.importorskip("bs4")
+
+import html_patterns as pat
+from h2h_fragments import h2h_fragment_spans, parse_h2h_fragments
+
+H2H_FIXTURE = Path(__file__).resolve().parent / "muestra_sin_fallos" / "html_extraer" / "analisis.txt"
+# Lo que leen los scrapers de la página h2h (modules/estudio_scraper.py y el resto de modules/)
+TARGETS = (
+    ("table", {"id": "table_v1"}), ("table", {"id": "table_v2"}),
+    ("div", {"id": "porletP4"}), ("div", {"id": "mScore"}),
+    ("tr", {"name": "earlyOdds"}),
+)
+
+
+@pytest.fixture(scope="module")
+def h2h_html():
+    return H2H_FIXTURE.read_text(encoding="utf-8")
+
+
+@pytest.fixture(scope="module")
+def soups(h2h_html):
+    return bs4.BeautifulSoup(h2h_html, "lxml"), parse_h2h_fragments(h2h_html)
+
+
+def test_fragments_match_full_parse(soups):
+    full, frag = soups
+    for name, attrs in TARGETS:
+        expected = [str(tag) for tag in full.find_all(name, attrs=attrs)]
+        assert expected and [str(tag) for tag in frag.find_all(name, attrs=attrs)] == expected, (name, attrs)
+    for table_id, pattern in (("table_v1", pat.HOME_ROW_RE), ("table_v2", pat.AWAY_ROW_RE)):
+        assert len(frag.find("table", id=table_id).find_all("tr", id=pattern)) == 20
+    assert frag.select_one("tr#tr_o_1_8[name='earlyOdds'], tr#tr_o_1_31[name='earlyOdds']")["id"] == "tr_o_1_8"
+    script = frag.find("script", string=pat.MATCH_INFO_RE)
+    assert script.string == full.find("script", string=pat.MATCH_INFO_RE).string
+
+
+def test_fragments_skip_the_rest_of_the_page(h2h_html, soups):
+    full, frag = soups
+    kept = sum(end - start for start, end, _ in h2h_fragment_spans(h2h_html))
+    assert kept < len(h2h_html)
+    # Solo quedan el de _matchInfo y los que van dentro de las tablas de historial
+    assert len(frag.find_all("script")) < len(full.find_all("script"))
+    assert frag.find("div", id="porletP4").find_parent("div") is None
+
+
+def test_nested_tables_and_comparison_panels():
+    html = """<html><body><div class="nav"><table><tr><td>menú</td></tr></table></div>
+    <table id="table_v3"><tr id="tr3_1"><td><table><tr><td>interna</td></tr></table></td></tr></table>
+    <script>var x = '<table id="table_v3">';</script>
+    <div class="football-history-list"><div class="content"><div class="title">A</div></div>
+    <div class="content"><div class="title">B</div></div></div>
+    <div class="footer">pie</div></body></html>"""
+    soup = parse_h2h_fragments(html.encode("utf-8"))
+    assert soup.find("table", id="table_v3").find("tr", id=pat.H2H_ROW_RE).get_text(strip=True) == "interna"
+    titles = [box.find("div", class_="title").get_text() for box in soup.select("div.football-history-list > div.content")]
+    assert titles == ["A", "B"]
+    assert soup.find("div", class_="nav") is None and soup.find("div", class_="footer") is None
+
+
+def test_page_without_fragments_is_parsed_whole():
+    soup = parse_h2h_fragments("<html><body><p>Access denied</p></body></html>")
+    assert soup.find("p").get_text() == "Access denied"
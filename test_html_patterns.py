@@ -0,0 +1,138 @@
+import re
+from pathlib import Path
+
+import pytest
+
+import html_patterns as pat
+
+ROOT = Path(__file__).resolve().parent
+# Página h2h real guardada (Singapore U23 - Bangladesh U23, partido 2789604)
+H2H_FIXTURE = ROOT / "muestra_sin_fallos" / "html_extraer" / "analisis.txt"
+# Módulos que parsean HTML de nowgoal y deben usar el registro
+SCRAPING_MODULES = (
+    "modules/estudio_scraper.py", "scraping_logic.py", "team_history.py", "live_tracker.py",
+    "muestra_sin_fallos/app.py", "modules/utils.py",
+    "modules/analisis_reciente.py", "modules/funciones_resumen.py",
+    "modules/nombres_equipos.py", "modules/analisis_rivales.py",
+    "modules/analisis_avanzado.py", "modules/funciones_auxiliares.py",
+)
+# re.compile(...)/re.search(...) dentro de una función (línea sangrada) = patrón sin registrar
+INLINE_RE_CALL = re.compile(r"^[ \t]+.*\bre\.(?:compile|search|match|fullmatch|findall|finditer|split|sub)\(", re.M)
+
+# Fragmentos que la página guardada no trae (tabla H2H, paneles de comparativas, listas)
+H2H_ROWS_HTML = """
+<table id="table_v3">
+  <tr id="tr3_1" index="2501" vs="1"><td>09-03-2024</td>
+    <td><a onclick="soccerDbPage.team(5144)">Singapore U23</a></td>
+    <td><span class="fscore_3">2-1</span></td>
+    <td><a onclick="soccerDbPage.team(5126)">Bangladesh U23</a></td></tr>
+  <tr id="tr3_2" index="2502"><td>15-08-2023</td></tr>
+  <tr id="tr33_x"><td>no es una fila</td></tr>
+</table>
+"""
+COMPARISON_HTML = """
+<div class="content"><div class="title">A vs. Últ. Rival de B</div>
+  <p>Res : <span>0 : 1</span></p><p>AH: <span>0.5</span></p><p>Localía de A: <span>H</span></p>
+</div>
+"""
+
+
+@pytest.fixture(scope="module")
+def h2h_html():
+    return H2H_FIXTURE.read_text(encoding="utf-8")
+
+
+@pytest.fixture(scope="module")
+def h2h_soup(h2h_html):
+    bs4 = pytest.importorskip("bs4")
+    return bs4.BeautifulSoup(h2h_html, "lxml")
+
+
+def test_history_row_patterns_match_fixture_tables(h2h_soup, h2h_html):
+    for table_id, pattern in (("table_v1", pat.HOME_ROW_RE), ("table_v2", pat.AWAY_ROW_RE)):
+        rows = h2h_soup.find("table", id=table_id).find_all("tr", id=pattern)
+        n = table_id[-1]
+        assert len(rows) == h2h_html.count(f'id="tr{n}_') == 20
+        assert pat.history_row_re(table_id) is pattern
+
+
+def test_history_row_patterns_are_not_double_escaped():
+    # r"tr1_\\d+" buscaba la barra literal y las vistas previas no veían ninguna fila
+    assert pat.HOME_ROW_RE.search("tr1_123") and pat.AWAY_ROW_RE.search("tr2_9")
+    assert not pat.HOME_ROW_RE.search("tr1_\\d")
+    for module in SCRAPING_MODULES:
+        source = (ROOT / module).read_text(encoding="utf-8")
+        assert "_\\\\d+" not in source, module
+
+
+def test_scraping_modules_use_the_registry():
+    for module in SCRAPING_MODULES:
+        source = (ROOT / module).read_text(encoding="utf-8")
+        assert not INLINE_RE_CALL.search(source), (module, INLINE_RE_CALL.search(source).group(0).strip())
+
+
+def test_h2h_rows_and_team_ids_in_fragment():
+    bs4 = pytest.importorskip("bs4")
+    table = bs4.BeautifulSoup(H2H_ROWS_HTML, "lxml").find("table", id="table_v3")
+    rows = table.find_all("tr", id=pat.H2H_ROW_RE)
+    assert [r["id"] for r in rows] == ["tr3_1", "tr3_2"]
+    ids = [pat.TEAM_ID_RE.search(a["onclick"]).group(1) for a in rows[0].find_all("a", onclick=True)]
+    assert ids == ["5144", "5126"]
+    assert pat.SCORE_RE.search(rows[0].find("span", class_="fscore_3").get_text()).groups() == ("2", "1")
+
+
+def test_team_ids_in_fixture_rows(h2h_soup):
+    row = h2h_soup.find("tr", id=pat.HOME_ROW_RE)
+    links = row.find_all("a", onclick=pat.TEAM_ID_RE)
+    assert [pat.TEAM_ID_RE.search(a["onclick"]).group(1) for a in links] == ["5144", "5190"]
+    assert pat.SCORE_RE.search(row.find("span", class_="fscore_1").get_text()).groups() == ("0", "1")
+    assert pat.DATE_DMY_RE.search(row.get_text()).groups() == ("06", "09", "2025")
+
+
+def test_match_info_script_fields(h2h_soup):
+    scripts = h2h_soup.find_all("script", string=pat.MATCH_INFO_RE)
+    assert len(scripts) == 1
+    content = scripts[0].string
+    assert pat.search_group(pat.MATCH_INFO_HOME_ID_RE, content) == "5144"
+    assert pat.search_group(pat.MATCH_INFO_AWAY_ID_RE, content) == "5126"
+    assert pat.search_group(pat.MATCH_INFO_LEAGUE_ID_RE, content) == "1385"
+    assert pat.search_group(pat.MATCH_INFO_HOME_NAME_RE, content) == "Singapore U23"
+    assert pat.search_group(pat.MATCH_INFO_AWAY_NAME_RE, content) == "Bangladesh U23"
+    assert pat.search_group(pat.MATCH_INFO_LEAGUE_NAME_RE, content) == "AFC U23 Asian Cup"
+    assert pat.search_group(pat.MATCH_INFO_TIME_RE, content) == "9/9/2025 5:00:00 PM"
+    assert pat.search_group(pat.START_DATE_RE, content) == "2025-09-09"
+    door_time = pat.search_group(pat.DOOR_TIME_RE, content)
+    assert door_time == "09:00:00.000+08:00"
+    assert pat.CLOCK_RE.match(door_time).groups() == ("09", "00")
+
+
+def test_over_under_totals_in_fixture(h2h_html):
+    assert pat.OU_TOTAL_GAMES_RE.findall(h2h_html) == ["9"] * 4
+
+
+def test_comparison_panel_labels():
+    bs4 = pytest.importorskip("bs4")
+    box = bs4.BeautifulSoup(COMPARISON_HTML, "lxml")
+    assert box.find(string=pat.COMPARISON_RES_RE).find_next("span").get_text() == "0 : 1"
+    assert box.find(string=pat.COMPARISON_AH_RE).find_next("span").get_text() == "0.5"
+    assert box.find(string=pat.COMPARISON_LOCALIA_RE).find_next("span").get_text() == "H"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("[AFC U23-3]", "3"), ("Singapore U23 [SIN D1-12]", "12"), ("Singapore U23", None),
+])
+def test_standings_rank(text, expected):
+    assert pat.search_group(pat.STANDINGS_RANK_RE, text) == expected
+
+
+@pytest.mark.parametrize("text, ok", [("2 - 1", True), ("10-0", True), ("2-1(1-0)", False), ("", False), ("Postp.", False)])
+def test_final_score_of_list_rows(text, ok):
+    assert bool(pat.FINAL_SCORE_RE.match(text)) is ok
+
+
+def test_small_patterns():
+    assert pat.SCORE_SPLIT_RE.split("2:1") == ["2", "1"] == pat.SCORE_SPLIT_RE.split("2-1")
+    assert pat.LIVE_ROW_ID_RE.match("tr1_2789604").group(1) == "2789604"
+    assert not pat.LIVE_ROW_ID_RE.match("tr2_2789604")
+    assert pat.SIGNED_NUMBER_RE.search("-0.75") and not pat.SIGNED_NUMBER_RE.search("0/0.5")
+    assert pat.history_row_re("table_v9").search("tr9_1")
@@ -0,0 +1,68 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+# Presupuesto de importación para un worker que solo sirve "/" y "/api/matches".
+IMPORT_BUDGET_SECONDS = 1.5
+HEAVY_MODULES = ("selenium", "pandas", "playwright", "bs4", "requests",
+                 "modules.estudio_scraper", "modules.analisis_rivales")
+# La interfaz la sirve muestra_sin_fallos/app.py (es la que lanza EMPEZAR_AQUI.bat)
+MUESTRA_DIR = Path(__file__).resolve().parent / "muestra_sin_fallos"
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+elapsed = time.perf_counter() - t0
+print(json.dumps({"elapsed": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def _launcher_env():
+    # EMPEZAR_AQUI.bat lanza `py muestra_sin_fallos\app.py`: sys.path[0] es esa carpeta y
+    # la raíz del proyecto no está; la app tiene que encontrar sola los módulos compartidos.
+    return {k: v for k, v in os.environ.items() if k != "PYTHONPATH"}
+
+
+def _probe_app_import():
+    # Intérprete limpio: sys.modules de pytest ya tiene medio mundo cargado
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=MUESTRA_DIR, env=_launcher_env(),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_app_import_does_not_load_heavy_modules():
+    result = _probe_app_import()
+    assert result["loaded"] == []
+
+
+def test_app_import_within_budget():
+    result = _probe_app_import()
+    assert result["elapsed"] < IMPORT_BUDGET_SECONDS, f"import app tardó {result['elapsed']:.2f}s"
+
+
+# Rutas /api/... que pide el JavaScript de index.html (fetch, EventSource)
+TEMPLATE_API_RE = re.compile(r"""['"`](/api/[^'"`?$]*)""")
+
+
+def _muestra_app_rules():
+    out = subprocess.run(
+        [sys.executable, "-c", "import app, json; print(json.dumps([r.rule for r in app.app.url_map.iter_rules()]))"],
+        cwd=MUESTRA_DIR, capture_output=True, text=True, env=_launcher_env(),
+    )
+    assert out.returncode == 0, out.stderr
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_muestra_app_imports_like_the_launcher():
+    rules = _muestra_app_rules()
+    # La interfaz la sirve esta app: lo que pide index.html tiene que estar en ella
+    template = (MUESTRA_DIR / "templates" / "index.html").read_text(encoding="utf-8")
+    for url in set(TEMPLATE_API_RE.findall(template)):
+        assert any(rule == url or (url.endswith("/") and rule.startswith(url)) for rule in rules), url
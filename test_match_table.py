@@ -0,0 +1,22 @@
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("lxml")
+
+from match_table import get_match_table
+from scraping_logic import iter_main_page_finished_matches
+
+RESULTS_FIXTURE = Path(__file__).resolve().parent / "muestra_sin_fallos" / "html_extraer" / "resultados.txt"
+
+
+def test_league_filter_uses_the_scraped_league_ids(tmp_path):
+    finished = list(iter_main_page_finished_matches([RESULTS_FIXTURE.read_bytes()]))
+    assert finished and all(m.get("league_id") for m in finished)
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps({"upcoming_matches": [], "finished_matches": finished}), encoding="utf-8")
+    table = get_match_table("finished_matches", str(path))
+    for league in {finished[0]["league_id"], finished[-1]["league_id"]}:
+        rows = [table.records[i].id for i in table.filter(leagues=[league]).nonzero()[0]]
+        assert rows == [m["id"] for m in finished if m["league_id"] == league]
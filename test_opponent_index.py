@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+bs4 = pytest.importorskip("bs4")
+
+import html_patterns as pat
+from modules.analisis_rivales import analizar_contra_rival_del_rival, analizar_rivales_comunes
+from modules.estudio_scraper import extract_standings_data_from_h2h_page_of
+from modules.nombres_equipos import normalize_team_name, same_team
+from modules.utils import OpponentIndex, build_opponent_indexes
+
+# Variantes que una búsqueda por subcadena o por .lower() confundía o separaba
+TEAMS = (
+    "FC Tokyo", "FC Tokyo U23", "fc tokyo", "[JPN D1-3]FC Tokyo", "Atlético Madrid", "Atletico Madrid",
+    "Real Madrid", "Real Madrid B", "Singapore U23", "Bangladesh U23", "Vietnam U23", "?",
+)
+PAGES = 120
+
+
+def _row(n, i, home, away, rng):
+    cells = ["<td></td>"] * 12
+    cells[1] = f'<td><span name="timeData">{rng.randint(1, 28):02d}-09-2025</span></td>'
+    cells[2] = f'<td><a onclick="team({TEAMS.index(home) + 1})">{home}</a></td>'
+    cells[3] = f'<td><span class="fscore_{n}">{rng.randint(0, 4)}-{rng.randint(0, 4)}</span></td>'
+    cells[4] = f'<td><a onclick="team({TEAMS.index(away) + 1})">{away}</a></td>'
+    cells[11] = f'<td data-o="{rng.choice(("0", "0.5", "-0.25", "1/1.5"))}"></td>'
+    return f'<tr id="tr{n}_{i}" index="{n}{i:04d}">{"".join(cells)}</tr>'
+
+
+def _page(rng):
+    tables = []
+    for n in (1, 2):
+        rows = [_row(n, i, *rng.sample(TEAMS, 2), rng) for i in range(rng.randint(0, 20))]
+        tables.append(f'<table id="table_v{n}">{"".join(rows)}</table>')
+    return bs4.BeautifulSoup(f"<html><body>{''.join(tables)}</body></html>", "lxml")
+
+
+@pytest.fixture(scope="module")
+def pages():
+    rng = random.Random(2025)
+    return [_page(rng) for _ in range(PAGES)]
+
+
+def test_lookups_match_a_row_scan(pages):
+    for soup in pages:
+        for index in build_opponent_indexes(soup):
+            for team in TEAMS:
+                if not normalize_team_name(team):
+                    # '?' no es un equipo: nunca tiene filas
+                    assert not OpponentIndex.rows_for(index.raw_by_team, team)
+                    continue
+                assert list(OpponentIndex.rows_for(index.details_by_home, team)) == [
+                    e for e in index.details_rows if same_team(e[0]["home"], team)]
+                assert list(OpponentIndex.rows_for(index.details_by_away, team)) == [
+                    e for e in index.details_rows if same_team(e[0]["away"], team)]
+                assert list(OpponentIndex.rows_for(index.raw_by_team, team)) == [
+                    r for r in index.raw_rows if same_team(r["home"], team) or same_team(r["away"], team)]
+
+
+def _reference_common_rivals(soup, team_a, team_b):
+    rows_a = soup.find("table", id="table_v1").find_all("tr", id=pat.HOME_ROW_RE)
+    rows_b = soup.find("table", id="table_v2").find_all("tr", id=pat.AWAY_ROW_RE)
+    names = lambda row: (row.find_all("td")[2].get_text(strip=True), row.find_all("td")[4].get_text(strip=True))
+    rivals_a = {normalize_team_name(away) for home, away in map(names, rows_a) if same_team(home, team_a)}
+    rivals_b = {normalize_team_name(home) for home, away in map(names, rows_b) if same_team(away, team_b)}
+    return rivals_a & rivals_b
+
+
+def test_common_rivals_match_a_row_scan(pages):
+    rng = random.Random(7)
+    for soup in pages:
+        team_a, team_b = rng.sample(TEAMS[:-1], 2)
+        result = analizar_rivales_comunes(soup, team_a, team_b)
+        # Se devuelven los nombres de la tabla en minúsculas, uno por rival
+        shown = {td.get_text(strip=True).lower() for td in soup.select("#table_v1 td")}
+        assert set(result["common_rivals"]) <= shown
+        assert {normalize_team_name(n) for n in result["common_rivals"]} == _reference_common_rivals(soup, team_a, team_b)
+        assert len(result["common_rivals"]) == result["common_rivals_count"]
+
+
+def test_rival_of_rival_matches_a_row_scan(pages):
+    rng = random.Random(11)
+    for soup in pages:
+        team_a, team_b, rival_a, rival_b = rng.sample(TEAMS[:-1], 4)
+        result = analizar_contra_rival_del_rival(soup, team_a, team_b, rival_a, rival_b)
+        index_a, _ = build_opponent_indexes(soup)
+        expected = [
+            d["date"] for d, _, _ in index_a.details_rows
+            if (same_team(d["home"], team_a) and same_team(d["away"], rival_b))
+            or (same_team(d["away"], team_a) and same_team(d["home"], rival_b))
+        ]
+        assert [m["date"] for m in result["matches_a_vs_rival_b_rival"]] == expected
+
+
+def test_team_is_not_matched_by_substring(pages):
+    soup = bs4.BeautifulSoup(
+        '<table id="table_v1">' + _row(1, 1, "FC Tokyo U23", "Real Madrid", random.Random(1))
+        + _row(1, 2, "[JPN D1-3]FC Tokyo", "Atlético Madrid", random.Random(2)) + "</table>", "lxml")
+    index = OpponentIndex(soup.find("table", id="table_v1"), pat.HOME_ROW_RE, "fscore_1")
+    assert [d["away"] for d, _, _ in OpponentIndex.rows_for(index.details_by_home, "FC Tokyo")] == ["Atlético Madrid"]
+    assert [r["home"] for r in OpponentIndex.rows_for(index.raw_by_away, "Atletico Madrid")] == ["[JPN D1-3]FC Tokyo"]
+
+
+def test_standings_table_is_chosen_by_team_name():
+    table = '<div class="{0}-div"><table class="team-table-{0}"><tr><td><a>[JPN D1-{1}]{2}</a></td></tr></table></div>'
+    soup = bs4.BeautifulSoup('<div id="porletP4">' + table.format("home", 3, "FC Tokyo U23")
+                             + table.format("guest", 7, "FC Tokyo") + "</div>", "lxml")
+    data = extract_standings_data_from_h2h_page_of(soup, "FC Tokyo")
+    assert (data["ranking"], data["specific_type"]) == ("7", "Est. como Visitante (en Liga)")
+    assert extract_standings_data_from_h2h_page_of(soup, "Tokyo")["ranking"] == "N/A"
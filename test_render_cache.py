@@ -0,0 +1,79 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from render_cache import content_digest, page_cache, render_cached_content
+
+pd = pytest.importorskip("pandas")
+
+
+def _stats_frame(rng):
+    return pd.DataFrame(
+        {"Casa": [rng.randint(0, 9) for _ in range(3)], "Fuera": [rng.randint(0, 9) for _ in range(3)]},
+        index=["Shots", "Shots on Goal", "Attacks"],
+    )
+
+
+def test_dataframes_are_digested_by_content():
+    rng = random.Random(48)
+    frames = [_stats_frame(rng) for _ in range(200)]
+    contents = {frame.to_json(orient="split") for frame in frames}
+    digests = {content_digest({"stats": frame}) for frame in frames}
+    assert None not in digests and len(digests) == len(contents)
+    same = _stats_frame(random.Random(1))
+    assert content_digest({"stats": same}) == content_digest({"stats": same.copy()})
+    assert content_digest({"stats": same}) != content_digest({"stats": same.rename(index={"Attacks": "Corners"})})
+
+
+def test_values_without_exact_form_are_not_cached():
+    class Opaque:
+        def __init__(self, value):
+            self.value = value
+
+    assert content_digest({"x": Opaque(1)}) is None
+    assert content_digest({"x": pd.NA}) is None
+    assert content_digest({"s": {3, "a", 1}}) == content_digest({"s": {1, "a", 3}})
+
+
+def _datos_estudio(final_score):
+    # Misma forma que devuelve obtener_datos_completos_partido, funciones auxiliares incluidas
+    from modules import funciones_auxiliares as aux
+    from modules.estudio_scraper import MatchProgressionStats, StatRow
+    stats = MatchProgressionStats([StatRow("Shots", "5", "3"), StatRow("Corners", "2", "4")])
+    h2h = {"res1": "1:0", "ah1": "0.5", "ou_result1": "O", "res6": "?:?"}
+    last_home = {"score": "2:1", "home_team": "A", "away_team": "X", "date": "01-09-2025",
+                 "handicap_line_raw": "0.5", "ouLine": "2.5", "match_id": "9"}
+    datos = {
+        "match_id": "123", "partial": False, "final_score": final_score,
+        "home_name": "A", "away_name": "B", "league_name": "L", "match_date": "2025-09-02", "match_time": "20:00",
+        "home_standings": {"ranking": "N/A"}, "away_standings": {"ranking": "N/A"},
+        "home_ou_stats": {"total": 0}, "away_ou_stats": {"total": 0},
+        "main_match_odds_data": {"ah_linea_raw": "0.5"}, "h2h_data": h2h,
+        "main_match_odds": {"ah_linea": "0.5", "goals_linea": "2.5"}, "market_analysis_html": "<p>mercado</p>",
+        "last_home_match": {"details": last_home, "stats": stats}, "last_away_match": {"details": None, "stats": None},
+        "h2h_col3": {"details": {"status": "not_found"}, "stats": None},
+        "comp_L_vs_UV_A": {"details": None, "stats": None}, "comp_V_vs_UL_H": {"details": None, "stats": None},
+        "h2h_stadium": {"details": h2h, "stats": stats}, "h2h_general": {"details": h2h, "stats": None},
+        "advanced_analysis_html": "", "rivales_comunes": {"common_rivals": ["c"], "matches": []},
+    }
+    for name in ("_calcular_estadisticas_contra_rival", "_analizar_over_under", "_analizar_ah_cubierto",
+                 "_analizar_desempeno_casa_fuera", "_contar_victorias_h2h", "_analizar_over_under_h2h",
+                 "_contar_over_h2h", "_contar_victorias_h2h_general"):
+        datos[name] = getattr(aux, name)
+    return datos
+
+
+def test_study_data_with_helper_functions_is_cached():
+    flask = pytest.importorskip("flask")
+    app = flask.Flask(__name__, template_folder=str(Path(__file__).resolve().parent / "muestra_sin_fallos" / "templates"))
+    page_cache.clear()
+    hits, misses = page_cache.hits, page_cache.misses
+    with app.app_context():
+        pages = []
+        for final_score in ("1:1", "1:1", "2:0"):
+            datos = _datos_estudio(final_score)
+            pages.append(render_cached_content("estudio.html", datos, data=datos, format_ah=str))
+    # La segunda petición con los mismos datos sale de la caché; otro marcador es otra página
+    assert (page_cache.hits - hits, page_cache.misses - misses) == (1, 2)
+    assert pages[0] == pages[1] != pages[2]
@@ -0,0 +1,67 @@
+import asyncio
+import datetime
+
+import run_scraper
+import scraping_logic
+from run_scraper import RequestBudget, ScrapeScheduler, _carry_over_upcoming
+
+NOW = datetime.datetime(2025, 9, 9, 12, 0)
+
+
+def _match(mid, day, hour):
+    kickoff = datetime.datetime.combine(NOW.date() + datetime.timedelta(days=day), datetime.time(hour))
+    return {'id': mid, 'time_obj': kickoff.isoformat()}
+
+
+def test_list_is_not_fetched_without_budget_for_every_shard(monkeypatch):
+    fetched = []
+    monkeypatch.setattr(scraping_logic, "_fetch_and_parse_shard_sync", lambda path, parse: fetched.append(path) or [])
+    shards = [(None, 3), ('a', 3), ('b', 3)]
+    budget = RequestBudget(per_hour=2)
+    matches, failed = asyncio.run(scraping_logic.scrape_list_shards(shards, None, budget))
+    assert (matches, failed, fetched) == ([], shards, [])
+    assert budget.tokens > 1.9  # no se cobró nada
+
+
+def test_failed_days_keep_previous_upcoming_rows():
+    shards = scraping_logic.upcoming_list_shards(today=NOW.date())
+    previous = [_match(1, 0, 10), _match(2, 0, 18), _match(3, 1, 15), _match(4, 1, 20)]
+    # Hoy llegó (sin el 2, que se ha aplazado); mañana falló
+    fresh = [_match(5, 0, 19)]
+    merged = _carry_over_upcoming(previous, fresh, shards[1:], now=NOW)
+    assert [m['id'] for m in merged] == [5, 3, 4]
+    assert _carry_over_upcoming(previous, fresh, [], now=NOW) == fresh
+
+
+def test_refresh_upcoming_does_not_drop_unscraped_days(monkeypatch, tmp_path):
+    monkeypatch.setattr(run_scraper, "DATA_FILE", str(tmp_path / "data.json"))
+    tomorrow = datetime.datetime.utcnow().replace(microsecond=0) + datetime.timedelta(days=1)
+    kept = {'id': 7, 'time_obj': tomorrow.isoformat()}
+    fresh = {'id': 8, 'time_obj': (tomorrow - datetime.timedelta(days=1, minutes=-30)).isoformat()}
+
+    async def partial(budget=None):
+        return [fresh], scraping_logic.upcoming_list_shards()[1:]
+
+    monkeypatch.setattr(run_scraper, "scrape_upcoming_lists", partial)
+    scheduler = ScrapeScheduler(RequestBudget())
+    scheduler.data = {"upcoming_matches": [kept], "finished_matches": []}
+    asyncio.run(scheduler.refresh_upcoming())
+    assert [m['id'] for m in scheduler.data["upcoming_matches"]] == [8, 7]
+
+
+def test_main_replaces_data_file_atomically(monkeypatch, tmp_path):
+    data_file = tmp_path / "data.json"
+    monkeypatch.setattr(run_scraper, "DATA_FILE", str(data_file))
+    replaced = []
+    real_replace = run_scraper.os.replace
+    monkeypatch.setattr(run_scraper.os, "replace", lambda src, dst: replaced.append(dst) or real_replace(src, dst))
+
+    async def lists(budget=None):
+        return [{'id': 1, 'time_obj': '2025-09-01T12:00:00'}], []
+
+    monkeypatch.setattr(run_scraper, "scrape_upcoming_lists", lists)
+    monkeypatch.setattr(run_scraper, "scrape_finished_lists", lists)
+    asyncio.run(run_scraper.main())
+    # Se escribe aparte y se sustituye de una vez: la web nunca lee un data.json a medias
+    assert replaced == [str(data_file)]
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
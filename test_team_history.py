@@ -0,0 +1,28 @@
+import json
+
+from team_history import TeamHistoryIndex
+
+
+def _record(match_id, home_id, away_id):
+    return {
+        'match_id': match_id, 'date': '01-09-2025', 'home': f'Equipo {home_id}', 'away': f'Equipo {away_id}',
+        'home_id': home_id, 'away_id': away_id, 'score': '1-0', 'ah_raw': '0', 'league_id': '1',
+    }
+
+
+def test_saves_from_separate_writers_keep_each_others_rows(tmp_path):
+    path = str(tmp_path / "team_history.json")
+    # Dos procesos que cargaron el fichero vacío e ingieren partidos distintos
+    writers = [TeamHistoryIndex(path) for _ in range(2)]
+    writers[0].ingest_rows({"table_v1": [_record("100", "1", "2")]})
+    writers[1].ingest_rows({"table_v2": [_record("200", "1", "3")]})
+
+    # Antes el segundo guardado sustituía el fichero solo con sus filas
+    for w in writers:
+        w.save(force=True)
+
+    with open(path, encoding='utf-8') as f:
+        saved = json.load(f)
+    assert sorted(saved["1"]["rows"]) == ["100", "200"]
+    assert set(saved) == {"1", "2", "3"}
+    assert [p.name for p in tmp_path.iterdir()] == ["team_history.json"]